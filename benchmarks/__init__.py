@@ -0,0 +1,5 @@
+"""
+Benchmarks (not part of the test suite), run from the project root:
+
+    python -m benchmarks.<module> -h
+"""
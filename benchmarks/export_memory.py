@@ -0,0 +1,179 @@
+"""
+Peak memory (RSS) of GET /api/export on a large synthetic account.
+
+    PYTHONPATH=src python -m benchmarks.export_memory --items 1000000
+
+Seeds one user (budget_app.seed) owning --items items, --items-per-budget
+per budget (rounded down to whole budgets), into --database (kept between
+runs, re-seeded only when the size changes), then runs each measurement in
+a fresh process so peaks don't add up:
+- "ndjson" / "csv": the streaming export, consuming the response chunk by chunk
+- "list" (--compare-list): every budget formatted by get_budgets_by_user_id
+  and serialized at once, what an export without streaming would cost
+
+Peak RSS of the streaming export should stay flat whatever --items is.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from sqlalchemy import func
+
+DEFAULT_DATABASE = "sqlite:////tmp/budget_export_bench.db"
+BENCH_USERNAME_PREFIX = "export_bench"
+BENCH_USERNAME = f"{BENCH_USERNAME_PREFIX}_0"  # the one user seed_database creates
+
+
+def peak_rss_mb():
+    """peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def make_app(database_url):
+    from budget_app import create_app
+
+    return create_app(
+        {
+            "SECRET_KEY": "bench",
+            "SQLALCHEMY_DATABASE_URI": database_url,
+            "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            "BUDGET_CACHE_BACKEND": "null",
+        }
+    )
+
+
+def seed(database_url, item_count, items_per_budget):
+    """return the bench user's id, (re)creating its budgets when needed"""
+    from budget_app.extensions import db
+    from budget_app.models import Budget, BudgetItem, User
+    from budget_app.seed import seed_database
+
+    app = make_app(database_url)
+    with app.app_context():
+        db.create_all()
+        budget_count = item_count // items_per_budget
+        user = User.query.filter_by(username=BENCH_USERNAME).first()
+        if user is not None:
+            seeded = (
+                db.session.query(func.count(BudgetItem.id))
+                .join(Budget)
+                .filter(Budget.user_id == user.id)
+                .scalar()
+            )
+            if seeded == budget_count * items_per_budget:
+                return user.id
+            db.session.delete(user)  # budgets / items cascade
+            db.session.commit()
+
+        seeded = seed_database(
+            1,
+            budget_count,
+            items_per_budget,
+            prehashed_passwords=True,
+            username_prefix=BENCH_USERNAME_PREFIX,
+        )
+        print(
+            f"Seeded {seeded['items']} items in {seeded['budgets']} budgets "
+            f"in {seeded['seconds']}s",
+            file=sys.stderr,
+        )
+        return User.query.filter_by(username=BENCH_USERNAME).one().id
+
+
+def measure(database_url, user_id, mode):
+    """run one export in this process, return its measurements"""
+    app = make_app(database_url)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    size = 0
+
+    if mode == "list":
+        from budget_app.services.budget.budget_service import get_budgets_by_user_id
+
+        with app.app_context():
+            size = len(json.dumps(get_budgets_by_user_id(user_id), default=str))
+    else:
+        client = app.test_client()
+        with client.session_transaction() as client_session:
+            client_session["user_id"] = {"id": user_id, "username": BENCH_USERNAME}
+        response = client.get(f"/api/export?format={mode}")
+        for chunk in response.iter_encoded():
+            size += len(chunk)
+        response.close()
+
+    return {
+        "mode": mode,
+        "seconds": round(time.perf_counter() - started, 2),
+        "bytes": size,
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.export_memory", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--items-per-budget", type=int, default=100)
+    parser.add_argument(
+        "--database",
+        default=os.getenv("BENCH_DATABASE_URL", DEFAULT_DATABASE),
+        help=f"database to seed and export from (default {DEFAULT_DATABASE})",
+    )
+    parser.add_argument(
+        "--format", dest="formats", action="append", choices=["ndjson", "csv"]
+    )
+    parser.add_argument(
+        "--compare-list",
+        action="store_true",
+        help="also measure formatting every budget in memory (needs a lot of RAM)",
+    )
+    parser.add_argument("--measure", help=argparse.SUPPRESS)  # child process
+    parser.add_argument("--user-id", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(args.database, args.user_id, args.measure)))
+        return 0
+
+    user_id = seed(args.database, args.items, args.items_per_budget)
+    modes = (args.formats or ["ndjson", "csv"]) + (
+        ["list"] if args.compare_list else []
+    )
+    print(f"{'mode':<8}{'seconds':>10}{'MB out':>10}{'baseline MB':>14}{'peak MB':>10}")
+    for mode in modes:
+        child = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.export_memory",
+                "--database",
+                args.database,
+                "--user-id",
+                str(user_id),
+                "--measure",
+                mode,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        print(
+            f"{result['mode']:<8}{result['seconds']:>10}"
+            f"{result['bytes'] / 1e6:>10.1f}{result['baseline_rss_mb']:>14}"
+            f"{result['peak_rss_mb']:>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
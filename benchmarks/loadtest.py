@@ -0,0 +1,325 @@
+"""
+HTTP load generator for the API routes (`app loadtest`).
+
+    poetry run app seed --users 20 --prehashed-passwords
+    PYTHONPATH=src python -m benchmarks.loadtest --start-server --concurrency 8 --duration 30
+
+Every virtual user (--concurrency threads) logs in one of the seeded users
+(<prefix>_<n> / --password, see budget_app.seed) through /api/auth/login,
+then sends requests picked at random from --mix until --duration is over:
+- budgets: GET /api/budgets
+- budget: GET /api/budget/<id> (one of the user's budgets)
+- create / edit / delete: POST /api/budget/item/create|edit|delete on items
+  the virtual user created itself (a create is sent when it has none)
+
+Throughput and p50/p95/p99 latency are reported per route. Raise
+--concurrency until throughput stops growing to find the saturation point
+of a server (--start-server runs one single worker on the local database).
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from .timing import format_duration, percentile, run_metadata, save_results
+
+DEFAULT_MIX = "budgets=20,budget=50,create=10,edit=15,delete=5"
+ROUTES = {
+    "budgets": "GET /api/budgets",
+    "budget": "GET /api/budget/<id>",
+    "create": "POST /api/budget/item/create",
+    "edit": "POST /api/budget/item/edit",
+    "delete": "POST /api/budget/item/delete",
+    "login": "POST /api/auth/login",
+}
+
+
+def parse_mix(mix_raw):
+    """ "budgets=20,budget=80" -> {"budgets": 20, "budget": 80}"""
+    mix = {}
+    for part in mix_raw.split(","):
+        action, _, weight = part.strip().partition("=")
+        if action not in ROUTES or action == "login":
+            raise ValueError(
+                f"Invalid action: '{action}'. Valid actions are: {', '.join(list(ROUTES)[:-1])}"
+            )
+        mix[action] = float(weight or 1)
+    return mix
+
+
+class RouteStats:
+    """thread safe latencies / status codes per route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, route, latency, status):
+        with self._lock:
+            self.latencies.setdefault(route, []).append(latency)
+            statuses = self.statuses.setdefault(route, {})
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "error" or int(status) >= 400:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed):
+        """per route stats, rps over the elapsed run (logins happen before it)"""
+        summary = {}
+        for route, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            summary[route] = {
+                "requests": len(ordered),
+                "rps": None if route == ROUTES["login"] else len(ordered) / elapsed,
+                "p50_s": percentile(ordered, 0.50),
+                "p95_s": percentile(ordered, 0.95),
+                "p99_s": percentile(ordered, 0.99),
+                "errors": self.errors.get(route, 0),
+                "statuses": {str(k): v for k, v in self.statuses[route].items()},
+            }
+        return summary
+
+
+class VirtualUser:
+    def __init__(self, base_url, username, password, stats, rng):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.stats = stats
+        self.rng = rng
+        self.http = requests.Session()
+        self.budget_ids = []
+        self.item_ids = []  # (budget_id, item_id) of the items created
+
+    def request(self, action, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, **kwargs)
+        except requests.RequestException:
+            self.stats.record(ROUTES[action], time.perf_counter() - started, "error")
+            return None
+        self.stats.record(
+            ROUTES[action], time.perf_counter() - started, response.status_code
+        )
+        return response
+
+    def login(self):
+        response = self.request(
+            "login",
+            "POST",
+            "/api/auth/login",
+            json={"username": self.username, "password": self.password},
+        )
+        if response is None or response.status_code != 200:
+            raise RuntimeError(f"Could not log in as {self.username}")
+
+        budgets = self.http.get(
+            self.base_url + "/api/budgets", params={"limit": 200}
+        ).json()["budgets"]
+        self.budget_ids = [budget["id"] for budget in budgets]
+        if not self.budget_ids:
+            raise RuntimeError(f"{self.username} has no budgets, seed some first")
+
+    def run(self, mix, deadline):
+        actions, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            action = self.rng.choices(actions, weights)[0]
+            if action in ("edit", "delete") and not self.item_ids:
+                action = "create"
+            getattr(self, action)()
+
+    def budgets(self):
+        self.request("budgets", "GET", "/api/budgets")
+
+    def budget(self):
+        self.request("budget", "GET", f"/api/budget/{self.rng.choice(self.budget_ids)}")
+
+    def create(self):
+        budget_id = self.rng.choice(self.budget_ids)
+        response = self.request(
+            "create",
+            "POST",
+            "/api/budget/item/create",
+            json={
+                "budget_id": budget_id,
+                "name": "Load test",
+                "category": self.rng.choice(["bills", "savings", "deductions"]),
+                "total": self.rng.randrange(1, 500),
+            },
+        )
+        if response is not None and response.status_code == 200:
+            self.item_ids.append((budget_id, response.json()["budget_item_id"]))
+
+    def edit(self):
+        budget_id, item_id = self.rng.choice(self.item_ids)
+        self.request(
+            "edit",
+            "POST",
+            "/api/budget/item/edit",
+            json={
+                "budget_id": budget_id,
+                "item_id": item_id,
+                "total": self.rng.randrange(1, 500),
+            },
+        )
+
+    def delete(self):
+        budget_id, item_id = self.item_ids.pop(self.rng.randrange(len(self.item_ids)))
+        self.request(
+            "delete",
+            "POST",
+            "/api/budget/item/delete",
+            json={"budget_id": budget_id, "item_id": item_id},
+        )
+
+    def cleanup(self):
+        """delete the items still left from the run"""
+        for budget_id, item_id in self.item_ids:
+            self.http.post(
+                self.base_url + "/api/budget/item/delete",
+                json={"budget_id": budget_id, "item_id": item_id},
+            )
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server():
+    """start `flask run` (one threaded worker) on a free port, return (process, url)"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "flask",
+            "--app",
+            "budget_app.app",
+            "run",
+            "--port",
+            str(port),
+            "--no-reload",
+            "--no-debugger",
+            "--with-threads",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(url + "/api/health", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Server didn't start")
+
+
+def print_summary(summary, elapsed):
+    total = sum(
+        stats["requests"] for stats in summary.values() if stats["rps"] is not None
+    )
+    width = max(len(route) for route in summary)
+    print(
+        f"\n{'route':<{width}}  {'requests':>9}  {'req/s':>8}  {'p50':>9}  "
+        f"{'p95':>9}  {'p99':>9}  {'errors':>6}"
+    )
+    for route, stats in sorted(summary.items()):
+        rps = "-" if stats["rps"] is None else f"{stats['rps']:.1f}"
+        print(
+            f"{route:<{width}}  {stats['requests']:>9}  {rps:>8}  "
+            f"{format_duration(stats['p50_s']):>9}  {format_duration(stats['p95_s']):>9}  "
+            f"{format_duration(stats['p99_s']):>9}  {stats['errors']:>6}"
+        )
+    print(f"\n{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.loadtest", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--url", help="server to load (default: --start-server)")
+    parser.add_argument(
+        "--start-server",
+        action="store_true",
+        help="start a local server (flask run, DATABASE_URL) for the run",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"default {DEFAULT_MIX}")
+    parser.add_argument("--users", type=int, default=10, help="seeded users to log in")
+    parser.add_argument("--prefix", default="seed_user", help="seeded username prefix")
+    parser.add_argument("--password", default="seed-password")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="save the results as JSON")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    if not args.url and not args.start_server:
+        parser.error("one of --url or --start-server is required")
+
+    server = None
+    base_url = args.url
+    if args.start_server:
+        server, base_url = start_server()
+
+    stats = RouteStats()
+    virtual_users = [
+        VirtualUser(
+            base_url,
+            f"{args.prefix}_{number % args.users}",
+            args.password,
+            stats,
+            random.Random(f"{args.seed}-{number}"),
+        )
+        for number in range(args.concurrency)
+    ]
+    try:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(VirtualUser.login, virtual_users))
+            print(
+                f"Logged in {args.concurrency} virtual users, "
+                f"running for {args.duration}s against {base_url}"
+            )
+            started = time.perf_counter()
+            deadline = started + args.duration
+            list(pool.map(lambda user: user.run(mix, deadline), virtual_users))
+            elapsed = time.perf_counter() - started
+            list(pool.map(VirtualUser.cleanup, virtual_users))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    summary = stats.summary(elapsed)
+    print_summary(summary, elapsed)
+    if args.output:
+        save_results(
+            args.output,
+            summary,
+            run_metadata(
+                url=base_url,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                mix=args.mix,
+                cpus=os.cpu_count(),
+            ),
+        )
+        print(f"Saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Login throughput vs. password hashing processes.
+
+    PYTHONPATH=src python -m benchmarks.login --workers 0,1,2,4 --concurrency 16
+
+For each PASSWORD_HASH_WORKERS value in --workers (0: hash in the request
+threads) an app on the same SQLite database (one user) is hammered with
+POST /api/auth/login from --concurrency threads for --duration seconds,
+while one more thread reads GET /api/budgets every PROBE_INTERVAL seconds,
+the latency the budget routes keep during the login burst.
+
+Reports logins/s, login p50/p95, logins rejected with a 503 (more than
+--queue-limit hashes waiting, see budget_app.passwords) or a 429 (the rate
+limits, see budget_app.ratelimit: off unless --per-user / --per-address,
+every thread logs in the same user from the same address) and the budget
+reads' p50/p95. Logins/s should grow with the hashing processes up to the
+number of CPUs (os.cpu_count() is in the results' metadata).
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from budget_app import create_app
+from budget_app.extensions import db
+from budget_app.services.auth.auth_service import create_user
+from budget_app.services.budget.budget_service import create_new_budget
+
+from .timing import format_duration, percentile, run_metadata, save_results
+
+BENCH_USERNAME = "login_bench"
+BENCH_PASSWORD = "login-bench-password"
+PROBE_INTERVAL = 0.05
+
+
+def default_workers():
+    """0, then powers of 2 up to the CPU count, e.g. "0,1,2,4,6" """
+    cpus = os.cpu_count() or 1
+    workers = [0]
+    while workers[-1] * 2 <= cpus:
+        workers.append(max(1, workers[-1] * 2))
+    if workers[-1] != cpus:
+        workers.append(cpus)
+    return ",".join(map(str, workers))
+
+
+def make_app(
+    database_url,
+    workers=0,
+    queue_limit=0,
+    method=None,
+    per_user="off",
+    per_address="off",
+):
+    return create_app(
+        {
+            "SECRET_KEY": "bench",
+            "SQLALCHEMY_DATABASE_URI": database_url,
+            "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            "PASSWORD_HASH_WORKERS": workers,
+            "PASSWORD_HASH_QUEUE_LIMIT": queue_limit,
+            "PASSWORD_HASH_METHOD": method,
+            "LOGIN_RATE_LIMIT_PER_USER": per_user,
+            "LOGIN_RATE_LIMIT_PER_ADDRESS": per_address,
+        }
+    )
+
+
+def seed(database_url, method):
+    app = make_app(database_url, method=method)
+    with app.app_context():
+        db.create_all()
+        create_user(BENCH_USERNAME, BENCH_PASSWORD)
+        create_new_budget(1, "Monthly", 1, 5000)
+
+
+def login(client):
+    return client.post(
+        "/api/auth/login",
+        json={"username": BENCH_USERNAME, "password": BENCH_PASSWORD},
+    )
+
+
+def run(database_url, workers, args):
+    """hammer the login route of a PASSWORD_HASH_WORKERS=workers app"""
+    app = make_app(
+        database_url,
+        workers,
+        args.queue_limit,
+        args.method,
+        args.per_user,
+        args.per_address,
+    )
+    probe = app.test_client()
+    login(probe)  # also starts the hashing processes, outside of the timing
+
+    lock = threading.Lock()
+    logins, rejected, limited, reads = [], [], [], []
+    stop_at = time.monotonic() + args.duration
+
+    def login_loop():
+        client = app.test_client()
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            status = login(client).status_code
+            duration = time.perf_counter() - started
+            with lock:
+                if status == 429:
+                    limited.append(duration)
+                else:
+                    (rejected if status == 503 else logins).append(duration)
+
+    def probe_loop():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            probe.get("/api/budgets")
+            reads.append(time.perf_counter() - started)
+            time.sleep(PROBE_INTERVAL)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency + 1) as executor:
+        futures = [executor.submit(login_loop) for _ in range(args.concurrency)]
+        futures.append(executor.submit(probe_loop))
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    logins.sort()
+    reads.sort()
+    return {
+        "workers": workers,
+        "logins_per_s": len(logins) / elapsed,
+        "login_p50_s": percentile(logins, 0.5) if logins else None,
+        "login_p95_s": percentile(logins, 0.95) if logins else None,
+        "rejected": len(rejected),
+        "limited": len(limited),
+        "budgets_p50_s": percentile(reads, 0.5) if reads else None,
+        "budgets_p95_s": percentile(reads, 0.95) if reads else None,
+    }
+
+
+def print_result(result):
+    def duration(seconds):
+        return format_duration(seconds) if seconds is not None else "-"
+
+    print(
+        f"{result['workers']:>7}  {result['logins_per_s']:>9.1f}  "
+        f"{duration(result['login_p50_s']):>9}  {duration(result['login_p95_s']):>9}  "
+        f"{result['rejected']:>8}  {result['limited']:>8}  "
+        f"{duration(result['budgets_p50_s']):>9}  "
+        f"{duration(result['budgets_p95_s']):>9}",
+        flush=True,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.login", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument(
+        "--workers",
+        default=default_workers(),
+        help="PASSWORD_HASH_WORKERS values, comma separated (0: request threads)",
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="login threads")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument(
+        "--queue-limit",
+        type=int,
+        default=16,
+        help="PASSWORD_HASH_QUEUE_LIMIT (hashes waiting beyond it are rejected)",
+    )
+    parser.add_argument(
+        "--method", help="PASSWORD_HASH_METHOD (default: werkzeug's scrypt)"
+    )
+    parser.add_argument(
+        "--per-user",
+        default="off",
+        help="LOGIN_RATE_LIMIT_PER_USER, e.g. 10/60 (default off)",
+    )
+    parser.add_argument(
+        "--per-address",
+        default="off",
+        help="LOGIN_RATE_LIMIT_PER_ADDRESS, e.g. 100/60 (default off)",
+    )
+    parser.add_argument("--output", help="save the results as JSON")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="budget_login_bench_")
+    try:
+        database_url = f"sqlite:///{os.path.join(directory, 'login_bench.db')}"
+        seed(database_url, args.method)
+
+        print(
+            f"{os.cpu_count()} CPUs, {args.concurrency} login threads, "
+            f"{args.duration:g}s per run\n"
+        )
+        print(
+            f"{'workers':>7}  {'logins/s':>9}  {'login p50':>9}  {'login p95':>9}  "
+            f"{'rejected':>8}  {'limited':>8}  {'reads p50':>9}  {'reads p95':>9}"
+        )
+        results = {}
+        for workers in (int(value) for value in args.workers.split(",")):
+            result = run(database_url, workers, args)
+            results[f"workers={workers}"] = result
+            print_result(result)
+    finally:
+        shutil.rmtree(directory)
+
+    if args.output:
+        metadata = run_metadata(
+            cpus=os.cpu_count(),
+            concurrency=args.concurrency,
+            duration=args.duration,
+            queue_limit=args.queue_limit,
+            method=args.method,
+            per_user=args.per_user,
+            per_address=args.per_address,
+        )
+        save_results(args.output, results, metadata)
+        print(f"\nSaved results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
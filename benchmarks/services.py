@@ -0,0 +1,250 @@
+"""
+Micro-benchmarks of the service layer hot paths (`app bench`).
+
+    PYTHONPATH=src python -m benchmarks.services --output baseline.json
+    # ... change the code ...
+    PYTHONPATH=src python -m benchmarks.services --compare baseline.json
+
+Each data size (--sizes, <budgets per user>x<items per budget>) gets a fresh
+in-memory SQLite database seeded by budget_app.seed, every benchmark is then
+timed on it (see timing.time_calls, the session is removed after each call
+like at the end of a request). Results are saved as JSON (--output);
+--compare flags (and exits with status 1 on) benchmarks whose median is more
+than --threshold slower than in the baseline file.
+"""
+
+import argparse
+from itertools import count
+import os
+import sys
+
+from sqlalchemy.orm import joinedload
+
+from budget_app import create_app
+from budget_app.extensions import db
+from budget_app.models import Budget, BudgetItem, User
+from budget_app.seed import SEED_PASSWORD, seed_database
+from budget_app.services.auth.auth_service import authenticate_user
+from budget_app.services.budget import budget_service
+from budget_app.services.budget.transform import raw_budget_to_budget
+
+from .timing import (
+    compare_results,
+    load_results,
+    print_comparison,
+    print_results,
+    run_metadata,
+    save_results,
+    time_calls,
+)
+
+DEFAULT_SIZES = "1x10,10x10,10x100,100x10"
+DEFAULT_OUTPUT = "bench_results.json"
+BENCH_USERNAME_PREFIX = "bench"
+
+
+def parse_sizes(sizes_raw):
+    """ "10x100,100x10" -> [(10, 100), (100, 10)]"""
+    sizes = []
+    for size in sizes_raw.split(","):
+        budgets, _, items = size.strip().partition("x")
+        sizes.append((int(budgets), int(items)))
+    return sizes
+
+
+class BenchContext:
+    """the seeded user, its first budget and that budget's item ids"""
+
+    def __init__(self, budgets_per_user, items_per_budget):
+        self.budgets_per_user = budgets_per_user
+        self.items_per_budget = items_per_budget
+        seed_database(
+            1,
+            budgets_per_user,
+            items_per_budget,
+            prehashed_passwords=True,
+            username_prefix=BENCH_USERNAME_PREFIX,
+        )
+        self.username = f"{BENCH_USERNAME_PREFIX}_0"
+        self.user_id = User.query.filter_by(username=self.username).one().id
+        self.budget_id = (
+            db.session.query(Budget.id)
+            .filter_by(user_id=self.user_id)
+            .order_by(Budget.id)
+            .limit(1)
+            .scalar()
+        )
+        self.item_ids = [
+            item_id
+            for (item_id,) in db.session.query(BudgetItem.id)
+            .filter_by(budget_id=self.budget_id)
+            .order_by(BudgetItem.id)
+        ]
+
+
+def _raw_budget_to_budget(ctx):
+    # loaded once: only the transform is timed
+    raw_budget = (
+        Budget.query.options(joinedload(Budget.items)).filter_by(id=ctx.budget_id).one()
+    )
+    return lambda: raw_budget_to_budget(raw_budget)
+
+
+def _edit_budget_item_attributes(ctx):
+    totals = count(1)
+    return lambda: budget_service.edit_budget_item_attributes(
+        ctx.item_ids[0], ctx.budget_id, ctx.user_id, {"total": next(totals) % 500}
+    )
+
+
+def _create_and_delete_budget_item(ctx):
+    def create_and_delete():
+        item_id, _ = budget_service.create_new_budget_item(
+            "Bench", "bills", "10", ctx.budget_id, ctx.user_id
+        )
+        budget_service.delete_budget_item_by_item_and_budget_ids(
+            item_id, ctx.budget_id, ctx.user_id
+        )
+
+    return create_and_delete
+
+
+def _service_call(function_name, *arg_names):
+    """benchmark calling budget_service.<function_name>(ctx.<arg>, ...)"""
+
+    def make(ctx):
+        function = getattr(budget_service, function_name)
+        args = [getattr(ctx, arg_name) for arg_name in arg_names]
+        return lambda: function(*args)
+
+    return make
+
+
+def _authenticate_user(ctx):
+    return lambda: authenticate_user(ctx.username, SEED_PASSWORD)
+
+
+# name -> (make(ctx) -> callable to time, depends on the data size)
+BENCHMARKS = {
+    "get_budget_by_budget_and_user_id": (
+        _service_call("get_budget_by_budget_and_user_id", "budget_id", "user_id"),
+        True,
+    ),
+    "get_budgets_by_user_id": (
+        _service_call("get_budgets_by_user_id", "user_id"),
+        True,
+    ),
+    "get_budget_summaries_by_user_id": (
+        _service_call("get_budget_summaries_by_user_id", "user_id"),
+        True,
+    ),
+    "get_budget_totals_by_budget_and_user_id": (
+        _service_call(
+            "get_budget_totals_by_budget_and_user_id", "budget_id", "user_id"
+        ),
+        True,
+    ),
+    "raw_budget_to_budget": (_raw_budget_to_budget, True),
+    "edit_budget_item_attributes": (_edit_budget_item_attributes, True),
+    "create_and_delete_budget_item": (_create_and_delete_budget_item, True),
+    # the password hash check doesn't depend on the data size: timed once
+    "authenticate_user": (_authenticate_user, False),
+}
+
+
+def run(sizes, name_filter=None, min_time=0.5):
+    """return {"<benchmark>[<budgets>x<items>]": summary} (see timing.summarize)"""
+    results = {}
+    for index, (budgets_per_user, items_per_budget) in enumerate(sizes):
+        app = create_app(
+            {
+                "SECRET_KEY": "bench",
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+                # time the database paths, not cache hits
+                "BUDGET_CACHE_BACKEND": "null",
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            ctx = BenchContext(budgets_per_user, items_per_budget)
+            db.session.remove()
+
+            for name, (make, sized) in BENCHMARKS.items():
+                if name_filter and name_filter not in name:
+                    continue
+                if not sized and index > 0:
+                    continue
+
+                key = (
+                    f"{name}[{budgets_per_user}x{items_per_budget}]" if sized else name
+                )
+                print(f"  {key}", file=sys.stderr)
+                results[key] = time_calls(
+                    make(ctx), min_time=min_time, after_call=db.session.remove
+                )
+                db.session.remove()
+
+            db.drop_all()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.services", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help=f"<budgets per user>x<items per budget>, comma separated (default {DEFAULT_SIZES})",
+    )
+    parser.add_argument(
+        "-k", dest="name_filter", help="only run benchmarks whose name contains this"
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="seconds spent timing each benchmark (default 0.5)",
+    )
+    parser.add_argument(
+        "--output",
+        default=DEFAULT_OUTPUT,
+        help=f"results JSON (default {DEFAULT_OUTPUT})",
+    )
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="percent slower than the baseline flagged as a regression (default 10)",
+    )
+    args = parser.parse_args(argv)
+    if args.compare and os.path.abspath(args.compare) == os.path.abspath(args.output):
+        parser.error(
+            "--output would overwrite the --compare baseline, save to another file"
+        )
+    # read before the run: a missing / invalid baseline fails right away
+    baseline = load_results(args.compare) if args.compare else None
+
+    sizes = parse_sizes(args.sizes)
+    results = run(sizes, args.name_filter, args.min_time)
+    save_results(args.output, results, run_metadata(sizes=args.sizes))
+    print_results(results)
+    print(f"\nSaved to {args.output}")
+
+    if baseline is None:
+        return 0
+
+    threshold = args.threshold / 100
+    comparison = compare_results(results, baseline, threshold)
+    print_comparison(comparison, threshold)
+    regressions = [name for name, *_, regressed in comparison if regressed]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.compare}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
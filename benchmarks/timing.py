@@ -0,0 +1,132 @@
+"""
+Timing helpers shared by the benchmarks: time a callable, save the results
+as JSON and compare them with a baseline run.
+"""
+
+from datetime import datetime, timezone
+import json
+import platform
+import statistics
+import sys
+import time
+
+
+def time_calls(fn, min_time=0.5, max_calls=1000, min_calls=5, after_call=None):
+    """
+    call fn() (after one untimed warm up call) until min_time seconds were
+    spent or max_calls calls were made (at least min_calls),
+    return the summary of the per call durations (see summarize).
+    after_call() runs after every call, outside of the timing
+    (e.g. to reset state between calls)
+    """
+    fn()
+    if after_call:
+        after_call()
+
+    durations = []
+    spent = 0.0
+    while len(durations) < min_calls or (
+        spent < min_time and len(durations) < max_calls
+    ):
+        started = time.perf_counter()
+        fn()
+        duration = time.perf_counter() - started
+        if after_call:
+            after_call()
+        durations.append(duration)
+        spent += duration
+
+    return summarize(durations)
+
+
+def percentile(ordered, fraction):
+    """nearest rank percentile (fraction, e.g. 0.95) of already sorted values"""
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def summarize(durations):
+    """per call durations (seconds) -> {calls, median_s, mean_s, min_s, p95_s, stdev_s}"""
+    ordered = sorted(durations)
+    return {
+        "calls": len(ordered),
+        "median_s": statistics.median(ordered),
+        "mean_s": statistics.fmean(ordered),
+        "min_s": ordered[0],
+        "p95_s": percentile(ordered, 0.95),
+        "stdev_s": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def run_metadata(**extra):
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **extra,
+    }
+
+
+def save_results(path, results, metadata):
+    with open(path, "w") as f:
+        json.dump({"metadata": metadata, "results": results}, f, indent=2)
+        f.write("\n")
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare_results(results, baseline, threshold):
+    """
+    return list of (name, baseline median, current median, ratio, regressed)
+    for the benchmarks in both runs: regressed when the current median is
+    more than threshold (e.g. 0.1 = 10%) slower than the baseline's
+    """
+    comparison = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median_s"]
+        after = result["median_s"]
+        ratio = after / before if before else float("inf")
+        comparison.append((name, before, after, ratio, ratio > 1 + threshold))
+    return comparison
+
+
+def format_duration(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
+
+
+def print_results(results, file=sys.stdout):
+    width = max((len(name) for name in results), default=10)
+    print(
+        f"{'benchmark':<{width}}  {'median':>10}  {'p95':>10}  {'min':>10}  {'calls':>6}",
+        file=file,
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<{width}}  {format_duration(result['median_s']):>10}  "
+            f"{format_duration(result['p95_s']):>10}  "
+            f"{format_duration(result['min_s']):>10}  {result['calls']:>6}",
+            file=file,
+        )
+
+
+def print_comparison(comparison, threshold, file=sys.stdout):
+    width = max((len(name) for name, *_ in comparison), default=10)
+    print(
+        f"\n{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'change':>8}",
+        file=file,
+    )
+    for name, before, after, ratio, regressed in comparison:
+        flag = f"  REGRESSION (> {threshold:.0%})" if regressed else ""
+        print(
+            f"{name:<{width}}  {format_duration(before):>10}  "
+            f"{format_duration(after):>10}  {ratio - 1:>+8.1%}{flag}",
+            file=file,
+        )
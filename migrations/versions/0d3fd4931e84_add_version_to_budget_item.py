@@ -0,0 +1,27 @@
+"""Add version to budget_item
+
+Revision ID: 0d3fd4931e84
+Revises: 7585f55bc1a7
+Create Date: 2026-10-18 17:41:52.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d3fd4931e84'
+down_revision = '7585f55bc1a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing items start at version 1 (server default, no table rewrite)
+    with op.batch_alter_table('budget_item', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('budget_item', schema=None) as batch_op:
+        batch_op.drop_column('version')
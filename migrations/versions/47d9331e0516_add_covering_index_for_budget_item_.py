@@ -0,0 +1,36 @@
+"""Add covering index for budget_item aggregates
+
+Revision ID: 47d9331e0516
+Revises: 4dc1939aedc4
+Create Date: 2026-10-18 11:02:47.918350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '47d9331e0516'
+down_revision = '4dc1939aedc4'
+branch_labels = None
+depends_on = None
+
+# Access patterns and the index serving each of them:
+# - budget.user_id, budget.(user_id, id) ........ ix_budget_user_id_id
+# - budget.(id, user_id) ......................... budget primary key
+# - budget.(user_id, name) ....................... unique_budget_name_per_user
+# - budget_item.budget_id, (budget_id, id) ....... ix_budget_item_budget_id_id
+# - budget_item.(id, budget_id) .................. budget_item primary key
+# - budget_item GROUP BY budget_id, category ..... ix_budget_item_budget_id_category
+
+
+def upgrade():
+    # CONCURRENTLY (Postgres only) can't run inside a transaction, it
+    # builds the index without blocking writes on a live database
+    with op.get_context().autocommit_block():
+        op.create_index('ix_budget_item_budget_id_category', 'budget_item', ['budget_id', 'category', 'total'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_budget_item_budget_id_category', table_name='budget_item', postgresql_concurrently=True)
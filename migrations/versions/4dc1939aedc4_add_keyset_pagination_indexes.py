@@ -0,0 +1,31 @@
+"""Add keyset pagination indexes for budget and budget_item
+
+Revision ID: 4dc1939aedc4
+Revises: e1c5361166b5
+Create Date: 2026-10-18 10:12:31.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4dc1939aedc4'
+down_revision = 'e1c5361166b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY (Postgres only, ignored elsewhere) can't run inside a
+    # transaction, so build the indexes in autocommit mode without locking
+    # writes on a live database
+    with op.get_context().autocommit_block():
+        op.create_index('ix_budget_user_id_id', 'budget', ['user_id', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_budget_item_budget_id_id', 'budget_item', ['budget_id', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_budget_item_budget_id_id', table_name='budget_item', postgresql_concurrently=True)
+        op.drop_index('ix_budget_user_id_id', table_name='budget', postgresql_concurrently=True)
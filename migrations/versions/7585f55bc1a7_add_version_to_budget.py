@@ -0,0 +1,35 @@
+"""Add version to budget
+
+Revision ID: 7585f55bc1a7
+Revises: 8535cc580594
+Create Date: 2026-10-18 15:21:09.412870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7585f55bc1a7'
+down_revision = '8535cc580594'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing budgets start at version 1 (server default, no table rewrite)
+    with op.batch_alter_table('budget', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    # SQLite batch mode recreates the table: with foreign key enforcement
+    # on, dropping budget would cascade into budget_item
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    with op.batch_alter_table('budget', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('PRAGMA foreign_keys=ON')
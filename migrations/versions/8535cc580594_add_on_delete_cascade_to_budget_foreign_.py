@@ -0,0 +1,61 @@
+"""Add ON DELETE CASCADE to budget and budget_item foreign keys
+
+Revision ID: 8535cc580594
+Revises: 47d9331e0516
+Create Date: 2026-10-18 14:02:47.518306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8535cc580594'
+down_revision = '47d9331e0516'
+branch_labels = None
+depends_on = None
+
+# the foreign keys were created unnamed, Postgres named them
+# <table>_<column>_fkey. Reflected (SQLite batch mode) unnamed foreign keys
+# are given the same name so they can be dropped on either database.
+naming_convention = {
+    'fk': '%(table_name)s_%(column_0_name)s_fkey',
+}
+
+
+def _disable_sqlite_foreign_keys():
+    # batch mode recreates the tables (copy + DROP TABLE + rename): with
+    # enforcement on, dropping budget would fail / cascade into budget_item
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('PRAGMA foreign_keys=OFF')
+
+
+def _enable_sqlite_foreign_keys():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('PRAGMA foreign_keys=ON')
+
+
+def upgrade():
+    _disable_sqlite_foreign_keys()
+    with op.batch_alter_table('budget', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('budget_user_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key('budget_user_id_fkey', 'user', ['user_id'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('budget_item', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('budget_item_budget_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key('budget_item_budget_id_fkey', 'budget', ['budget_id'], ['id'], ondelete='CASCADE')
+
+    _enable_sqlite_foreign_keys()
+
+
+def downgrade():
+    _disable_sqlite_foreign_keys()
+    with op.batch_alter_table('budget_item', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('budget_item_budget_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key('budget_item_budget_id_fkey', 'budget', ['budget_id'], ['id'])
+
+    with op.batch_alter_table('budget', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('budget_user_id_fkey', type_='foreignkey')
+        batch_op.create_foreign_key('budget_user_id_fkey', 'user', ['user_id'], ['id'])
+
+    _enable_sqlite_foreign_keys()
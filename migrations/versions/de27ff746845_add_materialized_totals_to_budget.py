@@ -0,0 +1,51 @@
+"""Add materialized item_count and category totals to budget
+
+Revision ID: de27ff746845
+Revises: 0d3fd4931e84
+Create Date: 2026-10-18 18:36:20.417903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'de27ff746845'
+down_revision = '0d3fd4931e84'
+branch_labels = None
+depends_on = None
+
+CATEGORIES = ['deductions', 'bills', 'savings']
+
+
+def upgrade():
+    with op.batch_alter_table('budget', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+        for category in CATEGORIES:
+            batch_op.add_column(sa.Column(f'{category}_total', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False))
+
+    # backfill the totals of the existing budgets from their items
+    totals = ', '.join(
+        f"{category}_total = (SELECT COALESCE(SUM(budget_item.total), 0) FROM budget_item "
+        f"WHERE budget_item.budget_id = budget.id AND budget_item.category = '{category}')"
+        for category in CATEGORIES
+    )
+    op.execute(
+        'UPDATE budget SET item_count = (SELECT COUNT(*) FROM budget_item '
+        f'WHERE budget_item.budget_id = budget.id), {totals}'
+    )
+
+
+def downgrade():
+    # SQLite batch mode recreates the table: with foreign key enforcement
+    # on, dropping budget would cascade into budget_item
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('PRAGMA foreign_keys=OFF')
+
+    with op.batch_alter_table('budget', schema=None) as batch_op:
+        for category in reversed(CATEGORIES):
+            batch_op.drop_column(f'{category}_total')
+        batch_op.drop_column('item_count')
+
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('PRAGMA foreign_keys=ON')
@@ -3,7 +3,15 @@ from dotenv import load_dotenv
 import os
 
 # expose extensions at package level so tests can do: from budget_app import db
-from .extensions import db, migrate
+from .extensions import (
+    budget_cache,
+    db,
+    login_rate_limiter,
+    migrate,
+    password_hasher,
+    request_metrics,
+)
+from .pool import engine_options_from_env, init_pool
 
 load_dotenv()
 
@@ -16,18 +24,42 @@ def create_app(test_config=None, verboseLogs=False):
         SECRET_KEY=os.getenv("SECRET_KEY"),
         SQLALCHEMY_DATABASE_URI=os.getenv("DATABASE_URL"),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        BUDGET_CACHE_BACKEND=os.getenv("BUDGET_CACHE_BACKEND", "lru"),
+        BUDGET_CACHE_MAX_SIZE=os.getenv("BUDGET_CACHE_MAX_SIZE"),
+        BUDGET_CACHE_TTL=os.getenv("BUDGET_CACHE_TTL"),
+        SLOW_QUERY_THRESHOLD_MS=os.getenv("SLOW_QUERY_THRESHOLD_MS"),
+        DB_POOL_RETRY_AFTER=os.getenv("DB_POOL_RETRY_AFTER"),
+        PASSWORD_HASH_METHOD=os.getenv("PASSWORD_HASH_METHOD"),
+        PASSWORD_HASH_WORKERS=os.getenv("PASSWORD_HASH_WORKERS"),
+        PASSWORD_HASH_QUEUE_LIMIT=os.getenv("PASSWORD_HASH_QUEUE_LIMIT"),
+        LOGIN_RATE_LIMIT_PER_USER=os.getenv("LOGIN_RATE_LIMIT_PER_USER"),
+        LOGIN_RATE_LIMIT_PER_ADDRESS=os.getenv("LOGIN_RATE_LIMIT_PER_ADDRESS"),
+        LOGIN_RATE_LIMIT_STORE=os.getenv("LOGIN_RATE_LIMIT_STORE"),
+        OPS_TOKEN=os.getenv("OPS_TOKEN"),
     )
 
     # Override for testing if provided
     if test_config:
         app.config.update(test_config)
 
+    # Connection pool tuning (DB_POOL_* env vars, see pool.py) for the final
+    # database URL
+    if "SQLALCHEMY_ENGINE_OPTIONS" not in app.config:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options_from_env(
+            os.environ, app.config.get("SQLALCHEMY_DATABASE_URI")
+        )
+
     # Initialize extensions
     if verboseLogs:
         print("Initializing DB...")
 
     db.init_app(app)
     migrate.init_app(app, db)
+    budget_cache.init_app(app)
+    request_metrics.init_app(app, db)
+    init_pool(app, db)
+    password_hasher.init_app(app, request_metrics)
+    login_rate_limiter.init_app(app, request_metrics)
     if verboseLogs:
         print("DB successfully initialized!")
 
@@ -49,4 +81,10 @@ def create_app(test_config=None, verboseLogs=False):
     if verboseLogs:
         print("Successfully registered web routes...")
 
+    # Register flask CLI commands (flask --app budget_app.app <command>)
+    from .commands import rebuild_totals_command, seed_command
+
+    app.cli.add_command(rebuild_totals_command)
+    app.cli.add_command(seed_command)
+
     return app
@@ -0,0 +1,198 @@
+"""
+In-process cache for serialized budgets, keyed by (user_id, budget_id).
+
+The backend is pluggable (BUDGET_CACHE_BACKEND config):
+- "lru" (default): size bounded LRU with a TTL, see LRUCacheBackend
+- "null": caching disabled, every read goes to the database
+
+Each worker process has its own LRU: a write invalidates the entry of the
+process that served it, the TTL bounds how long other processes may serve
+the previous version.
+
+A read that misses takes the cache's generation() before querying the
+database and passes it to set(): when the key was invalidated in between (a
+write committed while the read was running), the value it read may be the
+previous version and is not stored.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+import time
+
+from flask import current_app
+
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_TTL_SECONDS = 300
+
+
+class LRUCacheBackend:
+    """
+    Thread safe LRU cache: at most max_size entries, each valid for
+    ttl seconds. Counts hits, misses and evictions (least recently used
+    entries dropped to make room, or expired entries dropped when read).
+
+    Every delete / clear bumps the generation; the generation of the last
+    delete of the max_size most recently deleted keys is kept, older deletes
+    only as the generation they all happened before (a set from before it is
+    dropped, whatever its key).
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL_SECONDS, clock=None):
+        if max_size < 1:
+            raise ValueError("Cache max_size must be at least 1.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock or time.monotonic
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generation = 0
+        self._deleted_at = OrderedDict()  # key -> generation of its last delete
+        self._forgotten_deletes_at = 0  # generation of the last delete dropped
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """return cached value OR None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self):
+        """to pass to set() by a read about to query the database"""
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, generation=None):
+        """
+        store value, unless key was deleted after generation (the value
+        may have been read before that delete)
+        """
+        with self._lock:
+            if generation is not None and generation < self._deleted_at.get(
+                key, self._forgotten_deletes_at
+            ):
+                return
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+            self._deleted_at[key] = self._generation
+            self._deleted_at.move_to_end(key)
+            while len(self._deleted_at) > self.max_size:
+                _, self._forgotten_deletes_at = self._deleted_at.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._deleted_at.clear()
+            self._forgotten_deletes_at = self._generation
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "lru",
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class NullCacheBackend:
+    """Caching disabled: nothing is stored, every get is a miss"""
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def generation(self):
+        return 0
+
+    def set(self, key, value, generation=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"backend": "null", "hits": 0, "misses": self.misses, "evictions": 0}
+
+
+CACHE_BACKENDS = {
+    "lru": lambda config: LRUCacheBackend(
+        max_size=int(config.get("BUDGET_CACHE_MAX_SIZE") or DEFAULT_MAX_SIZE),
+        ttl=float(config.get("BUDGET_CACHE_TTL") or DEFAULT_TTL_SECONDS),
+    ),
+    "null": lambda config: NullCacheBackend(),
+}
+
+
+class BudgetCache:
+    """
+    Flask extension (like db) holding the app's cache backend in
+    app.extensions["budget_cache"].
+    """
+
+    def init_app(self, app):
+        backend_name = app.config.get("BUDGET_CACHE_BACKEND") or "lru"
+        if backend_name not in CACHE_BACKENDS:
+            raise ValueError(
+                f"Invalid BUDGET_CACHE_BACKEND: '{backend_name}'. "
+                f"Valid backends are: {', '.join(CACHE_BACKENDS)}"
+            )
+        app.extensions["budget_cache"] = CACHE_BACKENDS[backend_name](app.config)
+
+    @property
+    def backend(self):
+        return current_app.extensions["budget_cache"]
+
+    @property
+    def enabled(self):
+        return not isinstance(self.backend, NullCacheBackend)
+
+    def get(self, user_id, budget_id):
+        return self.backend.get((user_id, int(budget_id)))
+
+    def generation(self):
+        return self.backend.generation()
+
+    def set(self, user_id, budget_id, value, generation=None):
+        self.backend.set((user_id, int(budget_id)), value, generation)
+
+    def invalidate(self, user_id, budget_id):
+        self.backend.delete((user_id, int(budget_id)))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return self.backend.stats()
@@ -0,0 +1,135 @@
+import unittest
+
+from budget_app import create_app
+from budget_app.cache import LRUCacheBackend, NullCacheBackend
+from budget_app.extensions import budget_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LRUCacheBackend(max_size=2, ttl=10, clock=self.clock)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", 1)
+        self.assertEqual(self.cache.get("a"), 1)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")  # "b" is now the least recently used
+        self.cache.set("c", 3)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.get("c"), 3)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        self.cache.set("a", 1)
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get("a"), 1)
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get("a"))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["evictions"], stats["size"]), (1, 0))
+
+    def test_delete_and_clear(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.delete("a")
+        self.cache.delete("missing")
+        self.assertIsNone(self.cache.get("a"))
+
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_set_after_delete_dropped(self):
+        # a read started (generation taken), then a write deleted the key
+        generation = self.cache.generation()
+        self.cache.delete("a")
+        self.cache.set("a", "read before the write", generation)
+        self.cache.set("b", 2, generation)  # another key: stored
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("b"), 2)
+
+        self.cache.set("a", 1, self.cache.generation())
+        self.assertEqual(self.cache.get("a"), 1)
+
+    def test_set_after_forgotten_delete_dropped(self):
+        generation = self.cache.generation()
+        for key in ("a", "b", "c"):  # more deletes than max_size: "a" forgotten
+            self.cache.delete(key)
+        self.cache.set("a", 1, generation)
+        self.assertIsNone(self.cache.get("a"))
+
+        generation = self.cache.generation()
+        self.cache.clear()
+        self.cache.set("d", 1, generation)
+        self.assertIsNone(self.cache.get("d"))
+
+    def test_invalid_max_size(self):
+        with self.assertRaisesRegex(ValueError, "max_size"):
+            LRUCacheBackend(max_size=0)
+
+
+class NullCache(unittest.TestCase):
+    def test_never_stores(self):
+        cache = NullCacheBackend()
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+class BudgetCacheExtension(unittest.TestCase):
+    def test_backend_from_config(self):
+        app = create_app(
+            {
+                "TESTING": True,
+                "BUDGET_CACHE_MAX_SIZE": "5",
+                "BUDGET_CACHE_TTL": "60",
+            }
+        )
+        with app.app_context():
+            self.assertTrue(budget_cache.enabled)
+            stats = budget_cache.stats()
+            self.assertEqual((stats["max_size"], stats["ttl"]), (5, 60))
+
+            budget_cache.set(1, "2", {"budget": {}})
+            self.assertEqual(budget_cache.get(1, 2), {"budget": {}})
+            budget_cache.invalidate(1, 2)
+            self.assertIsNone(budget_cache.get(1, 2))
+
+    def test_null_backend(self):
+        app = create_app({"TESTING": True, "BUDGET_CACHE_BACKEND": "null"})
+        with app.app_context():
+            self.assertFalse(budget_cache.enabled)
+
+    def test_invalid_backend(self):
+        with self.assertRaisesRegex(ValueError, "Invalid BUDGET_CACHE_BACKEND"):
+            create_app({"TESTING": True, "BUDGET_CACHE_BACKEND": "redis"})
+
+    def test_stats_route(self):
+        app = create_app({"TESTING": True, "OPS_TOKEN": "ops"})
+        response = app.test_client().get(
+            "/api/cache/stats", headers={"Authorization": "Bearer ops"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["backend"], "lru")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
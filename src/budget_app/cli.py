@@ -48,6 +48,31 @@ def do_start(args):
     return _start([sys.executable, "-m", "budget_app.app"])
 
 
+def do_serve(args):
+    cmd = [
+        sys.executable,
+        "-m",
+        "budget_app.serve",
+        "--host",
+        args.host,
+        "--threads",
+        str(args.threads),
+        "--max-requests",
+        str(args.max_requests),
+        "--max-requests-jitter",
+        str(args.max_requests_jitter),
+        "--graceful-timeout",
+        str(args.graceful_timeout),
+    ]
+    if args.port:
+        cmd += ["--port", str(args.port)]
+    if args.workers:
+        cmd += ["--workers", str(args.workers)]
+    if args.access_log:
+        cmd.append("--access-log")
+    return _start(cmd)
+
+
 def do_db_migrate(args):
     msg = args.message or "migration"
     return _start(
@@ -77,6 +102,80 @@ def do_db_downgrade(args):
     )
 
 
+def do_rebuild_totals(args):
+    cmd = [sys.executable, "-m", "flask", "--app", "budget_app.app", "rebuild-totals"]
+    if args.check:
+        cmd.append("--check")
+    return _start(cmd)
+
+
+def do_seed(args):
+    cmd = [
+        sys.executable,
+        "-m",
+        "flask",
+        "--app",
+        "budget_app.app",
+        "seed",
+        "--users",
+        str(args.users),
+        "--budgets",
+        str(args.budgets),
+        "--items",
+        str(args.items),
+        "--seed",
+        str(args.seed),
+    ]
+    if args.prehashed_passwords:
+        cmd.append("--prehashed-passwords")
+    if args.prefix:
+        cmd += ["--prefix", args.prefix]
+    return _start(cmd)
+
+
+def do_bench(args):
+    # benchmarks/ lives in the project root (the working directory)
+    cmd = [
+        sys.executable,
+        "-m",
+        "benchmarks.services",
+        "--sizes",
+        args.sizes,
+        "--min-time",
+        str(args.min_time),
+        "--output",
+        args.output,
+        "--threshold",
+        str(args.threshold),
+    ]
+    if args.name_filter:
+        cmd += ["-k", args.name_filter]
+    if args.compare:
+        cmd += ["--compare", args.compare]
+    return _start(cmd)
+
+
+def do_loadtest(args):
+    # benchmarks/ lives in the project root (the working directory)
+    cmd = [
+        sys.executable,
+        "-m",
+        "benchmarks.loadtest",
+        "--concurrency",
+        str(args.concurrency),
+        "--duration",
+        str(args.duration),
+        "--mix",
+        args.mix,
+        "--users",
+        str(args.users),
+    ]
+    cmd += ["--url", args.url] if args.url else ["--start-server"]
+    if args.output:
+        cmd += ["--output", args.output]
+    return _start(cmd)
+
+
 def main(argv=None):
     parser = argparse.ArgumentParser(prog="app", description="Budget app helper CLI")
     sub = parser.add_subparsers(dest="command", required=True)
@@ -95,6 +194,38 @@ def main(argv=None):
     p_start = sub.add_parser("start", help="start the app")
     p_start.set_defaults(func=do_start)
 
+    p_serve = sub.add_parser(
+        "serve", help="run the production server (gunicorn: workers x threads)"
+    )
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, help="default APP_PORT or 8000")
+    p_serve.add_argument(
+        "--workers", type=int, help="worker processes (default: one per CPU)"
+    )
+    p_serve.add_argument(
+        "--threads", type=int, default=4, help="request threads per worker"
+    )
+    p_serve.add_argument(
+        "--max-requests",
+        type=int,
+        default=10_000,
+        help="recycle a worker after this many requests (0: never)",
+    )
+    p_serve.add_argument(
+        "--max-requests-jitter",
+        type=int,
+        default=1_000,
+        help="random extra requests per worker, spreads the recycling",
+    )
+    p_serve.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="seconds the workers get to finish their requests when stopping",
+    )
+    p_serve.add_argument("--access-log", action="store_true", help="log every request")
+    p_serve.set_defaults(func=do_serve)
+
     p_migrate = sub.add_parser("db-migrate", help="generate a migration")
     p_migrate.add_argument("-m", "--message", help="migration message", default=None)
     p_migrate.set_defaults(func=do_db_migrate)
@@ -105,6 +236,79 @@ def main(argv=None):
     p_downgrade = sub.add_parser("db-downgrade", help="rollback migrations")
     p_downgrade.set_defaults(func=do_db_downgrade)
 
+    p_totals = sub.add_parser(
+        "rebuild-totals", help="rebuild (or verify) the materialized budget totals"
+    )
+    p_totals.add_argument(
+        "--check",
+        action="store_true",
+        help="only verify, exit with status 1 when some totals are wrong",
+    )
+    p_totals.set_defaults(func=do_rebuild_totals)
+
+    p_seed = sub.add_parser(
+        "seed", help="fill the database with synthetic users, budgets and items"
+    )
+    p_seed.add_argument("--users", type=int, default=10, help="number of users")
+    p_seed.add_argument("--budgets", type=int, default=12, help="budgets per user")
+    p_seed.add_argument("--items", type=int, default=20, help="items per budget")
+    p_seed.add_argument("--seed", type=int, default=0, help="random seed")
+    p_seed.add_argument(
+        "--prehashed-passwords",
+        action="store_true",
+        help="hash the password once for every user (skips the per user hashing cost)",
+    )
+    p_seed.add_argument("--prefix", default=None, help="username prefix")
+    p_seed.set_defaults(func=do_seed)
+
+    p_bench = sub.add_parser(
+        "bench", help="time the service layer hot paths (benchmarks/services.py)"
+    )
+    p_bench.add_argument(
+        "--sizes",
+        default="1x10,10x10,10x100,100x10",
+        help="<budgets per user>x<items per budget>, comma separated",
+    )
+    p_bench.add_argument(
+        "-k", dest="name_filter", help="only run benchmarks whose name contains this"
+    )
+    p_bench.add_argument(
+        "--min-time", type=float, default=0.5, help="seconds timing each benchmark"
+    )
+    p_bench.add_argument(
+        "--output", default="bench_results.json", help="results JSON file"
+    )
+    p_bench.add_argument(
+        "--compare", metavar="BASELINE_JSON", help="flag regressions against a run"
+    )
+    p_bench.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="percent slower than the baseline flagged as a regression",
+    )
+    p_bench.set_defaults(func=do_bench)
+
+    p_load = sub.add_parser(
+        "loadtest",
+        help="drive the API routes with seeded users, report throughput / latency",
+    )
+    p_load.add_argument(
+        "--url", help="server to load, default: start a local one for the run"
+    )
+    p_load.add_argument("--concurrency", type=int, default=4, help="virtual users")
+    p_load.add_argument("--duration", type=float, default=10.0, help="seconds")
+    p_load.add_argument(
+        "--mix",
+        default="budgets=20,budget=50,create=10,edit=15,delete=5",
+        help="weights of the budgets, budget, create, edit and delete requests",
+    )
+    p_load.add_argument(
+        "--users", type=int, default=10, help="seeded users (app seed) to log in"
+    )
+    p_load.add_argument("--output", help="save the results as JSON")
+    p_load.set_defaults(func=do_loadtest)
+
     args = parser.parse_args(argv)
     rc = args.func(args)
     sys.exit(rc)
@@ -0,0 +1,73 @@
+"""
+Flask CLI commands (flask --app budget_app.app <command>), registered on
+the app by create_app. cli.py wraps them for `poetry run app`.
+"""
+
+import click
+
+from .seed import SEED_PASSWORD, SEED_USERNAME_PREFIX, seed_database
+from .services.budget.aggregate import rebuild_budget_totals
+
+
+@click.command("rebuild-totals")
+@click.option(
+    "--check",
+    is_flag=True,
+    help="only verify the totals, exit with status 1 when some are wrong",
+)
+def rebuild_totals_command(check):
+    """Rebuild (or verify) the materialized totals of every budget."""
+    mismatched_budget_ids = rebuild_budget_totals(fix=not check)
+    if not mismatched_budget_ids:
+        click.echo("Budget totals are up to date.")
+        return
+
+    ids = ", ".join(str(budget_id) for budget_id in mismatched_budget_ids)
+    if check:
+        click.echo(f"Budget totals out of date for budget_id(s): {ids}")
+        raise SystemExit(1)
+    click.echo(f"Rebuilt budget totals for budget_id(s): {ids}")
+
+
+@click.command("seed")
+@click.option("--users", default=10, show_default=True, type=click.IntRange(min=0))
+@click.option(
+    "--budgets",
+    default=12,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="budgets per user",
+)
+@click.option(
+    "--items",
+    default=20,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help="items per budget",
+)
+@click.option("--seed", default=0, show_default=True, help="random seed")
+@click.option(
+    "--prehashed-passwords",
+    is_flag=True,
+    help="hash the password once for every user (skips the per user hashing cost)",
+)
+@click.option("--prefix", default=SEED_USERNAME_PREFIX, show_default=True)
+def seed_command(users, budgets, items, seed, prehashed_passwords, prefix):
+    """Fill the database with synthetic users, budgets and items."""
+    try:
+        seeded = seed_database(
+            users,
+            budgets,
+            items,
+            seed=seed,
+            prehashed_passwords=prehashed_passwords,
+            username_prefix=prefix,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(
+        f"Seeded {seeded['users']} users, {seeded['budgets']} budgets and "
+        f"{seeded['items']} items in {seeded['seconds']}s "
+        f"(log in as {prefix}_<n> / {SEED_PASSWORD})"
+    )
@@ -1,5 +1,30 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .cache import BudgetCache
+from .metrics import RequestMetrics
+from .passwords import PasswordHasher
+from .ratelimit import LoginRateLimiter
 
 db = SQLAlchemy()
 migrate = Migrate()
+budget_cache = BudgetCache()
+request_metrics = RequestMetrics()
+password_hasher = PasswordHasher()
+login_rate_limiter = LoginRateLimiter()
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """
+    SQLite (used by the tests) only enforces foreign keys, and so the
+    ON DELETE CASCADE deletes rely on, when asked to on every connection
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
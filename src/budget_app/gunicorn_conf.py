@@ -0,0 +1,83 @@
+"""
+gunicorn settings and hooks of the production server (see serve.py).
+
+The app is created once in the master (preload_app) and its memory frozen
+(gc.freeze() before each fork): the garbage collector never writes to those
+objects, so their pages stay shared copy-on-write between the workers.
+
+Hooks:
+- pre_fork: gc.freeze() what the master allocated so far
+- post_fork: the worker disposes of the engines' pools copied from the
+  master, its connections (DB_POOL_SIZE, see pool.py) are opened after the
+  fork and never shared between processes
+- post_worker_init: the worker starts its password hashing processes before
+  serving (see passwords.py), the first login doesn't wait for them. Not in
+  post_fork: the worker only handles SIGTERM once initialized
+- worker_exit: the worker's password hashing processes are stopped
+- child_exit: the master drops the live gauges of the exited worker
+  (prometheus_client's multiprocess mode, see metrics.py)
+- when_ready: prints "Listening on <url>" once the sockets are bound
+"""
+
+import gc
+import os
+
+DEFAULT_PORT = 8000
+
+bind = f"127.0.0.1:{os.getenv('APP_PORT') or DEFAULT_PORT}"
+workers = os.cpu_count() or 1
+worker_class = "gthread"
+threads = 4
+preload_app = True
+max_requests = 10_000
+max_requests_jitter = 1_000
+graceful_timeout = 30
+timeout = 30  # a worker silent for longer (stuck) is killed and replaced
+keepalive = 5
+# gunicorn >= 24: no control socket (one per user, shared by every server)
+control_socket_disable = True
+
+
+def _flask_app(worker):
+    # preloaded: the app the master created, the same object in every worker
+    return worker.app.wsgi()
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from .extensions import db
+
+    with _flask_app(worker).app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    from .extensions import password_hasher
+
+    with _flask_app(worker).app_context():
+        password_hasher.start()
+
+
+def worker_exit(server, worker):
+    from .passwords import shutdown_executors
+
+    shutdown_executors()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    urls = ", ".join(str(listener) for listener in server.LISTENERS)
+    print(
+        f"Listening on {urls} "
+        f"({server.cfg.workers} workers x {server.cfg.threads} threads)",
+        flush=True,
+    )
@@ -0,0 +1,429 @@
+"""
+Request metrics, exposed in the Prometheus text format at GET /api/metrics.
+
+Every request records (labels: endpoint = the matched url rule, method):
+- http_requests_total: requests handled, also by status code
+- http_request_duration_seconds: latency histogram
+- http_response_size_bytes: response size histogram (streamed bodies excluded)
+- http_requests_in_progress: requests being handled right now
+
+- http_request_db_statements / http_request_db_seconds: SQL statements
+  executed and time spent executing them, per request (histograms)
+
+and gets a Server-Timing header splitting its time between the database
+(cursor executes), JSON serialization and the total.
+
+Every SQL statement is timed (QueryTimer, listening to the app's engines):
+the ones taking at least SLOW_QUERY_THRESHOLD_MS (default 100) are logged to
+the "budget_app.sql" logger with the shape of their parameters and the
+service function running them, and counted in db_slow_queries_total.
+
+Metrics are prometheus_client metrics, in a registry of the app's own:
+- PROMETHEUS_MULTIPROC_DIR unset (default): in this process' memory, enough
+  for a single worker
+- PROMETHEUS_MULTIPROC_DIR set (before prometheus_client is imported, see
+  serve.py): prometheus_client's multiprocess mode, every worker process
+  writes its values to its own files in the directory and /api/metrics
+  aggregates the files of all workers (MultiProcessCollector), whichever
+  worker answers the scrape. The gauges only count the live workers (the
+  server marks exited ones dead). Empty the directory when (re)starting the
+  server.
+"""
+
+import logging
+import os
+import sys
+import time
+
+from blinker import Namespace
+from flask import current_app, g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CHECKOUT_WAIT_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+DEFAULT_SLOW_QUERY_THRESHOLD_MS = 100
+MAX_LOGGED_STATEMENT_LENGTH = 2000
+slow_query_logger = logging.getLogger("budget_app.sql")
+
+THIS_FILE = os.path.abspath(__file__)
+PACKAGE_DIR = os.path.dirname(THIS_FILE) + os.sep
+SERVICES_DIR = os.path.join(PACKAGE_DIR, "services") + os.sep
+UNKNOWN_CALLER = "<unknown>"
+
+# sent after every request with its RequestTiming (see testing.RequestQueryRecorder)
+request_timed = Namespace().signal("request-timed")
+
+REQUEST_LABELS = ("endpoint", "method")
+
+# name -> (type, help, label names)
+METRICS = {
+    "http_requests_total": (
+        "counter",
+        "Requests handled, by endpoint, method and status code.",
+        REQUEST_LABELS + ("status",),
+    ),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Time spent handling requests, by endpoint and method.",
+        REQUEST_LABELS,
+    ),
+    "http_response_size_bytes": (
+        "histogram",
+        "Size of the (not streamed) response bodies, by endpoint and method.",
+        REQUEST_LABELS,
+    ),
+    "http_requests_in_progress": (
+        "gauge",
+        "Requests being handled, by endpoint and method.",
+        REQUEST_LABELS,
+    ),
+    "http_request_db_statements": (
+        "histogram",
+        "SQL statements executed per request, by endpoint and method.",
+        REQUEST_LABELS,
+    ),
+    "http_request_db_seconds": (
+        "histogram",
+        "Time spent executing SQL statements per request, by endpoint and method.",
+        REQUEST_LABELS,
+    ),
+    "db_slow_queries_total": (
+        "counter",
+        "SQL statements slower than SLOW_QUERY_THRESHOLD_MS, by calling function.",
+        ("caller",),
+    ),
+    "db_pool_checkout_wait_seconds": (
+        "histogram",
+        "Time spent waiting for a connection from the pool.",
+        (),
+    ),
+    "db_pool_checkout_timeouts_total": (
+        "counter",
+        "Connection checkouts that timed out (DB_POOL_TIMEOUT), answered with a 503.",
+        (),
+    ),
+    "db_pool_checked_out": (
+        "gauge",
+        "Connections checked out of the pools.",
+        (),
+    ),
+    "db_pool_overflow": (
+        "gauge",
+        "Connections opened beyond DB_POOL_SIZE (up to DB_MAX_OVERFLOW).",
+        (),
+    ),
+    "password_hash_seconds": (
+        "histogram",
+        "Time spent hashing / checking passwords, queue wait included, by operation.",
+        ("operation",),
+    ),
+    "password_hash_rejected_total": (
+        "counter",
+        "Password hashes rejected (503) past PASSWORD_HASH_QUEUE_LIMIT.",
+        (),
+    ),
+    "login_rate_limited_total": (
+        "counter",
+        "Login attempts rejected (429) by the per username / address limit.",
+        ("limit",),
+    ),
+}
+
+HISTOGRAM_BUCKETS = {
+    "http_request_duration_seconds": LATENCY_BUCKETS,
+    "http_response_size_bytes": SIZE_BUCKETS,
+    "http_request_db_statements": STATEMENT_BUCKETS,
+    "http_request_db_seconds": LATENCY_BUCKETS,
+    "db_pool_checkout_wait_seconds": CHECKOUT_WAIT_BUCKETS,
+    "password_hash_seconds": LATENCY_BUCKETS,
+}
+
+UNMATCHED_ENDPOINT = "<unmatched>"  # 404 / 405s: one label value whatever the path
+
+
+def multiprocess_dir():
+    """prometheus_client's multiprocess mode directory OR None"""
+    return os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv(
+        "prometheus_multiproc_dir"
+    )
+
+
+def create_metrics(registry):
+    """return {name: prometheus_client metric} of METRICS, in registry"""
+    metrics = {}
+    for name, (metric_type, help_text, label_names) in METRICS.items():
+        if metric_type == "counter":
+            metric = Counter(name, help_text, label_names, registry=registry)
+        elif metric_type == "histogram":
+            metric = Histogram(
+                name,
+                help_text,
+                label_names,
+                registry=registry,
+                buckets=HISTOGRAM_BUCKETS[name],
+            )
+        else:
+            # summed over the live processes in multiprocess mode
+            metric = Gauge(
+                name,
+                help_text,
+                label_names,
+                registry=registry,
+                multiprocess_mode="livesum",
+            )
+        metrics[name] = metric
+    return metrics
+
+
+class RequestTiming:
+    """time spent by the current request (g.request_timing), in seconds"""
+
+    __slots__ = ("labels", "started", "statements", "db", "serialization")
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db = 0.0
+        self.serialization = 0.0
+
+    @property
+    def route(self):
+        labels = dict(self.labels)
+        return f"{labels['method']} {labels['endpoint']}"
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.db * 1000:.2f};desc="{self.statements} statements", '
+            f"serialize;dur={self.serialization * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+
+
+def _current_timing():
+    return g.get("request_timing") if has_app_context() else None
+
+
+def parameter_shape(parameters, executemany=False):
+    """
+    types of the bound parameters, never their values, e.g.
+    "{user_id: int, limit: int}", "(int*3, str)" or "500 x (int, str)"
+    """
+    if executemany:
+        if not parameters:
+            return "[]"
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return (
+            "{"
+            + ", ".join(
+                f"{key}: {type(value).__name__}" for key, value in parameters.items()
+            )
+            + "}"
+        )
+
+    runs = []  # [type name, count] of consecutive parameters (IN lists)
+    for value in parameters or ():
+        type_name = type(value).__name__
+        if runs and runs[-1][0] == type_name:
+            runs[-1][1] += 1
+        else:
+            runs.append([type_name, 1])
+    return "(" + ", ".join(name if n == 1 else f"{name}*{n}" for name, n in runs) + ")"
+
+
+def calling_function():
+    """
+    return ("<module>.<function>", "<file>:<line>") of the innermost frame
+    of a service module (budget_app/services) on the stack, else of the
+    innermost budget_app frame, i.e. the code that ran the statement
+    """
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PACKAGE_DIR) and filename != THIS_FILE:
+            module = frame.f_globals.get("__name__", "?").rsplit(".", 1)[-1]
+            function = (
+                f"{module}.{frame.f_code.co_name}",
+                f"{os.path.basename(filename)}:{frame.f_lineno}",
+            )
+            if filename.startswith(SERVICES_DIR):
+                return function
+            fallback = fallback or function
+        frame = frame.f_back
+    return fallback or (UNKNOWN_CALLER, "")
+
+
+class QueryTimer:
+    """
+    before/after_cursor_execute listeners of an engine: time every SQL
+    statement, add it to the statement count and DB time of the request
+    running it, log (to the "budget_app.sql" logger) and count the ones
+    taking at least threshold seconds
+    """
+
+    def __init__(self, metrics, threshold):
+        self.metrics = metrics
+        self.threshold = threshold
+
+    def listen(self, engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(engine, "handle_error", self.handle_error)
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        timing = _current_timing()
+        if timing is not None:
+            timing.statements += 1
+            timing.db += elapsed
+        if elapsed >= self.threshold:
+            self.log_slow_query(statement, parameters, executemany, elapsed)
+
+    def handle_error(self, exception_context):
+        # the failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+    def log_slow_query(self, statement, parameters, executemany, elapsed):
+        function, location = calling_function()
+        slow_query_logger.warning(
+            "Slow query (%.1fms) in %s (%s), parameters %s: %s",
+            elapsed * 1000,
+            function,
+            location,
+            parameter_shape(parameters, executemany),
+            " ".join(statement.split())[:MAX_LOGGED_STATEMENT_LENGTH],
+        )
+        if has_app_context() and "metrics" in current_app.extensions:
+            self.metrics.inc("db_slow_queries_total", (("caller", function),))
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, adding the time spent building JSON responses
+    (returned dicts and jsonify) to the request's serialization time"""
+
+    def response(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = super().response(*args, **kwargs)
+        timing = _current_timing()
+        if timing is not None:
+            timing.serialization += time.perf_counter() - started
+        return response
+
+
+class RequestMetrics:
+    """
+    Flask extension (like budget_cache) holding the app's metrics registry
+    in app.extensions["metrics"] and recording every request of the app.
+    """
+
+    def init_app(self, app, db):
+        registry = CollectorRegistry()
+        app.extensions["metrics"] = {
+            "registry": registry,
+            "metrics": create_metrics(registry),
+        }
+
+        threshold_ms = app.config.get("SLOW_QUERY_THRESHOLD_MS")
+        if threshold_ms in (None, ""):
+            threshold_ms = DEFAULT_SLOW_QUERY_THRESHOLD_MS
+        query_timer = QueryTimer(self, float(threshold_ms) / 1000)
+        with app.app_context():
+            for engine in db.engines.values():
+                query_timer.listen(engine)
+
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def metric(self, name, labels):
+        metric = current_app.extensions["metrics"]["metrics"][name]
+        return metric.labels(**dict(labels)) if labels else metric
+
+    def inc(self, name, labels, amount=1.0):
+        """increment the counter (or gauge) name"""
+        self.metric(name, labels).inc(amount)
+
+    def set(self, name, labels, value):
+        """set the gauge name of this process (summed over the processes)"""
+        self.metric(name, labels).set(value)
+
+    def observe(self, name, labels, value):
+        """add value to the histogram name"""
+        self.metric(name, labels).observe(value)
+
+    def _before_request(self):
+        endpoint = request.url_rule.rule if request.url_rule else UNMATCHED_ENDPOINT
+        labels = (("endpoint", endpoint), ("method", request.method))
+        g.request_timing = RequestTiming(labels)
+        self.inc("http_requests_in_progress", labels)
+
+    def _after_request(self, response):
+        timing = g.get("request_timing")
+        if timing is None:
+            return response
+
+        elapsed = time.perf_counter() - timing.started
+        self.inc(
+            "http_requests_total",
+            timing.labels + (("status", str(response.status_code)),),
+        )
+        self.observe("http_request_duration_seconds", timing.labels, elapsed)
+        self.observe("http_request_db_statements", timing.labels, timing.statements)
+        self.observe("http_request_db_seconds", timing.labels, timing.db)
+        if not response.is_streamed and response.content_length is not None:
+            self.observe(
+                "http_response_size_bytes", timing.labels, response.content_length
+            )
+        response.headers["Server-Timing"] = timing.server_timing(elapsed)
+        request_timed.send(current_app._get_current_object(), timing=timing)
+        return response
+
+    def _teardown_request(self, exc):
+        timing = g.pop("request_timing", None)
+        if timing is not None:
+            self.inc("http_requests_in_progress", timing.labels, -1.0)
+
+    def registry(self):
+        """
+        the registry to scrape: the app's, or in multiprocess mode one
+        collecting the files of every worker process
+        """
+        if multiprocess_dir():
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return registry
+        return current_app.extensions["metrics"]["registry"]
+
+    def sample_value(self, name, labels=()):
+        """value of the sample name (e.g. "http_requests_total") OR None"""
+        return self.registry().get_sample_value(name, dict(labels))
+
+    def render(self):
+        """the collected metrics in the Prometheus text format"""
+        return generate_latest(self.registry()).decode()
@@ -0,0 +1,253 @@
+import re
+import unittest
+
+from budget_app import create_app
+from budget_app.extensions import db, request_metrics
+from budget_app.metrics import calling_function, parameter_shape
+from budget_app.models import Budget, User
+from budget_app.services.budget.budget_service import get_budget_by_budget_and_user_id
+
+
+def sample_value(text, sample):
+    """
+    value of the sample line starting with sample in the exposition text
+    (prometheus_client sorts the labels: endpoint, le, method, status)
+    """
+    match = re.search(rf"^{re.escape(sample)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+class RequestMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+                "OPS_TOKEN": "ops",
+            }
+        )
+        self.client = self.app.test_client()
+
+    def metrics_text(self):
+        response = self.client.get(
+            "/api/metrics", headers={"Authorization": "Bearer ops"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        return response.get_data(as_text=True)
+
+    def test_request_counters_and_histograms(self):
+        self.client.get("/api/health")
+        self.client.get("/api/health")
+        self.client.delete("/api/health")  # 405: no url rule matched
+
+        text = self.metrics_text()
+        labels = 'endpoint="/api/health",method="GET"'
+        self.assertEqual(
+            sample_value(text, f'http_requests_total{{{labels},status="200"}}'), 2
+        )
+        self.assertEqual(
+            sample_value(
+                text,
+                'http_requests_total{endpoint="<unmatched>",method="DELETE",status="405"}',
+            ),
+            1,
+        )
+        self.assertEqual(
+            sample_value(
+                text,
+                'http_request_duration_seconds_bucket{endpoint="/api/health",le="+Inf",method="GET"}',
+            ),
+            2,
+        )
+        self.assertEqual(
+            sample_value(text, f"http_request_duration_seconds_count{{{labels}}}"), 2
+        )
+        self.assertEqual(
+            sample_value(
+                text,
+                'http_response_size_bytes_bucket{endpoint="/api/health",le="100.0",method="GET"}',
+            ),
+            2,
+        )
+        # only the scrape itself is in progress
+        self.assertEqual(
+            sample_value(
+                text,
+                'http_requests_in_progress{endpoint="/api/health",method="GET"}',
+            ),
+            0,
+        )
+        self.assertEqual(
+            sample_value(
+                text,
+                'http_requests_in_progress{endpoint="/api/metrics",method="GET"}',
+            ),
+            1,
+        )
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+
+    def test_ops_token_required(self):
+        for route in ("/api/metrics", "/api/cache/stats"):
+            for headers in ({}, {"Authorization": "Bearer wrong"}):
+                response = self.client.get(route, headers=headers)
+                self.assertEqual(response.status_code, 401)
+
+        # no OPS_TOKEN: the routes are disabled
+        client = create_app({"TESTING": True, "OPS_TOKEN": None}).test_client()
+        for route in ("/api/metrics", "/api/cache/stats"):
+            response = client.get(route, headers={"Authorization": "Bearer "})
+            self.assertEqual(response.status_code, 404)
+
+    def test_histogram_buckets_are_cumulative(self):
+        labels = (("endpoint", "/x"), ("method", "GET"))
+        with self.app.app_context():
+            for value in (0.001, 0.02, 0.02, 30):
+                request_metrics.observe("http_request_duration_seconds", labels, value)
+            text = request_metrics.render()
+
+        bucket = (
+            'http_request_duration_seconds_bucket{endpoint="/x",le="%s",method="GET"}'
+        )
+        self.assertEqual(sample_value(text, bucket % "0.005"), 1)
+        self.assertEqual(sample_value(text, bucket % "0.025"), 3)
+        self.assertEqual(sample_value(text, bucket % "10.0"), 3)
+        self.assertEqual(sample_value(text, bucket % "+Inf"), 4)
+        self.assertAlmostEqual(
+            sample_value(
+                text, 'http_request_duration_seconds_sum{endpoint="/x",method="GET"}'
+            ),
+            30.041,
+        )
+
+    def test_server_timing(self):
+        with self.app.app_context():
+            db.create_all()
+
+        response = self.client.post(
+            "/api/auth/login", json={"username": "nobody", "password": "x"}
+        )
+        timings = dict(
+            re.match(r"(\w+);dur=([\d.]+)", part.strip()).groups()
+            for part in response.headers["Server-Timing"].split(",")
+        )
+        self.assertEqual(set(timings), {"db", "serialize", "total"})
+        self.assertIn("db;dur=", response.headers["Server-Timing"])
+        self.assertIn('desc="1 statements"', response.headers["Server-Timing"])
+        # the user lookup hit the database, the error message was serialized
+        self.assertGreater(float(timings["db"]), 0)
+        self.assertGreater(float(timings["serialize"]), 0)
+        self.assertGreaterEqual(
+            float(timings["total"]), float(timings["db"]) + float(timings["serialize"])
+        )
+        with self.app.app_context():
+            self.assertEqual(User.query.count(), 0)
+
+    def test_statements_per_request(self):
+        with self.app.app_context():
+            db.create_all()
+        self.client.post("/api/auth/login", json={"username": "a", "password": "x"})
+        self.client.get("/api/health")
+
+        text = self.metrics_text()
+        login = 'endpoint="/api/auth/login",le="%s",method="POST"'
+        health = 'endpoint="/api/health",le="%s",method="GET"'
+        statements = "http_request_db_statements_bucket{%s}"
+        self.assertEqual(sample_value(text, statements % (login % "0.0")), 0)
+        self.assertEqual(sample_value(text, statements % (login % "1.0")), 1)
+        self.assertEqual(
+            sample_value(
+                text,
+                'http_request_db_statements_sum{endpoint="/api/auth/login",method="POST"}',
+            ),
+            1,
+        )
+        self.assertEqual(sample_value(text, statements % (health % "0.0")), 1)
+        self.assertEqual(
+            sample_value(
+                text,
+                'http_request_db_seconds_count{endpoint="/api/health",method="GET"}',
+            ),
+            1,
+        )
+
+
+class SlowQueryLog(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+                "BUDGET_CACHE_BACKEND": "null",
+                "SLOW_QUERY_THRESHOLD_MS": 0,  # every statement is slow
+            }
+        )
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_logs_calling_service_function(self):
+        with self.assertLogs("budget_app.sql", "WARNING") as logs:
+            get_budget_by_budget_and_user_id(1, 10)
+
+        self.assertEqual(len(logs.output), 1)
+        message = logs.output[0]
+        self.assertIn(
+            "in budget_service.get_budget_by_budget_and_user_id (budget_service.py:",
+            message,
+        )
+        # budget id, user id, LIMIT, OFFSET: only the types are logged
+        self.assertIn("parameters (int*4): SELECT", message)
+        self.assertIn("WHERE budget.id = ? AND budget.user_id = ?", message)
+        self.assertNotIn("\n", message)
+
+        self.assertEqual(
+            request_metrics.sample_value(
+                "db_slow_queries_total",
+                (("caller", "budget_service.get_budget_by_budget_and_user_id"),),
+            ),
+            1,
+        )
+
+    def test_threshold(self):
+        app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SLOW_QUERY_THRESHOLD_MS": 60_000,
+            }
+        )
+        with app.app_context(), self.assertNoLogs("budget_app.sql"):
+            db.create_all()
+            Budget.query.all()
+
+    def test_calling_function_outside_services(self):
+        function, location = calling_function()
+        self.assertEqual(
+            function, "metrics_test.test_calling_function_outside_services"
+        )
+        self.assertTrue(location.startswith("metrics_test.py:"))
+
+    def test_parameter_shape(self):
+        self.assertEqual(
+            parameter_shape({"user_id": 1, "name": "x"}), "{user_id: int, name: str}"
+        )
+        self.assertEqual(
+            parameter_shape((1, 2, 3, "a", None)), "(int*3, str, NoneType)"
+        )
+        self.assertEqual(parameter_shape(()), "()")
+        self.assertEqual(
+            parameter_shape([(1, "a"), (2, "b")], executemany=True),
+            "2 x (int, str)",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,39 +1,85 @@
-from .extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from .extensions import db, password_hasher
 
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
-    budgets = db.relationship("Budget", backref="user", cascade="all, delete")
+    # budget rows are removed by the FK's ON DELETE CASCADE, not loaded and
+    # deleted one by one by the ORM
+    budgets = db.relationship(
+        "Budget", backref="user", cascade="all, delete", passive_deletes=True
+    )
 
+    # hashed in the password_hasher's processes (PASSWORD_HASH_METHOD)
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
 
 
 class Budget(db.Model):
     __table_args__ = (
         db.UniqueConstraint("user_id", "name", name="unique_budget_name_per_user"),
+        # budgets of a user, in keyset (id) order
+        db.Index("ix_budget_user_id_id", "user_id", "id"),
     )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False
+    )
     name = db.Column(db.String(100), nullable=False)
     month_duration = db.Column(db.Integer, nullable=False)  # 1 = monthly, 12 = yearly
     gross_income = db.Column(db.Numeric(11, 2), nullable=False)
-    items = db.relationship("BudgetItem", backref="budget", cascade="all, delete")
+    # bumped by every write to the budget or its items, identifies the
+    # representation for ETags / conditional GETs. As the version_id_col the
+    # ORM only updates the row if its version is still the one loaded
+    # (optimistic concurrency, StaleDataError otherwise)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    # materialized totals of the budget's items, kept up to date (delta
+    # arithmetic) by every item write, rebuilt by the rebuild-totals command
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    deductions_total = db.Column(
+        db.Numeric(14, 2), nullable=False, default=0, server_default="0"
+    )
+    bills_total = db.Column(
+        db.Numeric(14, 2), nullable=False, default=0, server_default="0"
+    )
+    savings_total = db.Column(
+        db.Numeric(14, 2), nullable=False, default=0, server_default="0"
+    )
+    items = db.relationship(
+        "BudgetItem",
+        backref="budget",
+        cascade="all, delete",
+        passive_deletes=True,  # ON DELETE CASCADE removes the items
+        order_by="BudgetItem.id",
+    )
+
+    __mapper_args__ = {"version_id_col": version}
 
     # def __repr__(self):
     #     return f'{self.name.capitalize()} Budget'
 
 
 class BudgetItem(db.Model):
+    __table_args__ = (
+        # items of a budget, in keyset (id) order
+        db.Index("ix_budget_item_budget_id_id", "budget_id", "id"),
+        # covers SUM(total) per budget_id, category (rebuild_budget_totals)
+        # without touching the table
+        db.Index("ix_budget_item_budget_id_category", "budget_id", "category", "total"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    budget_id = db.Column(db.Integer, db.ForeignKey("budget.id"), nullable=False)
+    budget_id = db.Column(
+        db.Integer, db.ForeignKey("budget.id", ondelete="CASCADE"), nullable=False
+    )
     name = db.Column(db.String(50), nullable=False)
     category = db.Column(db.String(30), nullable=False)
     total = db.Column(db.Numeric(11, 2), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,175 @@
+import unittest
+
+from budget_app import create_app
+from budget_app.models import Budget, BudgetItem, User
+from budget_app.services.budget.aggregate import rebuild_budget_totals
+from budget_app.services.budget.budget_service import (
+    get_budget_by_budget_and_user_id,
+    get_budgets_by_user_id,
+)
+from .extensions import db
+from .testing import QueryCounter, explain_query_plan
+
+
+class IndexUsage(unittest.TestCase):
+    """
+    Runs the service queries for each hot access pattern and checks with
+    EXPLAIN QUERY PLAN that the planner searches an index instead of
+    scanning the budget / budget_item tables.
+    """
+
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+                # plans of the database queries, not of cache hits
+                "BUDGET_CACHE_BACKEND": "null",
+            }
+        )
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all(
+            [User(id=10, username="user_10", password_hash="not-a-hash")]
+        )
+
+        for budget_number in range(3):
+            budget = Budget(
+                user_id=10,
+                name=f"budget_{budget_number}",
+                month_duration=1,
+                gross_income=1000,
+            )
+            budget.items = [
+                BudgetItem(name="Rent", category="bills", total=1200),
+                BudgetItem(name="401k", category="deductions", total=250),
+            ]
+            db.session.add(budget)
+        db.session.commit()
+        db.session.expunge_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def query_plans(self, service_call):
+        """run service_call, return the query plan of every statement it issued"""
+        with QueryCounter() as counter:
+            service_call()
+
+        return [
+            explain_query_plan(statement, parameters)
+            for statement, parameters in zip(counter.statements, counter.parameters)
+        ]
+
+    def test_budgets_by_user_id(self):
+        budgets_plan, items_plan = self.query_plans(
+            lambda: get_budgets_by_user_id(10, limit=2, cursor=1)
+        )
+        self.assertIn("USING INDEX ix_budget_user_id_id", budgets_plan)
+        self.assertIn("ix_budget_item_budget_id_id", items_plan)
+
+    def test_budget_by_budget_and_user_id(self):
+        (plan,) = self.query_plans(lambda: get_budget_by_budget_and_user_id(1, 10))
+        self.assertIn("SEARCH budget USING INTEGER PRIMARY KEY", plan)
+        self.assertIn("USING INDEX ix_budget_item_budget_id_id", plan)
+        self.assertNotIn("SCAN budget_item", plan)
+
+    def test_budget_items_page(self):
+        budget_plan, items_plan = self.query_plans(
+            lambda: get_budget_by_budget_and_user_id(1, 10, item_limit=1, item_cursor=1)
+        )
+        self.assertIn("INTEGER PRIMARY KEY", budget_plan)
+        self.assertIn("USING INDEX ix_budget_item_budget_id_id", items_plan)
+
+    def test_budget_by_user_id_and_name(self):
+        (plan,) = self.query_plans(
+            lambda: Budget.query.filter_by(user_id=10, name="budget_1").first()
+        )
+        self.assertIn("SEARCH budget USING INDEX", plan)
+
+    def test_budget_item_by_id_and_budget_id(self):
+        (plan,) = self.query_plans(
+            lambda: BudgetItem.query.filter_by(id=1, budget_id=1).first()
+        )
+        self.assertIn("SEARCH budget_item USING INTEGER PRIMARY KEY", plan)
+
+    def test_rebuild_budget_totals(self):
+        # every budget is checked (SCAN budget), its items summed per category
+        (plan,) = self.query_plans(lambda: rebuild_budget_totals(fix=False))
+        self.assertIn(
+            "SEARCH budget_item USING COVERING INDEX ix_budget_item_budget_id_category",
+            plan,
+        )
+        self.assertNotIn("SCAN budget_item", plan)
+
+
+class OnDeleteCascade(unittest.TestCase):
+    """
+    Deleting a user / budget removes its budgets / items with the foreign
+    keys' ON DELETE CASCADE: the ORM doesn't load the children (passive_deletes)
+    """
+
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            }
+        )
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.user = User(username="foo", password_hash="not-a-hash")
+        self.user.budgets = [
+            Budget(
+                name=f"budget_{budget_number}",
+                month_duration=1,
+                gross_income=1000,
+                items=[
+                    BudgetItem(name=f"item_{item_number}", category="bills", total=1)
+                    for item_number in range(10)
+                ],
+            )
+            for budget_number in range(3)
+        ]
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_delete_user(self):
+        user = db.session.get(User, self.user.id)
+        with QueryCounter() as counter:
+            db.session.delete(user)
+            db.session.commit()
+
+        self.assertEqual(["DELETE FROM user WHERE user.id = ?"], counter.statements)
+        self.assertEqual(0, Budget.query.count())
+        self.assertEqual(0, BudgetItem.query.count())
+
+    def test_delete_budget(self):
+        budget = Budget.query.first()
+        with QueryCounter() as counter:
+            db.session.delete(budget)
+            db.session.commit()
+
+        # version_id_col: only deleted if it's still at the version loaded
+        self.assertEqual(
+            ["DELETE FROM budget WHERE budget.id = ? AND budget.version = ?"],
+            counter.statements,
+        )
+        self.assertEqual(2, Budget.query.count())
+        self.assertEqual(20, BudgetItem.query.count())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
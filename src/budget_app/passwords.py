@@ -0,0 +1,230 @@
+"""
+Password hashing off the request threads.
+
+Hashing a password (scrypt by default) takes tens of milliseconds of CPU:
+a burst of logins / registrations hashing in the request threads would keep
+every thread of the worker busy and starve the budget routes. Hashes are
+computed in a pool of PASSWORD_HASH_WORKERS processes instead (per worker
+process, default 1, 0: hash in the request thread), the request thread
+waits for the result without holding a CPU.
+
+At most PASSWORD_HASH_QUEUE_LIMIT hashes (default 16) wait for a free
+hashing process: further logins / registrations get a 503 with a
+Retry-After header right away (PasswordHashQueueFull, re-raised past the
+handlers' generic except), instead of queueing for longer than a client
+would wait.
+
+The hashing processes start on the first hash, or right after a server
+worker is forked (gunicorn_conf.post_worker_init: password_hasher.start())
+so the first login doesn't wait for them, and stop when it exits.
+
+PASSWORD_HASH_METHOD is werkzeug's method string, e.g. "scrypt:32768:8:1"
+(the default) or "pbkdf2:sha256:1000000". The method and its parameters are
+stored in each hash (generate_password_hash's "<method>$<salt>$<hash>"), so
+raising the cost doesn't invalidate existing passwords: a hash made with
+other parameters is replaced on the next successful login (see
+auth_service.authenticate_user).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+from threading import BoundedSemaphore, Lock
+import time
+
+from flask import current_app
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+DEFAULT_METHOD = "scrypt"
+DEFAULT_WORKERS = 1
+DEFAULT_QUEUE_LIMIT = 16
+DEFAULT_RETRY_AFTER_SECONDS = 1
+SCRYPT_DEFAULTS = (2**15, 8, 1)  # werkzeug's n, r, p
+
+
+class PasswordHashQueueFull(Exception):
+    pass
+
+
+def normalize_method(method):
+    """
+    return method with werkzeug's defaults filled in, as it is stored in the
+    hashes (e.g. "scrypt" -> "scrypt:32768:8:1") OR raise ValueError
+    """
+    name, *args = (method or DEFAULT_METHOD).strip().split(":")
+    try:
+        if name == "scrypt" and len(args) in (0, 3):
+            n, r, p = map(int, args) if args else SCRYPT_DEFAULTS
+            return f"scrypt:{n}:{r}:{p}"
+        if name == "pbkdf2" and len(args) <= 2:
+            hash_name = args[0] if args else "sha256"
+            iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+            return f"pbkdf2:{hash_name}:{iterations}"
+    except ValueError:
+        pass
+    raise ValueError(
+        f"Invalid PASSWORD_HASH_METHOD: '{method}'. "
+        "Use scrypt[:<n>:<r>:<p>] or pbkdf2[:<hash name>[:<iterations>]]"
+    )
+
+
+# (pid, workers) -> executor, shared by the apps of a process (e.g. the tests
+# create one per test case). Keyed by pid: a forked server worker starts its
+# own pool instead of using the master's
+_executors = {}
+_executors_lock = Lock()
+
+
+def _executor(workers):
+    key = (os.getpid(), workers)
+    with _executors_lock:
+        if key not in _executors:
+            # spawned (not forked) processes: forking copies the locks of the
+            # request threads' process, possibly held
+            _executors[key] = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executors[key]
+
+
+def _discard_executor(workers, executor):
+    """a hashing process died: the next hash starts a new pool"""
+    with _executors_lock:
+        if _executors.get((os.getpid(), workers)) is executor:
+            del _executors[(os.getpid(), workers)]
+
+
+def shutdown_executors():
+    """stop this process' hashing processes (a server worker exiting)"""
+    with _executors_lock:
+        for (pid, workers), executor in list(_executors.items()):
+            if pid == os.getpid():
+                executor.shutdown(wait=True, cancel_futures=True)
+                del _executors[(pid, workers)]
+
+
+class InlineHashBackend:
+    """hash in the calling (request) thread"""
+
+    def start(self):
+        pass
+
+    def run(self, fn, *args):
+        return fn(*args)
+
+
+class ProcessPoolHashBackend:
+    """
+    hash in a pool of workers processes, with at most queue_limit hashes
+    waiting for one of them (PasswordHashQueueFull beyond)
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_limit=DEFAULT_QUEUE_LIMIT):
+        if workers < 1 or queue_limit < 0:
+            raise ValueError(
+                "Password hash workers must be at least 1, queue limit at least 0."
+            )
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._slots = BoundedSemaphore(workers + queue_limit)
+
+    def start(self):
+        """start the hashing processes now instead of on the first hash"""
+        executor = _executor(self.workers)
+        # the pool spawns a process per task submitted while none is idle
+        for future in [executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashQueueFull(
+                f"{self.queue_limit} password hashes already waiting for a process."
+            )
+        try:
+            executor = _executor(self.workers)
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                _discard_executor(self.workers, executor)
+                raise
+        finally:
+            self._slots.release()
+
+
+class PasswordHasher:
+    """
+    Flask extension (like budget_cache) holding the app's hashing backend in
+    app.extensions["password_hasher"] and the hash method in
+    app.extensions["password_hash_method"].
+    """
+
+    def init_app(self, app, metrics):
+        self.metrics = metrics
+        app.extensions["password_hash_method"] = normalize_method(
+            app.config.get("PASSWORD_HASH_METHOD")
+        )
+
+        workers = app.config.get("PASSWORD_HASH_WORKERS")
+        workers = DEFAULT_WORKERS if workers in (None, "") else int(workers)
+        queue_limit = app.config.get("PASSWORD_HASH_QUEUE_LIMIT")
+        queue_limit = (
+            DEFAULT_QUEUE_LIMIT if queue_limit in (None, "") else int(queue_limit)
+        )
+        app.extensions["password_hasher"] = (
+            ProcessPoolHashBackend(workers, queue_limit)
+            if workers
+            else InlineHashBackend()
+        )
+        app.register_error_handler(PasswordHashQueueFull, hash_queue_full_response)
+
+    @property
+    def backend(self):
+        return current_app.extensions["password_hasher"]
+
+    def start(self):
+        """start the app's hashing processes (a server worker just forked)"""
+        self.backend.start()
+
+    @property
+    def method(self):
+        return current_app.extensions["password_hash_method"]
+
+    def _run(self, operation, fn, *args):
+        started = time.perf_counter()
+        try:
+            result = self.backend.run(fn, *args)
+        except PasswordHashQueueFull:
+            self.metrics.inc("password_hash_rejected_total", ())
+            raise
+        # queue wait included: the time the request spent on the hash
+        self.metrics.observe(
+            "password_hash_seconds",
+            (("operation", operation),),
+            time.perf_counter() - started,
+        )
+        return result
+
+    def hash(self, password):
+        return self._run("hash", generate_password_hash, password, self.method)
+
+    def check(self, password_hash, password):
+        return self._run("check", check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when password_hash was made with another method / parameters"""
+        return password_hash.split("$", 1)[0] != self.method
+
+
+def hash_queue_full_response(e):
+    """Flask error handler: PASSWORD_HASH_QUEUE_LIMIT hashes already waiting"""
+    print(e)
+    return (
+        {"message": "The server is busy, please retry shortly."},
+        503,
+        {"Retry-After": str(DEFAULT_RETRY_AFTER_SECONDS)},
+    )
@@ -0,0 +1,111 @@
+import os
+import unittest
+
+from budget_app import create_app
+from budget_app.extensions import db, password_hasher, request_metrics
+from budget_app.passwords import (
+    InlineHashBackend,
+    PasswordHashQueueFull,
+    ProcessPoolHashBackend,
+    _executors,
+    normalize_method,
+    shutdown_executors,
+)
+from budget_app.services.auth.auth_service import create_user
+
+FAST_METHOD = "pbkdf2:sha256:1000"
+
+
+class NormalizeMethod(unittest.TestCase):
+    def test_defaults_filled_in(self):
+        self.assertEqual(normalize_method(None), "scrypt:32768:8:1")
+        self.assertEqual(normalize_method("scrypt:16384:8:2"), "scrypt:16384:8:2")
+        self.assertEqual(normalize_method("pbkdf2:sha512"), "pbkdf2:sha512:1000000")
+        self.assertEqual(normalize_method(FAST_METHOD), FAST_METHOD)
+
+    def test_invalid(self):
+        for method in ("md5", "scrypt:1", "scrypt:a:b:c", "pbkdf2:sha256:many"):
+            with self.assertRaisesRegex(ValueError, "Invalid PASSWORD_HASH_METHOD"):
+                normalize_method(method)
+
+
+class PasswordHasherTest(unittest.TestCase):
+    def create_app(self, **config):
+        app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "PASSWORD_HASH_METHOD": FAST_METHOD,
+                **config,
+            }
+        )
+        context = app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+        return app
+
+    def test_hash_in_another_process(self):
+        app = self.create_app()
+        backend = app.extensions["password_hasher"]
+        self.assertIsInstance(backend, ProcessPoolHashBackend)
+        self.assertNotEqual(backend.run(os.getpid), os.getpid())
+
+        password_hash = password_hasher.hash("bar")
+        self.assertTrue(password_hash.startswith(f"{FAST_METHOD}$"))
+        self.assertTrue(password_hasher.check(password_hash, "bar"))
+        self.assertFalse(password_hasher.check(password_hash, "baz"))
+        self.assertFalse(password_hasher.needs_rehash(password_hash))
+
+    def test_start(self):
+        self.create_app(PASSWORD_HASH_WORKERS="3")
+        self.addCleanup(shutdown_executors)
+        password_hasher.start()
+
+        # every hashing process is running before the first hash
+        executor = _executors[(os.getpid(), 3)]
+        self.assertEqual(len(executor._processes), 3)
+
+    def test_inline(self):
+        app = self.create_app(PASSWORD_HASH_WORKERS="0")
+        self.assertIsInstance(app.extensions["password_hasher"], InlineHashBackend)
+        self.assertTrue(password_hasher.check(password_hasher.hash("bar"), "bar"))
+
+    def test_queue_full_is_503(self):
+        app = self.create_app(PASSWORD_HASH_QUEUE_LIMIT="0")
+        db.create_all()
+        create_user("foo", "bar")
+        db.session.remove()
+
+        # the one hashing process is taken, no hash may wait for it
+        backend = app.extensions["password_hasher"]
+        backend._slots.acquire()
+        try:
+            with self.assertRaises(PasswordHashQueueFull):
+                password_hasher.hash("bar")
+            response = app.test_client().post(
+                "/api/auth/login", json={"username": "foo", "password": "bar"}
+            )
+        finally:
+            backend._slots.release()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        with app.app_context():
+            self.assertEqual(
+                request_metrics.sample_value("password_hash_rejected_total"), 2
+            )
+
+        response = app.test_client().post(
+            "/api/auth/login", json={"username": "foo", "password": "bar"}
+        )
+        self.assertEqual(response.status_code, 200)
+        db.session.remove()
+        db.drop_all()
+
+    def test_invalid_config(self):
+        with self.assertRaisesRegex(ValueError, "queue limit"):
+            self.create_app(PASSWORD_HASH_QUEUE_LIMIT="-1")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
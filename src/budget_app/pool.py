@@ -0,0 +1,158 @@
+"""
+Database connection pool: configured from the environment, monitored in
+the request metrics (see metrics.py).
+
+SQLALCHEMY_ENGINE_OPTIONS are built from these env vars (unset: SQLAlchemy's
+default), per worker process:
+- DB_POOL_SIZE: connections kept open (default 5)
+- DB_MAX_OVERFLOW: extra connections opened under load, closed once
+  returned (default 10)
+- DB_POOL_TIMEOUT: seconds a request waits for a connection before failing
+  (default 30)
+- DB_POOL_RECYCLE: seconds after which a connection is replaced (default
+  never), keep it below the server's / proxy's idle timeout
+- DB_POOL_PRE_PING: test connections with a ping before using them (default
+  off), so connections dropped by the server are replaced instead of failing
+
+A request that times out waiting for a connection gets a 503 with a
+Retry-After header (DB_POOL_RETRY_AFTER seconds, default 1) right away:
+the handlers re-raise PoolTimeoutError past their generic except, for
+pool_timeout_response to answer it.
+"""
+
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from .extensions import request_metrics
+
+DEFAULT_RETRY_AFTER_SECONDS = 1
+TRUE_VALUES = ["1", "true", "yes", "on"]
+FALSE_VALUES = ["0", "false", "no", "off"]
+
+
+def parse_bool(value):
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValueError(
+        f"'{value}' is not a boolean, use one of: {', '.join(TRUE_VALUES + FALSE_VALUES)}"
+    )
+
+
+# env var -> (engine option, parse, only valid for a QueuePool)
+POOL_ENV_OPTIONS = {
+    "DB_POOL_SIZE": ("pool_size", int, True),
+    "DB_MAX_OVERFLOW": ("max_overflow", int, True),
+    "DB_POOL_TIMEOUT": ("pool_timeout", float, True),
+    "DB_POOL_RECYCLE": ("pool_recycle", int, False),
+    "DB_POOL_PRE_PING": ("pool_pre_ping", parse_bool, False),
+}
+
+
+def _is_sqlite_memory(database_url):
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def engine_options_from_env(environ, database_url):
+    """
+    return SQLALCHEMY_ENGINE_OPTIONS for database_url from the DB_POOL_*
+    variables set in environ, OR raise ValueError on an invalid value.
+    An in-memory SQLite database (the tests) has a single connection: only
+    DB_POOL_RECYCLE and DB_POOL_PRE_PING apply to it.
+    """
+    if not database_url:
+        return {}
+    queue_pool = not _is_sqlite_memory(database_url)
+    options = {"poolclass": MonitoredQueuePool} if queue_pool else {}
+    for env_var, (option, parse, queue_pool_only) in POOL_ENV_OPTIONS.items():
+        value = environ.get(env_var)
+        if value in (None, "") or (queue_pool_only and not queue_pool):
+            continue
+        try:
+            options[option] = parse(value)
+        except ValueError as e:
+            raise ValueError(f"Invalid {env_var}: {e}") from e
+    return options
+
+
+class MonitoredQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _record_pool_metric(request_metrics.inc, "db_pool_checkout_timeouts_total")
+            raise
+        finally:
+            _record_pool_metric(
+                request_metrics.observe,
+                "db_pool_checkout_wait_seconds",
+                time.perf_counter() - started,
+            )
+
+
+def _record_pool_metric(record, name, *args):
+    # connections are checked out / in by requests and CLI commands, which
+    # run in an app context: there's no metrics storage to write to outside
+    if has_app_context() and "metrics" in current_app.extensions:
+        record(name, (), *args)
+
+
+def monitor_pool(engine):
+    """keep the checked out / overflow gauges of a QueuePool up to date"""
+    if not isinstance(engine.pool, QueuePool):
+        return  # e.g. the single connection StaticPool of the tests
+
+    def set_gauges(checked_out, overflow):
+        _record_pool_metric(request_metrics.set, "db_pool_checked_out", checked_out)
+        _record_pool_metric(request_metrics.set, "db_pool_overflow", max(overflow, 0))
+
+    # engine.pool is looked up on every event: engine.dispose() (e.g. in a
+    # forked worker) replaces it, keeping its listeners
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool = engine.pool
+        set_gauges(pool.checkedout(), pool.overflow())
+
+    def on_checkin(dbapi_connection, connection_record):
+        # sent before the connection is returned: it is still counted as
+        # checked out, and is closed (overflow - 1) when the pool is full
+        pool = engine.pool
+        discarded = pool.checkedin() >= pool.size()
+        set_gauges(pool.checkedout() - 1, pool.overflow() - discarded)
+
+    event.listen(engine.pool, "checkout", on_checkout)
+    event.listen(engine.pool, "checkin", on_checkin)
+
+
+def pool_timeout_response(e):
+    """Flask error handler: no connection freed up in DB_POOL_TIMEOUT seconds"""
+    print(e)
+    retry_after = current_app.config.get("DB_POOL_RETRY_AFTER")
+    if retry_after in (None, ""):
+        retry_after = DEFAULT_RETRY_AFTER_SECONDS
+    return (
+        {"message": "The server is busy, please retry shortly."},
+        503,
+        {"Retry-After": str(int(retry_after))},
+    )
+
+
+def init_pool(app, db):
+    """monitor the app's engines' pools, answer pool timeouts with a 503"""
+    with app.app_context():
+        for engine in db.engines.values():
+            monitor_pool(engine)
+    app.register_error_handler(PoolTimeoutError, pool_timeout_response)
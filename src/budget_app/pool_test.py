@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+from budget_app import create_app
+from budget_app.extensions import db, request_metrics
+from budget_app.models import User
+from budget_app.pool import MonitoredQueuePool, engine_options_from_env
+
+
+class EngineOptionsFromEnv(unittest.TestCase):
+    ENVIRON = {
+        "DB_POOL_SIZE": "20",
+        "DB_MAX_OVERFLOW": "5",
+        "DB_POOL_TIMEOUT": "2.5",
+        "DB_POOL_RECYCLE": "1800",
+        "DB_POOL_PRE_PING": "true",
+    }
+
+    def test_all_options(self):
+        self.assertEqual(
+            engine_options_from_env(
+                self.ENVIRON, "postgresql://user@localhost/budget_db"
+            ),
+            {
+                "poolclass": MonitoredQueuePool,
+                "pool_size": 20,
+                "max_overflow": 5,
+                "pool_timeout": 2.5,
+                "pool_recycle": 1800,
+                "pool_pre_ping": True,
+            },
+        )
+
+    def test_unset(self):
+        self.assertEqual(
+            engine_options_from_env(
+                {"DB_POOL_SIZE": ""}, "postgresql://user@localhost/budget_db"
+            ),
+            {"poolclass": MonitoredQueuePool},
+        )
+        self.assertEqual(engine_options_from_env(self.ENVIRON, None), {})
+
+    def test_sqlite_memory(self):
+        # single connection pool: no size / overflow / timeout
+        self.assertEqual(
+            engine_options_from_env(self.ENVIRON, "sqlite://"),
+            {"pool_recycle": 1800, "pool_pre_ping": True},
+        )
+
+    def test_invalid(self):
+        with self.assertRaisesRegex(ValueError, "Invalid DB_POOL_SIZE"):
+            engine_options_from_env({"DB_POOL_SIZE": "many"}, "sqlite:///budget.db")
+        with self.assertRaisesRegex(ValueError, "Invalid DB_POOL_PRE_PING"):
+            engine_options_from_env({"DB_POOL_PRE_PING": "maybe"}, "sqlite://")
+
+
+class PoolExhausted(unittest.TestCase):
+    """a single connection pool whose connection is held by the test"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.database_path = os.path.join(directory, "pool_test.db")
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{self.database_path}",
+                "SQLALCHEMY_ENGINE_OPTIONS": {
+                    "poolclass": MonitoredQueuePool,
+                    "pool_size": 1,
+                    "max_overflow": 0,
+                    "pool_timeout": 0.01,
+                },
+                "DB_POOL_RETRY_AFTER": "2",
+                "OPS_TOKEN": "ops",
+            }
+        )
+        self.client = self.app.test_client()
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.context.pop()
+        os.remove(self.database_path)
+        os.rmdir(os.path.dirname(self.database_path))
+
+    def metric(self, name):
+        return request_metrics.sample_value(name)
+
+    def test_checkout_timeout_is_503(self):
+        with db.engine.connect():
+            self.assertEqual(self.metric("db_pool_checked_out"), 1)
+            with self.client.session_transaction() as client_session:
+                client_session["user_id"] = {"id": 1, "username": "foo"}
+            response = self.client.get("/api/budgets")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "2")
+        self.assertEqual(
+            response.get_json(),
+            {"message": "The server is busy, please retry shortly."},
+        )
+        self.assertEqual(self.metric("db_pool_checkout_timeouts_total"), 1)
+        self.assertEqual(self.metric("db_pool_checked_out"), 0)
+
+    def test_checkout_wait_and_gauges(self):
+        response = self.client.post(
+            "/api/auth/login", json={"username": "nobody", "password": "x"}
+        )
+        self.assertEqual(response.status_code, 401)
+        # the request ran in the test's app context: its session is still open
+        self.assertEqual(self.metric("db_pool_checked_out"), 1)
+        db.session.remove()
+
+        text = self.client.get(
+            "/api/metrics", headers={"Authorization": "Bearer ops"}
+        ).get_data(as_text=True)
+        self.assertIn("db_pool_checkout_wait_seconds_count ", text)
+        self.assertIn("db_pool_checked_out 0.0", text)
+        self.assertIn("db_pool_overflow 0.0", text)
+        self.assertEqual(User.query.count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,222 @@
+"""
+Login rate limiting: token buckets per username and per client address.
+
+Every login attempt checks the password hash (see passwords.py), tens of
+milliseconds of CPU: a credential stuffing burst would take the CPUs from
+every other route. Each username and each client address gets a bucket of
+<attempts> tokens, refilled at <attempts> per <seconds>; an attempt takes a
+token from both, an attempt finding one of them empty is answered with a
+429 (Retry-After: seconds until a token is back) before the user is looked
+up or any password is hashed.
+
+Config (<attempts>/<seconds>, "off" disables the limit):
+- LOGIN_RATE_LIMIT_PER_USER: default 10/60
+- LOGIN_RATE_LIMIT_PER_ADDRESS: default 100/60 (request.remote_addr: behind
+  a reverse proxy, let werkzeug's ProxyFix set it from X-Forwarded-For)
+
+The buckets are stored (LOGIN_RATE_LIMIT_STORE):
+- unset (default): in this process' memory (at most MAX_MEMORY_BUCKETS,
+  least recently used dropped), each worker process limits on its own
+- a file path: in an SQLite database shared by the worker processes (and
+  servers) using the same file
+
+Rejections are counted in login_rate_limited_total (/api/metrics).
+"""
+
+from collections import OrderedDict
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+DEFAULT_PER_USER = "10/60"
+DEFAULT_PER_ADDRESS = "100/60"
+DISABLED_VALUES = ["off", "0", "none"]
+MAX_MEMORY_BUCKETS = 100_000
+SQLITE_TIMEOUT_SECONDS = 5
+PURGE_EVERY = 1000  # takes between deletions of the full buckets
+
+
+class Limit:
+    """<attempts> per <seconds>: a bucket of attempts tokens refilled at that rate"""
+
+    def __init__(self, attempts, seconds):
+        if attempts < 1 or seconds <= 0:
+            raise ValueError("A limit needs at least 1 attempt per positive seconds.")
+        self.capacity = attempts
+        self.rate = attempts / seconds
+
+    @classmethod
+    def parse(cls, config_key, value):
+        """ "10/60" -> Limit(10, 60), "off" -> None OR raise ValueError"""
+        if value.strip().lower() in DISABLED_VALUES:
+            return None
+        attempts, _, seconds = value.partition("/")
+        try:
+            return cls(int(attempts), float(seconds))
+        except ValueError as e:
+            raise ValueError(
+                f"Invalid {config_key}: '{value}', use <attempts>/<seconds> or off"
+            ) from e
+
+
+def take_token(state, now, limit):
+    """
+    (tokens, updated_at) of a bucket (None: never used, full) ->
+    (new state, None) when a token was taken OR (new state, seconds until
+    a token is back) when the bucket is empty
+    """
+    if state is None:
+        tokens = limit.capacity
+    else:
+        tokens, updated_at = state
+        tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+    if tokens >= 1:
+        return (tokens - 1, now), None
+    return (tokens, now), (1 - tokens) / limit.rate
+
+
+class MemoryBucketStore:
+    """Thread safe buckets of this process only, the least recent dropped"""
+
+    def __init__(self, max_buckets=MAX_MEMORY_BUCKETS, clock=None):
+        self.max_buckets = max_buckets
+        self.clock = clock or time.monotonic
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key, limit):
+        with self._lock:
+            state, retry_after = take_token(self._buckets.get(key), self.clock(), limit)
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            # a dropped bucket starts over full: only lenient
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class SQLiteBucketStore:
+    """
+    Buckets in an SQLite file, shared by every process using it: each take
+    is one IMMEDIATE (write locked) transaction. Buckets back to full are
+    deleted every PURGE_EVERY takes.
+    """
+
+    def __init__(self, path, clock=None):
+        self.path = path
+        self.clock = clock or time.time  # shared by the processes
+        self._local = threading.local()
+        self._takes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS login_bucket ("
+            " key TEXT PRIMARY KEY, tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        """this thread's connection, a new one in a forked worker process"""
+        pid, connection = getattr(self._local, "connection", (None, None))
+        if pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=SQLITE_TIMEOUT_SECONDS, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def take(self, key, limit):
+        connection = self._connection()
+        now = self.clock()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated_at FROM login_bucket WHERE key = ?", (key,)
+            ).fetchone()
+            (tokens, updated_at), retry_after = take_token(row, now, limit)
+            connection.execute(
+                "INSERT INTO login_bucket (key, tokens, updated_at, full_at)"
+                " VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET"
+                " tokens = excluded.tokens, updated_at = excluded.updated_at,"
+                " full_at = excluded.full_at",
+                (
+                    key,
+                    tokens,
+                    updated_at,
+                    updated_at + (limit.capacity - tokens) / limit.rate,
+                ),
+            )
+            self._takes += 1
+            if self._takes % PURGE_EVERY == 0:
+                connection.execute(
+                    "DELETE FROM login_bucket WHERE full_at <= ?", (now,)
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def count(self):
+        return (
+            self._connection()
+            .execute("SELECT count(*) FROM login_bucket")
+            .fetchone()[0]
+        )
+
+
+class LoginRateLimiter:
+    """
+    Flask extension (like password_hasher) holding the app's bucket store
+    and limits in app.extensions["login_rate_limiter"].
+    """
+
+    def init_app(self, app, metrics):
+        self.metrics = metrics
+        path = app.config.get("LOGIN_RATE_LIMIT_STORE")
+        app.extensions["login_rate_limiter"] = {
+            "store": SQLiteBucketStore(path) if path else MemoryBucketStore(),
+            "username": Limit.parse(
+                "LOGIN_RATE_LIMIT_PER_USER",
+                app.config.get("LOGIN_RATE_LIMIT_PER_USER") or DEFAULT_PER_USER,
+            ),
+            "address": Limit.parse(
+                "LOGIN_RATE_LIMIT_PER_ADDRESS",
+                app.config.get("LOGIN_RATE_LIMIT_PER_ADDRESS") or DEFAULT_PER_ADDRESS,
+            ),
+        }
+
+    def check(self, username, address):
+        """
+        take a token from the buckets of address and username, return None
+        OR the seconds until the attempt may be retried when one is empty
+        """
+        limiter = current_app.extensions["login_rate_limiter"]
+        # the address first: a stuffing run over many usernames empties it
+        # without filling the store with buckets of one attempt
+        for key_type, key in (("address", address), ("username", username.lower())):
+            limit = limiter[key_type]
+            if limit is None or not key:
+                continue
+            try:
+                retry_after = limiter["store"].take(f"{key_type}:{key}", limit)
+            except sqlite3.Error as e:
+                # the store is unavailable: don't lock everyone out
+                print(e)
+                continue
+            if retry_after is not None:
+                self.metrics.inc("login_rate_limited_total", (("limit", key_type),))
+                return retry_after
+        return None
+
+
+def rate_limited_response(retry_after):
+    return (
+        {"message": "Too many login attempts, please retry later."},
+        429,
+        {"Retry-After": str(math.ceil(retry_after))},
+    )
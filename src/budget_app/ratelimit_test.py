@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from budget_app import create_app
+from budget_app.extensions import request_metrics
+from budget_app.ratelimit import (
+    Limit,
+    MemoryBucketStore,
+    SQLiteBucketStore,
+    take_token,
+)
+
+AUTH_HANDLER_PATH = "budget_app.routes.handlers.http.auth"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucket(unittest.TestCase):
+    def test_take_token(self):
+        limit = Limit(2, 10)  # 2 attempts, a token back every 5 seconds
+        state, retry_after = take_token(None, 0.0, limit)
+        self.assertEqual((state, retry_after), ((1, 0.0), None))
+        state, retry_after = take_token(state, 1.0, limit)
+        self.assertIsNone(retry_after)
+
+        state, retry_after = take_token(state, 2.0, limit)
+        self.assertAlmostEqual(retry_after, (1 - 0.4) / 0.2)
+        # refilled up to the capacity only
+        state, retry_after = take_token(state, 1000.0, limit)
+        self.assertEqual((state, retry_after), ((1, 1000.0), None))
+
+    def test_parse(self):
+        limit = Limit.parse("LOGIN_RATE_LIMIT_PER_USER", "10/60")
+        self.assertEqual((limit.capacity, limit.rate), (10, 10 / 60))
+        self.assertIsNone(Limit.parse("LOGIN_RATE_LIMIT_PER_USER", "off"))
+        for value in ("10", "ten/60", "10/0", "0/60"):
+            with self.assertRaisesRegex(ValueError, "LOGIN_RATE_LIMIT_PER_USER"):
+                Limit.parse("LOGIN_RATE_LIMIT_PER_USER", value)
+
+    def test_memory_store_bounded(self):
+        clock = FakeClock()
+        store = MemoryBucketStore(max_buckets=2, clock=clock)
+        limit = Limit(1, 60)
+        self.assertIsNone(store.take("a", limit))
+        self.assertEqual(store.take("a", limit), 60)
+        clock.now += 30
+        self.assertEqual(store.take("a", limit), 30)
+
+        store.take("b", limit)
+        store.take("c", limit)  # drops "a", the least recently used
+        self.assertIsNone(store.take("a", limit))
+
+
+class SQLiteStore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "buckets.db")
+        self.clock = FakeClock()
+
+    def test_shared_between_stores(self):
+        # one store per worker process, on the same file
+        first = SQLiteBucketStore(self.path, clock=self.clock)
+        second = SQLiteBucketStore(self.path, clock=self.clock)
+        limit = Limit(2, 60)
+
+        self.assertIsNone(first.take("username:foo", limit))
+        self.assertIsNone(second.take("username:foo", limit))
+        self.assertEqual(first.take("username:foo", limit), 30)
+        self.clock.now += 30
+        self.assertIsNone(second.take("username:foo", limit))
+
+    def test_full_buckets_purged(self):
+        store = SQLiteBucketStore(self.path, clock=self.clock)
+        limit = Limit(5, 60)
+        with patch("budget_app.ratelimit.PURGE_EVERY", 3):
+            store.take("address:a", limit)
+            store.take("address:b", limit)
+            self.assertEqual(store.count(), 2)
+            self.clock.now += 12  # both are full again
+            store.take("address:c", limit)
+        self.assertEqual(store.count(), 1)
+
+
+class LoginRateLimited(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "LOGIN_RATE_LIMIT_PER_USER": "2/60",
+                "LOGIN_RATE_LIMIT_PER_ADDRESS": "4/60",
+            }
+        )
+        self.client = self.app.test_client()
+
+    def login(self, username):
+        return self.client.post(
+            "/api/auth/login", json={"username": username, "password": "bar"}
+        )
+
+    def rate_limited(self, key_type):
+        with self.app.app_context():
+            return request_metrics.sample_value(
+                "login_rate_limited_total", (("limit", key_type),)
+            )
+
+    @patch(f"{AUTH_HANDLER_PATH}.authenticate_user", return_value=None)
+    def test_rejected_before_authentication(self, mock_authenticate_user):
+        self.assertEqual(self.login("foo").status_code, 401)
+        self.assertEqual(self.login(" FOO ").status_code, 401)
+
+        response = self.login("foo")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "30")
+        self.assertEqual(
+            response.get_json(),
+            {"message": "Too many login attempts, please retry later."},
+        )
+        self.assertEqual(mock_authenticate_user.call_count, 2)
+        self.assertEqual(self.rate_limited("username"), 1)
+
+        # another username from the same address: one attempt left for the address
+        self.assertEqual(self.login("other").status_code, 401)
+        self.assertEqual(self.login("other").status_code, 429)
+        self.assertEqual(mock_authenticate_user.call_count, 3)
+        self.assertEqual(self.rate_limited("address"), 1)
+
+    @patch(f"{AUTH_HANDLER_PATH}.authenticate_user", return_value=None)
+    def test_disabled(self, mock_authenticate_user):
+        app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "LOGIN_RATE_LIMIT_PER_USER": "off",
+                "LOGIN_RATE_LIMIT_PER_ADDRESS": "off",
+            }
+        )
+        client = app.test_client()
+        for _ in range(20):
+            response = client.post(
+                "/api/auth/login", json={"username": "foo", "password": "bar"}
+            )
+            self.assertEqual(response.status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
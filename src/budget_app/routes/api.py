@@ -2,26 +2,43 @@
 
 """
 - /api/health | basic health endpoint
+- GET /api/cache/stats | budget cache hits, misses and evictions (this process)
+- GET /api/metrics | request counts, latency / response size histograms (Prometheus text format)
+  (both: 404 unless OPS_TOKEN is set, then "Authorization: Bearer <OPS_TOKEN>")
 
 # AUTH
 - /api/auth/signup | registers a new user account
-- /api/auth/login | authenticates a user
+- /api/auth/login | authenticates a user (429 past the per username / address rate limit)
 - /api/auth/logout | delete user session
 
 # BUDGET
 - /api/budget/create | create new budget
 - /api/budget/item/create | create budget items for existing budget
+- /api/budget/item/bulk_create | create many budget items in one request
+- POST /api/budget/<id>/import | import budget items from a CSV upload (name,category,total)
 - /api/budget/edit | edit budget properties
 - /api/budget/item/edit | edit budget item properties
+- /api/budget/item/bulk_edit | edit many budget items in one transaction
 - /api/budget/delete | delete budget
 - /api/budget/item/delete | delete budget item properties
-- GET /api/budgets | get all budgets
-- POST /api/budget | get one budget
+- /api/budget/item/bulk_delete | delete many budget items in one transaction
+- GET /api/budgets | get all budgets (?view=summary (default) | full)
+- GET /api/budget/<id> | get one budget with its totals
+- GET /api/export | stream every budget and item (?format=ndjson (default) | csv)
+
+GET budget(s) routes are paginated with ?limit=<n>&cursor=<next_cursor>
+(budgets, resp. the budget's items, in id order)
+and answer If-None-Match with 304 when the page's ETag still matches
+
+Edit routes take an optional version (the budget's, resp. item's version the
+edit was made from): 409 with the current budget when it has changed since
 
 """
 
-from flask import Blueprint, request
+from flask import Blueprint, Response, request
 
+from budget_app.extensions import budget_cache, request_metrics
+from budget_app.metrics import PROMETHEUS_CONTENT_TYPE
 from budget_app.routes.handlers.http.auth import AuthHandler
 from budget_app.routes.handlers.http.budget import BudgetHandler
 
@@ -46,6 +63,18 @@ def health():
     return {"status": "ok"}, 200
 
 
+@api_blueprint.route("/api/cache/stats", methods=["GET"])
+@auth_handler.ops_token_required
+def cache_stats():
+    return budget_cache.stats(), 200
+
+
+@api_blueprint.route("/api/metrics", methods=["GET"])
+@auth_handler.ops_token_required
+def metrics():
+    return Response(request_metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @api_blueprint.route("/api/auth/login", methods=["POST"])
 def auth_login():
     body = request.get_json()
@@ -71,13 +100,31 @@ BUDGET ROUTES
 
 @api_blueprint.route("/api/budget/<int:budget_id>", methods=["GET"])
 def get_budget_by_id(budget_id):
-    return budget_handler.get_budget({"budget_id": budget_id})
+    return budget_handler.get_budget(
+        {
+            "budget_id": budget_id,
+            "limit": request.args.get("limit"),
+            "cursor": request.args.get("cursor"),
+        },
+        request.if_none_match,
+    )
 
 
 @api_blueprint.route("/api/budgets", methods=["GET"])
 @auth_handler.login_required
 def budgets():
-    return budget_handler.get_budgets()
+    return budget_handler.get_budgets(
+        request.args.get("view"),
+        request.args.get("limit"),
+        request.args.get("cursor"),
+        request.if_none_match,
+    )
+
+
+@api_blueprint.route("/api/export", methods=["GET"])
+@auth_handler.login_required
+def export():
+    return budget_handler.export_budgets(request.args.get("format"))
 
 
 @api_blueprint.route("/api/budget/create", methods=["POST"])
@@ -94,6 +141,22 @@ def budget_item_create():
     return budget_handler.create_budget_item(body)
 
 
+@api_blueprint.route("/api/budget/item/bulk_create", methods=["POST"])
+@auth_handler.login_required
+def budget_item_bulk_create():
+    body = request.get_json()
+    return budget_handler.bulk_create_budget_items(body)
+
+
+@api_blueprint.route("/api/budget/<int:budget_id>/import", methods=["POST"])
+@auth_handler.login_required
+def budget_item_import(budget_id):
+    # multipart upload (file field) OR the raw CSV as the request body
+    upload = request.files.get("file")
+    csv_stream = upload.stream if upload else request.stream
+    return budget_handler.import_budget_items(budget_id, csv_stream)
+
+
 @api_blueprint.route("/api/budget/item/categories", methods=["GET"])
 def get_budget_item_categories():
     categories = budget_handler.get_item_categories_list()
@@ -114,6 +177,13 @@ def budget_item_edit():
     return budget_handler.edit_budget_item(body)
 
 
+@api_blueprint.route("/api/budget/item/bulk_edit", methods=["POST"])
+@auth_handler.login_required
+def budget_item_bulk_edit():
+    body = request.get_json()
+    return budget_handler.bulk_edit_budget_items(body)
+
+
 @api_blueprint.route("/api/budget/delete", methods=["POST"])
 @auth_handler.login_required
 def budget_delete():
@@ -126,3 +196,10 @@ def budget_delete():
 def budget_item_delete():
     body = request.get_json()
     return budget_handler.delete_budget_item(body)
+
+
+@api_blueprint.route("/api/budget/item/bulk_delete", methods=["POST"])
+@auth_handler.login_required
+def budget_item_bulk_delete():
+    body = request.get_json()
+    return budget_handler.bulk_delete_budget_items(body)
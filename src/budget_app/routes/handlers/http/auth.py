@@ -1,6 +1,12 @@
+import hmac
 from functools import wraps
 
-from flask import session
+from flask import current_app, request, session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from budget_app.extensions import login_rate_limiter
+from budget_app.passwords import PasswordHashQueueFull
+from budget_app.ratelimit import rate_limited_response
 from budget_app.services.auth.auth_service import (
     authenticate_user,
     create_user,
@@ -27,6 +33,30 @@ class AuthHandler:
 
         return decorated_function
 
+    def ops_token_required(self, f):
+        """
+        the operational routes (metrics, cache stats) are disabled (404) unless
+        OPS_TOKEN is configured, and then need "Authorization: Bearer <OPS_TOKEN>"
+        """
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            token = current_app.config.get("OPS_TOKEN")
+            if not token:
+                return {"message": "Not found."}, 404
+            authorization = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(
+                authorization.encode(), f"Bearer {token}".encode()
+            ):
+                return {"message": "A valid ops token is required."}, 401
+            return f(*args, **kwargs)
+
+        return decorated_function
+
+    @staticmethod
+    def credentials_are_strings(body, keys):
+        return all(isinstance(body[key], str) for key in keys)
+
     """
     Auth handlers
     """
@@ -34,11 +64,17 @@ class AuthHandler:
     def authenticate(self, body):
         if not validate_request_body_keys_exist(AuthHandler.AUTHENTICATE_KEYS, body):
             return {"message": "Username and/or password must be provided."}, 422
+        if not AuthHandler.credentials_are_strings(body, AuthHandler.AUTHENTICATE_KEYS):
+            return {"message": "Username and password must be strings."}, 422
+
+        username = body["username"].strip()
+        # before the user lookup and the password hash check
+        retry_after = login_rate_limiter.check(username, request.remote_addr)
+        if retry_after is not None:
+            return rate_limited_response(retry_after)
 
         try:
-            user_data = authenticate_user(
-                body["username"].strip(), body["password"].strip()
-            )
+            user_data = authenticate_user(username, body["password"].strip())
 
             if user_data:
                 session["user_id"] = user_data
@@ -46,6 +82,8 @@ class AuthHandler:
             else:
                 return {"message": "Invalid username or password."}, 401
 
+        except (PoolTimeoutError, PasswordHashQueueFull):
+            raise
         except Exception as e:
             print(e)
             return {"message": "Failed to authenticate user."}, 503
@@ -53,6 +91,8 @@ class AuthHandler:
     def register(self, body):
         if not validate_request_body_keys_exist(AuthHandler.REGISTER_KEYS, body):
             return {"message": "Username and/or password must be provided."}, 422
+        if not AuthHandler.credentials_are_strings(body, AuthHandler.REGISTER_KEYS):
+            return {"message": "Username and password must be strings."}, 422
 
         try:
             username = body["username"].strip()
@@ -66,6 +106,8 @@ class AuthHandler:
             else:
                 return {"message": "Username already exists."}, 422
 
+        except (PoolTimeoutError, PasswordHashQueueFull):
+            raise
         except Exception as e:
             print(e)
             return {"message": "Failed to register user."}, 503
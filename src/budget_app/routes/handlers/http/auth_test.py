@@ -39,6 +39,21 @@ class TestAuthenticate(BaseAuthHandlerTest):
                 "Username and/or password must be provided.", response["message"]
             )
 
+    @patch(f"{AUTH_HANDLER_PATH}.authenticate_user")
+    def test_credentials_not_strings(self, mock_authenticate_user):
+        with self.app.test_request_context():
+            for body in (
+                {"username": 123, "password": "bar"},
+                {"username": "foo", "password": None},
+            ):
+                response, status = self.handler.authenticate(body)
+
+                self.assertEqual(status, 422)
+                self.assertEqual(
+                    "Username and password must be strings.", response["message"]
+                )
+        mock_authenticate_user.assert_not_called()
+
     @patch(f"{AUTH_HANDLER_PATH}.authenticate_user")
     def test_invalid_credentials(self, mock_authenticate_user):
         mock_authenticate_user.return_value = None
@@ -99,6 +114,19 @@ class TestRegister(BaseAuthHandlerTest):
                 "Username and/or password must be provided.", response["message"]
             )
 
+    @patch(f"{AUTH_HANDLER_PATH}.create_user")
+    def test_credentials_not_strings(self, mock_create_user):
+        with self.app.test_request_context():
+            response, status = self.handler.register(
+                {"username": ["foo"], "password": "bar"}
+            )
+
+            self.assertEqual(status, 422)
+            self.assertEqual(
+                "Username and password must be strings.", response["message"]
+            )
+        mock_create_user.assert_not_called()
+
     @patch(f"{AUTH_HANDLER_PATH}.create_user")
     def test_service_exception(self, mock_create_user):
         mock_create_user.side_effect = Exception("service unavailable")
@@ -1,52 +1,231 @@
+import io
+
+from flask import Response, stream_with_context
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from werkzeug.http import quote_etag
+
 from budget_app.services.auth.auth_service import get_session
 from budget_app.services.budget.budget_service import (
+    BudgetItemsValidationError,
+    BudgetVersionConflictError,
     attributes_to_update_dict,
     create_new_budget,
     create_new_budget_item,
+    create_new_budget_items,
     delete_budget_by_budget_and_user_ids,
     delete_budget_item_by_item_and_budget_ids,
+    delete_budget_items_by_item_and_budget_ids,
     edit_budget_attributes,
     edit_budget_item_attributes,
+    edit_budget_items_attributes,
     get_budget_by_budget_and_user_id,
     get_budget_item_category_list,
+    get_budget_totals_by_budget_and_user_id,
+    get_budget_summaries_by_user_id,
+    get_budget_version_by_budget_and_user_id,
+    get_budget_versions_by_user_id,
     get_budgets_by_user_id,
+    import_budget_items_from_csv,
+)
+from budget_app.services.budget.export import (
+    EXPORT_FORMATS,
+    EXPORTERS,
+    stream_export,
+)
+from budget_app.services.budget.validate_input import (
+    validate_cursor,
+    validate_page_limit,
+)
+from budget_app.utils import (
+    make_etag,
+    validate_request_body_keys_exist,
+    stringify_attributes,
 )
-from budget_app.utils import validate_request_body_keys_exist, stringify_attributes
 
 
 class BudgetHandler:
     BUDGET_ATTRIBUTES = ["name", "gross_income", "month_duration"]
     BUDGET_ITEM_ATTRIBUTES = ["name", "category", "total"]
-
-    def get_budget(self, body):
+    BUDGETS_VIEWS = ["summary", "full"]  # first view is the default
+    DEFAULT_PAGE_LIMIT = 50
+    MAX_PAGE_LIMIT = 200
+
+    @staticmethod
+    def page_params(limit_raw, cursor_raw):
+        """
+        return (limit, cursor) for keyset pagination OR raise ValueError.
+        cursor is the id of the last row of the previous page (None = first page)
+        """
+        if limit_raw is None:
+            limit_raw = BudgetHandler.DEFAULT_PAGE_LIMIT
+
+        invalid_limit_message = validate_page_limit(
+            limit_raw, BudgetHandler.MAX_PAGE_LIMIT
+        )
+        if invalid_limit_message:
+            raise ValueError(invalid_limit_message)
+
+        if cursor_raw is None:
+            return int(limit_raw), None
+
+        invalid_cursor_message = validate_cursor(cursor_raw)
+        if invalid_cursor_message:
+            raise ValueError(invalid_cursor_message)
+
+        return int(limit_raw), int(cursor_raw)
+
+    @staticmethod
+    def next_cursor(page, limit):
+        """a full page may be followed by more rows, its last id is the next cursor"""
+        return page[-1]["id"] if len(page) == limit else None
+
+    @staticmethod
+    def etag_headers(etag):
+        # private: per user data. no-cache: always revalidate with If-None-Match
+        return {"ETag": quote_etag(etag), "Cache-Control": "private, no-cache"}
+
+    @staticmethod
+    def not_modified(if_none_match, etag):
+        """if_none_match: the request's werkzeug ETags (If-None-Match header)"""
+        return if_none_match is not None and if_none_match.contains(etag)
+
+    def get_budget(self, body, if_none_match=None):
+        """
+        body: budget_id and optional limit / cursor to page through its items.
+        The ETag identifies the page of the budget's version: a request whose
+        If-None-Match matches it gets a 304 without the budget being formatted.
+        """
         if not validate_request_body_keys_exist(["budget_id"], body):
             return {"message": "No budget_id provided"}, 422
 
         budget_id = body.get("budget_id")
 
+        try:
+            limit, cursor = BudgetHandler.page_params(
+                body.get("limit"), body.get("cursor")
+            )
+        except ValueError as e:
+            return {"message": str(e)}, 422
+
         try:
             user_id = get_session()["id"]
-            budget = get_budget_by_budget_and_user_id(budget_id, user_id)
+            if if_none_match:
+                version = get_budget_version_by_budget_and_user_id(budget_id, user_id)
+                etag = make_etag("budget", user_id, budget_id, version, limit, cursor)
+                if version is not None and BudgetHandler.not_modified(
+                    if_none_match, etag
+                ):
+                    return "", 304, BudgetHandler.etag_headers(etag)
+
+            budget = get_budget_by_budget_and_user_id(
+                budget_id, user_id, item_limit=limit, item_cursor=cursor
+            )
 
             if budget is None:
                 return {"message": "Budget not found or access denied."}, 404
-            return {"budget": budget}, 200
+
+            totals = get_budget_totals_by_budget_and_user_id(budget_id, user_id)
+            etag = make_etag(
+                "budget", user_id, budget_id, budget["version"], limit, cursor
+            )
+            return (
+                {
+                    "budget": budget,
+                    "totals": totals,
+                    "next_cursor": BudgetHandler.next_cursor(budget["items"], limit),
+                },
+                200,
+                BudgetHandler.etag_headers(etag),
+            )
         except PermissionError:
             return {"message": "User not authenticated"}, 401
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             print(e)
             return {"message": "Unable to retreive budget."}, 503
 
-    def get_budgets(self):
+    def get_budgets(self, view=None, limit=None, cursor=None, if_none_match=None):
+        """
+        view="summary" (default): budget columns, item count, category totals
+        and net income, without items. view="full": every budget with its items.
+        limit / cursor page through the budgets (keyset on id).
+        The ETag is derived from the (id, version) of the page's budgets: a
+        request whose If-None-Match matches it gets a 304 after one query.
+        """
+        view = view or BudgetHandler.BUDGETS_VIEWS[0]
+        if view not in BudgetHandler.BUDGETS_VIEWS:
+            return {
+                "message": f"Invalid view. Valid views are: {stringify_attributes(BudgetHandler.BUDGETS_VIEWS)}"
+            }, 422
+
+        try:
+            limit, cursor = BudgetHandler.page_params(limit, cursor)
+        except ValueError as e:
+            return {"message": str(e)}, 422
+
         user_id = get_session()["id"]
+        username = get_session().get("username")
+
+        def budgets_etag(versions):
+            return make_etag(
+                "budgets", user_id, username, view, limit, cursor, versions
+            )
+
         try:
-            budgets = get_budgets_by_user_id(user_id)
-            username = get_session().get("username")
-            return {"budgets": budgets, "username": username}, 200
+            if if_none_match:
+                etag = budgets_etag(
+                    get_budget_versions_by_user_id(user_id, limit, cursor)
+                )
+                if BudgetHandler.not_modified(if_none_match, etag):
+                    return "", 304, BudgetHandler.etag_headers(etag)
+
+            if view == "summary":
+                budgets = get_budget_summaries_by_user_id(user_id, limit, cursor)
+            else:
+                budgets = get_budgets_by_user_id(user_id, limit, cursor)
+            etag = budgets_etag(
+                [(budget["id"], budget["version"]) for budget in budgets]
+            )
+            return (
+                {
+                    "budgets": budgets,
+                    "username": username,
+                    "next_cursor": BudgetHandler.next_cursor(budgets, limit),
+                },
+                200,
+                BudgetHandler.etag_headers(etag),
+            )
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             print(e)
             return {"message": "Unable to retreive budget(s)."}, 503
 
+    def export_budgets(self, export_format=None):
+        """
+        Stream every budget and item of the user as export_format ("ndjson"
+        (default) or "csv"), written out row by row while they're read
+        from the database: memory stays constant whatever the account size.
+        """
+        export_format = export_format or EXPORT_FORMATS[0]
+        if export_format not in EXPORT_FORMATS:
+            return {
+                "message": f"Invalid format. Valid formats are: {stringify_attributes(EXPORT_FORMATS)}"
+            }, 422
+
+        user_id = get_session()["id"]
+        _, mimetype = EXPORTERS[export_format]
+
+        return Response(
+            stream_with_context(stream_export(user_id, export_format)),
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f"attachment; filename=budgets.{export_format}",
+                "Cache-Control": "private, no-store",
+            },
+        )
+
     def create_budget(self, body):
         if not validate_request_body_keys_exist(BudgetHandler.BUDGET_ATTRIBUTES, body):
             return {
@@ -59,15 +238,14 @@ class BudgetHandler:
         user_id = get_session()["id"]
 
         try:
-            budget_id = create_new_budget(
-                user_id, name, month_duration_raw, gross_income
-            )
-            budget = get_budget_by_budget_and_user_id(budget_id, user_id)
+            budget = create_new_budget(user_id, name, month_duration_raw, gross_income)
             print(budget)
             return {"budget": budget}, 200
         except ValueError as e:
             print(e)
             return {"message": str(e)}, 422
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             print(e)
             return {"message": "Unable to fetch budget."}, 503
@@ -89,20 +267,83 @@ class BudgetHandler:
         user_id = get_session()["id"]
 
         try:
-            budget_item_id = create_new_budget_item(
+            budget_item_id, budget = create_new_budget_item(
                 name, category, total, budget_id, user_id
             )
-            budget = get_budget_by_budget_and_user_id(budget_id, user_id)
             return {"budget": budget, "budget_item_id": budget_item_id}, 200
 
+        except BudgetVersionConflictError as e:
+            print(e)
+            return {"message": str(e), "budget": e.budget}, 409
         except ValueError as e:
             print(e)
             return {"message": str(e)}, 422
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             print(e)
             return {"message": "Unable to fetch budget item."}, 503
 
+    def bulk_create_budget_items(self, body):
+        """body: budget_id and items, a list of {name, category, total}"""
+        if not validate_request_body_keys_exist(["budget_id", "items"], body):
+            return {"message": "Missing budget_id and/or items"}, 422
+
+        items = body.get("items")
+        budget_id = body.get("budget_id")
+        user_id = get_session()["id"]
+
+        try:
+            budget_item_ids, budget = create_new_budget_items(items, budget_id, user_id)
+            return {"budget": budget, "budget_item_ids": budget_item_ids}, 200
+
+        except BudgetItemsValidationError as e:
+            print(e, e.errors)
+            return {"message": str(e), "errors": e.errors}, 422
+        except BudgetVersionConflictError as e:
+            print(e)
+            return {"message": str(e), "budget": e.budget}, 409
+        except ValueError as e:
+            print(e)
+            return {"message": str(e)}, 422
+        except PoolTimeoutError:
+            raise
+        except Exception as e:
+            print(e)
+            return {"message": "Unable to create budget items."}, 503
+
+    def import_budget_items(self, budget_id, csv_stream):
+        """
+        csv_stream: binary stream of the uploaded CSV (name,category,total
+        header), decoded and parsed line by line while it's read
+        """
+        user_id = get_session()["id"]
+        csv_lines = io.TextIOWrapper(csv_stream, encoding="utf-8-sig", newline="")
+
+        try:
+            imported = import_budget_items_from_csv(csv_lines, budget_id, user_id)
+            return {"budget_id": budget_id, "imported": imported}, 200
+
+        except BudgetItemsValidationError as e:
+            print(e, e.errors)
+            return {"message": str(e), "errors": e.errors}, 422
+        except UnicodeDecodeError as e:
+            print(e)
+            return {"message": "CSV file must be UTF-8 encoded."}, 422
+        except ValueError as e:
+            print(e)
+            return {"message": str(e)}, 422
+        except PoolTimeoutError:
+            raise
+        except Exception as e:
+            print(e)
+            return {"message": "Unable to import budget items."}, 503
+
     def edit_budget(self, body):
+        """
+        body: budget_id, the attribute(s) to update and optionally version,
+        the budget's version the edit was made from (409 when it's outdated)
+        """
         if not validate_request_body_keys_exist(["budget_id"], body):
             return {"message": "Missing budget_id"}, 422
 
@@ -117,17 +358,27 @@ class BudgetHandler:
         user_id = get_session()["id"]
         budget_id = body.get("budget_id")
         try:
-            budget_id = edit_budget_attributes(budget_id, user_id, attributes_to_update)
-            updated_budget = get_budget_by_budget_and_user_id(budget_id, user_id)
+            updated_budget = edit_budget_attributes(
+                budget_id, user_id, attributes_to_update, body.get("version")
+            )
             return {"budget_id": budget_id, "budget": updated_budget}, 200
+        except BudgetVersionConflictError as e:
+            print(e)
+            return {"message": str(e), "budget": e.budget}, 409
         except ValueError as e:
             print(e)
             return {"message": str(e)}, 422
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             print(e)
             return {"message": "Unable to update budget."}, 503
 
     def edit_budget_item(self, body):
+        """
+        body: budget_id, item_id, the attribute(s) to update and optionally
+        version, the item's version the edit was made from (409 when it's outdated)
+        """
         if not validate_request_body_keys_exist(["budget_id", "item_id"], body):
             return {"message": "Missing budget_id and/or item_id"}, 422
 
@@ -144,18 +395,55 @@ class BudgetHandler:
         item_id = body.get("item_id")
 
         try:
-            budget_item_id = edit_budget_item_attributes(
-                item_id, budget_id, attributes_to_update
+            budget_item_id, updated_budget = edit_budget_item_attributes(
+                item_id, budget_id, user_id, attributes_to_update, body.get("version")
             )
-            updated_budget = get_budget_by_budget_and_user_id(budget_id, user_id)
             return {"budget_item_id": budget_item_id, "budget": updated_budget}, 200
+        except BudgetVersionConflictError as e:
+            print(e)
+            return {"message": str(e), "budget": e.budget}, 409
         except ValueError as e:
             print(e)
             return {"message": str(e)}, 422
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             print(e)
             return {"message": "Unable to update budget item."}, 503
 
+    def bulk_edit_budget_items(self, body):
+        """
+        body: budget_id and items, a list of
+        {item_id, changes: {name, category, total}, version (optional)}
+        """
+        if not validate_request_body_keys_exist(["budget_id", "items"], body):
+            return {"message": "Missing budget_id and/or items"}, 422
+
+        edits = body.get("items")
+        budget_id = body.get("budget_id")
+        user_id = get_session()["id"]
+
+        try:
+            budget_item_ids, budget = edit_budget_items_attributes(
+                edits, budget_id, user_id
+            )
+            return {"budget": budget, "budget_item_ids": budget_item_ids}, 200
+
+        except BudgetItemsValidationError as e:
+            print(e, e.errors)
+            return {"message": str(e), "errors": e.errors}, 422
+        except BudgetVersionConflictError as e:
+            print(e)
+            return {"message": str(e), "budget": e.budget}, 409
+        except ValueError as e:
+            print(e)
+            return {"message": str(e)}, 422
+        except PoolTimeoutError:
+            raise
+        except Exception as e:
+            print(e)
+            return {"message": "Unable to update budget items."}, 503
+
     def delete_budget(self, body):
         if not validate_request_body_keys_exist(["budget_id"], body):
             return {"message": "Missing budget_id"}, 422
@@ -173,6 +461,8 @@ class BudgetHandler:
             print(e)
             return {"message": str(e)}, 422
 
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             print(e)
             return {"message": "Unable to delete budget."}, 503
@@ -183,19 +473,55 @@ class BudgetHandler:
 
         item_id = body.get("item_id")
         budget_id = body.get("budget_id")
+        user_id = get_session()["id"]
 
         try:
             item_description = delete_budget_item_by_item_and_budget_ids(
-                item_id, budget_id
+                item_id, budget_id, user_id
             )
             return {
                 "message": f"Budget item in {item_description} and its contents has been deleted."
             }, 200
 
+        except BudgetVersionConflictError as e:
+            print(e)
+            return {"message": str(e), "budget": e.budget}, 409
+
         except ValueError as e:
             print(e)
             return {"message": str(e)}, 422
 
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             print(e)
             return {"message": "Unable to delete budget."}, 503
+
+    def bulk_delete_budget_items(self, body):
+        """body: budget_id and item_ids, a list of the budget item ids to delete"""
+        if not validate_request_body_keys_exist(["budget_id", "item_ids"], body):
+            return {"message": "Missing budget_id and/or item_ids"}, 422
+
+        item_ids = body.get("item_ids")
+        budget_id = body.get("budget_id")
+        user_id = get_session()["id"]
+
+        try:
+            deleted_count = delete_budget_items_by_item_and_budget_ids(
+                item_ids, budget_id, user_id
+            )
+            return {
+                "message": f"{deleted_count} budget item(s) have been deleted."
+            }, 200
+
+        except BudgetItemsValidationError as e:
+            print(e, e.errors)
+            return {"message": str(e), "errors": e.errors}, 422
+        except ValueError as e:
+            print(e)
+            return {"message": str(e)}, 422
+        except PoolTimeoutError:
+            raise
+        except Exception as e:
+            print(e)
+            return {"message": "Unable to delete budget items."}, 503
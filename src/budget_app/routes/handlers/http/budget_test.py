@@ -1,10 +1,21 @@
+import io
+import json
 import unittest
 from unittest.mock import patch
 
 from flask import session
+from werkzeug.datastructures import ETags
+from werkzeug.http import unquote_etag
 
-from budget_app import create_app
+from budget_app import create_app, db
+from budget_app.models import Budget, BudgetItem, User
 from budget_app.routes.handlers.http.budget import BudgetHandler
+from budget_app.services.budget.budget_service import (
+    BudgetItemsValidationError,
+    BudgetVersionConflictError,
+)
+from budget_app.testing import assert_max_queries, assert_max_request_queries
+from budget_app.utils import make_etag
 
 BUDGET_HANDLER_PATH = "budget_app.routes.handlers.http.budget"
 
@@ -24,6 +35,7 @@ class BaseBudgetHandlerTest(unittest.TestCase):
         "name": "Test Budget",
         "month_duration": 1,
         "gross_income": 1000,
+        "version": 1,
         "items": [
             {"id": 1, "name": "test_item", "category": "bills", "total": "$200.00"}
         ],
@@ -35,7 +47,10 @@ class BaseBudgetHandlerTest(unittest.TestCase):
         "total": 200,
     }
     VALID_GET_BUDGET_BODY = {"budget_id": 1}
-    VALID_GET_BUDGETS_BODY = [{"id": 1, "name": "test"}, {}]
+    VALID_GET_BUDGETS_BODY = [
+        {"id": 1, "name": "test", "version": 1},
+        {"id": 2, "name": "test_2", "version": 3},
+    ]
     VALID_CREATE_BUDGET_BODY = {
         "name": "Test Budget",
         "month_duration": 1,
@@ -48,23 +63,123 @@ class BaseBudgetHandlerTest(unittest.TestCase):
 
 
 class TestGetBudget(BaseBudgetHandlerTest):
+    VALID_TOTALS = {
+        "item_count": 0,
+        "category_totals": {"deductions": 0.0, "bills": 0.0, "savings": 0.0},
+        "total_expenses": 0.0,
+        "net_income": 1000.0,
+    }
 
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_totals_by_budget_and_user_id")
     @patch(f"{BUDGET_HANDLER_PATH}.get_budget_by_budget_and_user_id")
-    def test_success(self, mock_get_budget_by_budget_and_user_id):
+    def test_success(
+        self, mock_get_budget_by_budget_and_user_id, mock_get_budget_totals
+    ):
         mock_get_budget_by_budget_and_user_id.return_value = (
-            BaseBudgetHandlerTest.VALID_BUDGET_OBJECT
+            BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS
         )
+        mock_get_budget_totals.return_value = TestGetBudget.VALID_TOTALS
 
         with self.app.test_request_context():
             session["user_id"] = {"id": 1}
-            response, status = self.handler.get_budget(
+            response, status, headers = self.handler.get_budget(
                 BaseBudgetHandlerTest.VALID_GET_BUDGET_BODY
             )
             self.assertEqual(status, 200)
+            self.assertIn("ETag", headers)
             self.assertEqual(
-                BaseBudgetHandlerTest.VALID_BUDGET_OBJECT, response["budget"]
+                BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS,
+                response["budget"],
+            )
+            self.assertIsNone(response["next_cursor"])
+            self.assertEqual(TestGetBudget.VALID_TOTALS, response["totals"])
+            mock_get_budget_totals.assert_called_once_with(1, 1)
+            mock_get_budget_by_budget_and_user_id.assert_called_once_with(
+                1, 1, item_limit=BudgetHandler.DEFAULT_PAGE_LIMIT, item_cursor=None
             )
 
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_totals_by_budget_and_user_id")
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_by_budget_and_user_id")
+    def test_full_page_returns_next_cursor(
+        self, mock_get_budget_by_budget_and_user_id, mock_get_budget_totals
+    ):
+        mock_get_budget_by_budget_and_user_id.return_value = (
+            BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS
+        )
+        mock_get_budget_totals.return_value = TestGetBudget.VALID_TOTALS
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status, _ = self.handler.get_budget(
+                {"budget_id": 1, "limit": "1", "cursor": "0"}
+            )
+            self.assertEqual(status, 200)
+            self.assertEqual(1, response["next_cursor"])
+            mock_get_budget_by_budget_and_user_id.assert_called_once_with(
+                1, 1, item_limit=1, item_cursor=0
+            )
+
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_by_budget_and_user_id")
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_version_by_budget_and_user_id")
+    def test_not_modified(
+        self, mock_get_budget_version, mock_get_budget_by_budget_and_user_id
+    ):
+        mock_get_budget_version.return_value = 1
+        etag = make_etag("budget", 1, 1, 1, BudgetHandler.DEFAULT_PAGE_LIMIT, None)
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status, headers = self.handler.get_budget(
+                BaseBudgetHandlerTest.VALID_GET_BUDGET_BODY, ETags([etag])
+            )
+            self.assertEqual(status, 304)
+            self.assertEqual("", response)
+            self.assertEqual(f'"{etag}"', headers["ETag"])
+            mock_get_budget_by_budget_and_user_id.assert_not_called()
+
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_totals_by_budget_and_user_id")
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_by_budget_and_user_id")
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_version_by_budget_and_user_id")
+    def test_modified(
+        self,
+        mock_get_budget_version,
+        mock_get_budget_by_budget_and_user_id,
+        mock_get_budget_totals,
+    ):
+        mock_get_budget_version.return_value = 2
+        mock_get_budget_by_budget_and_user_id.return_value = {
+            **BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS,
+            "version": 2,
+        }
+        mock_get_budget_totals.return_value = TestGetBudget.VALID_TOTALS
+        stale_etag = make_etag(
+            "budget", 1, 1, 1, BudgetHandler.DEFAULT_PAGE_LIMIT, None
+        )
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status, headers = self.handler.get_budget(
+                BaseBudgetHandlerTest.VALID_GET_BUDGET_BODY, ETags([stale_etag])
+            )
+            self.assertEqual(status, 200)
+            self.assertEqual(2, response["budget"]["version"])
+            self.assertNotEqual(f'"{stale_etag}"', headers["ETag"])
+
+    def test_invalid_page_params(self):
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.get_budget(
+                {"budget_id": 1, "limit": "1000"}
+            )
+            self.assertEqual(status, 422)
+            self.assertEqual("Limit must be between 1 and 200.", response["message"])
+
+            response, status = self.handler.get_budget(
+                {"budget_id": 1, "cursor": "abc"}
+            )
+            self.assertEqual(status, 422)
+            self.assertEqual("Cursor must be a valid id.", response["message"])
+
     @patch(f"{BUDGET_HANDLER_PATH}.get_budget_by_budget_and_user_id")
     def test_exception_raised(
         self,
@@ -90,6 +205,36 @@ class TestGetBudget(BaseBudgetHandlerTest):
 
 
 class TestGetBudgets(BaseBudgetHandlerTest):
+    VALID_BUDGET_SUMMARIES = [
+        {
+            "id": 1,
+            "name": "test",
+            "month_duration": 1,
+            "gross_income": 1000.0,
+            "version": 1,
+            "item_count": 1,
+            "category_totals": {"deductions": 0.0, "bills": 200.0, "savings": 0.0},
+            "total_expenses": 200.0,
+            "net_income": 800.0,
+        }
+    ]
+
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_summaries_by_user_id")
+    def test_summary_is_default_view(self, mock_get_budget_summaries_by_user_id):
+        mock_get_budget_summaries_by_user_id.return_value = (
+            TestGetBudgets.VALID_BUDGET_SUMMARIES
+        )
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status, headers = self.handler.get_budgets()
+            self.assertEqual(status, 200)
+            self.assertIn("ETag", headers)
+            self.assertEqual(TestGetBudgets.VALID_BUDGET_SUMMARIES, response["budgets"])
+            self.assertIsNone(response["next_cursor"])
+            mock_get_budget_summaries_by_user_id.assert_called_once_with(
+                1, BudgetHandler.DEFAULT_PAGE_LIMIT, None
+            )
 
     @patch(f"{BUDGET_HANDLER_PATH}.get_budgets_by_user_id")
     def test_success(self, mock_get_budgets_by_user_id):
@@ -99,16 +244,81 @@ class TestGetBudgets(BaseBudgetHandlerTest):
 
         with self.app.test_request_context():
             session["user_id"] = {"id": 1}
-            response, status = self.handler.get_budgets()
+            response, status, _ = self.handler.get_budgets("full")
             self.assertEqual(status, 200)
             self.assertEqual(
                 BaseBudgetHandlerTest.VALID_GET_BUDGETS_BODY, response["budgets"]
             )
 
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_summaries_by_user_id")
+    def test_full_page_returns_next_cursor(self, mock_get_budget_summaries_by_user_id):
+        mock_get_budget_summaries_by_user_id.return_value = (
+            TestGetBudgets.VALID_BUDGET_SUMMARIES
+        )
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status, _ = self.handler.get_budgets(limit="1")
+            self.assertEqual(status, 200)
+            self.assertEqual(1, response["next_cursor"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_summaries_by_user_id")
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_versions_by_user_id")
+    def test_not_modified(
+        self, mock_get_budget_versions, mock_get_budget_summaries_by_user_id
+    ):
+        mock_get_budget_summaries_by_user_id.return_value = (
+            TestGetBudgets.VALID_BUDGET_SUMMARIES
+        )
+        mock_get_budget_versions.return_value = [(1, 1)]
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            _, _, headers = self.handler.get_budgets()
+            etag = unquote_etag(headers["ETag"])[0]
+            mock_get_budget_summaries_by_user_id.reset_mock()
+
+            response, status, _ = self.handler.get_budgets(if_none_match=ETags([etag]))
+            self.assertEqual(status, 304)
+            mock_get_budget_summaries_by_user_id.assert_not_called()
+
+            # a budget changed: its version no longer matches
+            mock_get_budget_versions.return_value = [(1, 2)]
+            response, status, _ = self.handler.get_budgets(if_none_match=ETags([etag]))
+            self.assertEqual(status, 200)
+
+    def test_invalid_page_params(self):
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.get_budgets(limit="0")
+            self.assertEqual(status, 422)
+            self.assertEqual("Limit must be between 1 and 200.", response["message"])
+
+    def test_invalid_view(self):
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.get_budgets("detailed")
+            self.assertEqual(status, 422)
+            self.assertEqual(
+                "Invalid view. Valid views are: summary, full", response["message"]
+            )
+
     @patch(f"{BUDGET_HANDLER_PATH}.get_budgets_by_user_id")
     def test_exception_raised(self, mock_get_budgets_by_user_id):
         mock_get_budgets_by_user_id.side_effect = Exception("service unavailable")
 
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.get_budgets("full")
+            self.assertEqual(status, 503)
+            self.assertIn("Unable to retreive budget(s).", response["message"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_summaries_by_user_id")
+    def test_summary_exception_raised(self, mock_get_budget_summaries_by_user_id):
+        mock_get_budget_summaries_by_user_id.side_effect = Exception(
+            "service unavailable"
+        )
+
         with self.app.test_request_context():
             session["user_id"] = {"id": 1}
             response, status = self.handler.get_budgets()
@@ -125,10 +335,7 @@ class TestCreateBudget(BaseBudgetHandlerTest):
         mock_create_new_budget,
         mock_get_budget_by_budget_and_user_id,
     ):
-        mock_create_new_budget.return_value = 1  # new_budget.id is int shape
-        mock_get_budget_by_budget_and_user_id.return_value = (
-            BaseBudgetHandlerTest.VALID_BUDGET_OBJECT
-        )
+        mock_create_new_budget.return_value = BaseBudgetHandlerTest.VALID_BUDGET_OBJECT
 
         with self.app.test_request_context():
             session["user_id"] = {"id": 1}
@@ -140,6 +347,8 @@ class TestCreateBudget(BaseBudgetHandlerTest):
                 BaseBudgetHandlerTest.VALID_BUDGET_OBJECT,
                 response["budget"],
             )  # response["budget"] == mocked object
+            # the new budget is returned by the write, not read again
+            mock_get_budget_by_budget_and_user_id.assert_not_called()
 
     def test_missing_body_keys(self):
         with self.app.test_request_context():
@@ -189,9 +398,9 @@ class TestCreateBudgetItem(BaseBudgetHandlerTest):
         mock_create_new_budget_item,
         mock_get_budget_by_budget_and_user_id,
     ):
-        mock_create_new_budget_item.return_value = 1  # new_budget_item.id -> int shape
-        mock_get_budget_by_budget_and_user_id.return_value = (
-            BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS
+        mock_create_new_budget_item.return_value = (
+            1,  # new_budget_item.id -> int shape
+            BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS,
         )
 
         with self.app.test_request_context():
@@ -205,6 +414,7 @@ class TestCreateBudgetItem(BaseBudgetHandlerTest):
                 response["budget"],
             )  # response["budget"] == mocked object
             self.assertEqual(1, response["budget_item_id"])
+            mock_get_budget_by_budget_and_user_id.assert_not_called()
 
     @patch(f"{BUDGET_HANDLER_PATH}.create_new_budget_item")
     def test_value_error_exception(
@@ -246,6 +456,85 @@ class TestCreateBudgetItem(BaseBudgetHandlerTest):
             )
 
 
+class TestBulkCreateBudgetItems(BaseBudgetHandlerTest):
+    VALID_BULK_CREATE_BODY = {
+        "budget_id": 1,
+        "items": [
+            {"name": "test_item", "category": "bills", "total": 200},
+            {"name": "test_item2", "category": "savings", "total": 100},
+        ],
+    }
+
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_by_budget_and_user_id")
+    @patch(f"{BUDGET_HANDLER_PATH}.create_new_budget_items")
+    def test_success(
+        self,
+        mock_create_new_budget_items,
+        mock_get_budget_by_budget_and_user_id,
+    ):
+        mock_create_new_budget_items.return_value = (
+            [1, 2],
+            BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS,
+        )
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_create_budget_items(
+                TestBulkCreateBudgetItems.VALID_BULK_CREATE_BODY
+            )
+            self.assertEqual(200, status)
+            self.assertEqual([1, 2], response["budget_item_ids"])
+            self.assertEqual(
+                BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS,
+                response["budget"],
+            )
+            mock_get_budget_by_budget_and_user_id.assert_not_called()
+
+    def test_missing_body_keys(self):
+        with self.app.test_request_context():
+            response, status = self.handler.bulk_create_budget_items({"budget_id": 1})
+            self.assertEqual(422, status)
+            self.assertEqual("Missing budget_id and/or items", response["message"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.create_new_budget_items")
+    def test_row_errors(self, mock_create_new_budget_items):
+        errors = [{"index": 1, "message": "Category: 'food' is not valid"}]
+        mock_create_new_budget_items.side_effect = BudgetItemsValidationError(errors)
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_create_budget_items(
+                TestBulkCreateBudgetItems.VALID_BULK_CREATE_BODY
+            )
+            self.assertEqual(422, status)
+            self.assertEqual(errors, response["errors"])
+            self.assertIn("no items were saved", response["message"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.create_new_budget_items")
+    def test_value_error_exception(self, mock_create_new_budget_items):
+        mock_create_new_budget_items.side_effect = ValueError("Invalid budget.")
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_create_budget_items(
+                TestBulkCreateBudgetItems.VALID_BULK_CREATE_BODY
+            )
+            self.assertEqual(422, status)
+            self.assertEqual("Invalid budget.", response["message"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.create_new_budget_items")
+    def test_exception_raised(self, mock_create_new_budget_items):
+        mock_create_new_budget_items.side_effect = Exception("Service unavailable")
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_create_budget_items(
+                TestBulkCreateBudgetItems.VALID_BULK_CREATE_BODY
+            )
+            self.assertEqual(503, status)
+            self.assertIn("Unable to create budget items", response["message"])
+
+
 class TestEditBudget(BaseBudgetHandlerTest):
     VALID_EDIT_BUDGET_BODY = {
         "budget_id": 1,
@@ -270,10 +559,7 @@ class TestEditBudget(BaseBudgetHandlerTest):
         mock_edit_budget_attributes,
         mock_get_budget_by_budget_and_user_id,
     ):
-        mock_edit_budget_attributes.return_value = 1  # budget.id -> int shape
-        mock_get_budget_by_budget_and_user_id.return_value = (
-            TestEditBudget.EDITED_BUDGET_OBJ
-        )
+        mock_edit_budget_attributes.return_value = TestEditBudget.EDITED_BUDGET_OBJ
 
         with self.app.test_request_context():
             session["user_id"] = {"id": 1}
@@ -283,6 +569,7 @@ class TestEditBudget(BaseBudgetHandlerTest):
             self.assertEqual(200, status)
             self.assertEqual(1, response["budget_id"])
             self.assertEqual(TestEditBudget.EDITED_BUDGET_OBJ, response["budget"])
+            mock_get_budget_by_budget_and_user_id.assert_not_called()
 
     def test_missing_attributes_to_update(self):
         with self.app.test_request_context():
@@ -318,6 +605,23 @@ class TestEditBudget(BaseBudgetHandlerTest):
             self.assertEqual(422, status)
             self.assertEqual("Bad request", response["message"])
 
+    @patch(f"{BUDGET_HANDLER_PATH}.edit_budget_attributes")
+    def test_version_conflict(self, mock_edit_budget_attributes):
+        mock_edit_budget_attributes.side_effect = BudgetVersionConflictError(
+            TestEditBudget.EDITED_BUDGET_OBJ
+        )
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.edit_budget(
+                {**TestEditBudget.VALID_EDIT_BUDGET_BODY, "version": 3}
+            )
+            self.assertEqual(409, status)
+            self.assertEqual(TestEditBudget.EDITED_BUDGET_OBJ, response["budget"])
+            mock_edit_budget_attributes.assert_called_once_with(
+                1, 1, TestEditBudget.ATTRIBUTES_TO_UPDATE_BODY, 3
+            )
+
     @patch(f"{BUDGET_HANDLER_PATH}.edit_budget_attributes")
     def test_exception_raised(
         self,
@@ -381,9 +685,9 @@ class TestEditBudgetItem(BaseBudgetHandlerTest):
         mock_edit_budget_item_attributes,
         mock_get_budget_by_budget_and_user_id,
     ):
-        mock_edit_budget_item_attributes.return_value = 1  # item_id -> int shape
-        mock_get_budget_by_budget_and_user_id.return_value = (
-            TestEditBudgetItem.EDITED_BUDGET_ITEM_OBJ
+        mock_edit_budget_item_attributes.return_value = (
+            1,  # item_id -> int shape
+            TestEditBudgetItem.EDITED_BUDGET_ITEM_OBJ,
         )
         with self.app.test_request_context():
             session["user_id"] = {"id": 1}
@@ -395,6 +699,25 @@ class TestEditBudgetItem(BaseBudgetHandlerTest):
             self.assertEqual(
                 TestEditBudgetItem.EDITED_BUDGET_ITEM_OBJ, response["budget"]
             )
+            mock_get_budget_by_budget_and_user_id.assert_not_called()
+
+    @patch(f"{BUDGET_HANDLER_PATH}.edit_budget_item_attributes")
+    def test_version_conflict(self, mock_edit_budget_item_attributes):
+        mock_edit_budget_item_attributes.side_effect = BudgetVersionConflictError(
+            TestEditBudgetItem.EDITED_BUDGET_ITEM_OBJ
+        )
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.edit_budget_item(
+                {**TestEditBudgetItem.EDIT_BUDGET_ITEM_BODY, "version": 2}
+            )
+            self.assertEqual(409, status)
+            self.assertEqual(
+                TestEditBudgetItem.EDITED_BUDGET_ITEM_OBJ, response["budget"]
+            )
+            mock_edit_budget_item_attributes.assert_called_once_with(
+                1, 1, 1, TestEditBudgetItem.ATTRIBUTES_TO_UPDATE_BODY, 2
+            )
 
     @patch(f"{BUDGET_HANDLER_PATH}.edit_budget_item_attributes")
     def test_value_error_raised(
@@ -432,6 +755,73 @@ class TestEditBudgetItem(BaseBudgetHandlerTest):
             self.assertIn("Unable to update budget item", response["message"])
 
 
+class TestBulkEditBudgetItems(BaseBudgetHandlerTest):
+    VALID_BULK_EDIT_BODY = {
+        "budget_id": 1,
+        "items": [
+            {"item_id": 1, "changes": {"name": "renamed"}},
+            {"item_id": 2, "changes": {"category": "savings", "total": 10}},
+        ],
+    }
+
+    @patch(f"{BUDGET_HANDLER_PATH}.get_budget_by_budget_and_user_id")
+    @patch(f"{BUDGET_HANDLER_PATH}.edit_budget_items_attributes")
+    def test_success(
+        self,
+        mock_edit_budget_items_attributes,
+        mock_get_budget_by_budget_and_user_id,
+    ):
+        mock_edit_budget_items_attributes.return_value = (
+            [1, 2],
+            BaseBudgetHandlerTest.VALID_BUDGET_OBJECT_WITH_ITEMS,
+        )
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_edit_budget_items(
+                TestBulkEditBudgetItems.VALID_BULK_EDIT_BODY
+            )
+            self.assertEqual(200, status)
+            self.assertEqual([1, 2], response["budget_item_ids"])
+            mock_edit_budget_items_attributes.assert_called_once_with(
+                TestBulkEditBudgetItems.VALID_BULK_EDIT_BODY["items"], 1, 1
+            )
+            mock_get_budget_by_budget_and_user_id.assert_not_called()
+
+    def test_missing_body_keys(self):
+        with self.app.test_request_context():
+            response, status = self.handler.bulk_edit_budget_items({"budget_id": 1})
+            self.assertEqual(422, status)
+            self.assertEqual("Missing budget_id and/or items", response["message"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.edit_budget_items_attributes")
+    def test_row_errors(self, mock_edit_budget_items_attributes):
+        errors = [{"index": 0, "message": "Invalid budget item."}]
+        mock_edit_budget_items_attributes.side_effect = BudgetItemsValidationError(
+            errors
+        )
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_edit_budget_items(
+                TestBulkEditBudgetItems.VALID_BULK_EDIT_BODY
+            )
+            self.assertEqual(422, status)
+            self.assertEqual(errors, response["errors"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.edit_budget_items_attributes")
+    def test_exception_raised(self, mock_edit_budget_items_attributes):
+        mock_edit_budget_items_attributes.side_effect = Exception("Service unavailable")
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_edit_budget_items(
+                TestBulkEditBudgetItems.VALID_BULK_EDIT_BODY
+            )
+            self.assertEqual(503, status)
+            self.assertIn("Unable to update budget items", response["message"])
+
+
 class TestDeleteBudget(BaseBudgetHandlerTest):
     def test_missing_request_body_keys(self):
         with self.app.test_request_context():
@@ -510,6 +900,7 @@ class TestDeleteBudgetItem(BaseBudgetHandlerTest):
         )
 
         with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
             response, status = self.handler.delete_budget_item(
                 {"item_id": 1, "budget_id": 1}
             )
@@ -518,6 +909,9 @@ class TestDeleteBudgetItem(BaseBudgetHandlerTest):
                 "Budget item in Category: 'bills' and with Name: 'internet' and its contents has been deleted.",
                 response["message"],
             )
+            mock_delete_budget_item_by_item_and_budget_ids.assert_called_once_with(
+                1, 1, 1
+            )
 
     @patch(f"{BUDGET_HANDLER_PATH}.delete_budget_item_by_item_and_budget_ids")
     def test_value_error_raised(
@@ -529,6 +923,7 @@ class TestDeleteBudgetItem(BaseBudgetHandlerTest):
         )
 
         with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
             response, status = self.handler.delete_budget_item(
                 {"item_id": 1, "budget_id": None}
             )
@@ -545,6 +940,7 @@ class TestDeleteBudgetItem(BaseBudgetHandlerTest):
         )
 
         with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
             response, status = self.handler.delete_budget_item(
                 {"item_id": 1, "budget_id": 1}
             )
@@ -552,5 +948,603 @@ class TestDeleteBudgetItem(BaseBudgetHandlerTest):
             self.assertIn("Unable to delete budget", response["message"])
 
 
+class TestBulkDeleteBudgetItems(BaseBudgetHandlerTest):
+    VALID_BULK_DELETE_BODY = {"budget_id": 1, "item_ids": [1, 2]}
+
+    @patch(f"{BUDGET_HANDLER_PATH}.delete_budget_items_by_item_and_budget_ids")
+    def test_success(self, mock_delete_budget_items):
+        mock_delete_budget_items.return_value = 2
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_delete_budget_items(
+                TestBulkDeleteBudgetItems.VALID_BULK_DELETE_BODY
+            )
+            self.assertEqual(200, status)
+            self.assertEqual("2 budget item(s) have been deleted.", response["message"])
+            mock_delete_budget_items.assert_called_once_with([1, 2], 1, 1)
+
+    def test_missing_body_keys(self):
+        with self.app.test_request_context():
+            response, status = self.handler.bulk_delete_budget_items({"budget_id": 1})
+            self.assertEqual(422, status)
+            self.assertEqual("Missing budget_id and/or item_ids", response["message"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.delete_budget_items_by_item_and_budget_ids")
+    def test_value_error_raised(self, mock_delete_budget_items):
+        error_message = "Invalid budget item(s), no items were deleted."
+        mock_delete_budget_items.side_effect = ValueError(error_message)
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_delete_budget_items(
+                TestBulkDeleteBudgetItems.VALID_BULK_DELETE_BODY
+            )
+            self.assertEqual(422, status)
+            self.assertEqual(error_message, response["message"])
+
+    @patch(f"{BUDGET_HANDLER_PATH}.delete_budget_items_by_item_and_budget_ids")
+    def test_exception_raised(self, mock_delete_budget_items):
+        mock_delete_budget_items.side_effect = Exception("Service unavailable")
+
+        with self.app.test_request_context():
+            session["user_id"] = {"id": 1}
+            response, status = self.handler.bulk_delete_budget_items(
+                TestBulkDeleteBudgetItems.VALID_BULK_DELETE_BODY
+            )
+            self.assertEqual(503, status)
+            self.assertIn("Unable to delete budget items", response["message"])
+
+
+class BaseBudgetRequestTest(unittest.TestCase):
+    """
+    Runs real requests through the test client against an in-memory database,
+    used to guard how many SQL statements a single request may issue.
+    """
+
+    BUDGET_COUNT = 25
+    ITEMS_PER_BUDGET = 4
+
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SECRET_KEY": "test",
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            }
+        )
+        self.client = self.app.test_client()
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        user = User(username="foo", password_hash="not-a-real-hash")
+        db.session.add(user)
+        db.session.flush()
+        for budget_number in range(self.BUDGET_COUNT):
+            budget = Budget(
+                user_id=user.id,
+                name=f"budget_{budget_number}",
+                month_duration=1,
+                gross_income=1000,
+                item_count=self.ITEMS_PER_BUDGET,
+                bills_total=10 * self.ITEMS_PER_BUDGET,
+            )
+            budget.items = [
+                BudgetItem(name=f"item_{item_number}", category="bills", total=10)
+                for item_number in range(self.ITEMS_PER_BUDGET)
+            ]
+            db.session.add(budget)
+        db.session.commit()
+        self.user_id = user.id
+
+        with self.client.session_transaction() as client_session:
+            client_session["user_id"] = {"id": self.user_id, "username": "foo"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+
+class TestBudgetReadRequestQueryCount(BaseBudgetRequestTest):
+
+    def test_get_budgets(self):
+        with assert_max_queries(2):
+            response = self.client.get("/api/budgets?view=full")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.BUDGET_COUNT, len(response.get_json()["budgets"]))
+
+    def test_get_budgets_summary(self):
+        with assert_max_queries(2) as counter:
+            response = self.client.get("/api/budgets")
+
+        self.assertEqual(200, response.status_code)
+        budgets = response.get_json()["budgets"]
+        self.assertEqual(self.BUDGET_COUNT, len(budgets))
+        self.assertNotIn("items", budgets[0])
+        self.assertEqual(self.ITEMS_PER_BUDGET, budgets[0]["item_count"])
+        # items are aggregated in SQL, never selected as rows
+        for statement in counter.statements:
+            self.assertNotIn("budget_item.name", statement)
+
+    def test_get_budget(self):
+        # budget with its items (totals are computed from the cached copy)
+        with assert_max_queries(1):
+            response = self.client.get("/api/budget/1")
+
+        self.assertEqual(200, response.status_code)
+        data = response.get_json()
+        self.assertEqual(self.ITEMS_PER_BUDGET, len(data["budget"]["items"]))
+        self.assertEqual(self.ITEMS_PER_BUDGET, data["totals"]["item_count"])
+        self.assertEqual(960.0, data["totals"]["net_income"])
+
+    def test_read_routes_per_request(self):
+        # counted per request by the app's own statement hooks
+        with assert_max_request_queries(self.app, 2) as recorder:
+            self.client.get("/api/budgets?view=full")
+            self.client.get("/api/budgets")
+            self.client.get("/api/budget/2")
+
+        self.assertEqual(
+            [route for route, *_ in recorder.requests],
+            ["GET /api/budgets", "GET /api/budgets", "GET /api/budget/<int:budget_id>"],
+        )
+
+    def test_request_guard_fails_on_extra_queries(self):
+        budget_handler = "budget_app.routes.api.budget_handler"
+        with patch(f"{budget_handler}.get_item_categories_list") as categories:
+            # a handler lazy loading the items of every budget (N+1)
+            categories.side_effect = lambda: [
+                len(budget.items) for budget in Budget.query.all()
+            ]
+            with self.assertRaisesRegex(
+                AssertionError,
+                r"at most 2 SQL statement\(s\) per request:\n"
+                rf"  GET /api/budget/item/categories: {self.BUDGET_COUNT + 1} statement",
+            ):
+                with assert_max_request_queries(self.app, 2):
+                    self.client.get("/api/budget/item/categories")
+
+    def test_repeat_get_budget_served_from_cache(self):
+        first = self.client.get("/api/budget/1").get_json()
+        with assert_max_queries(0):
+            response = self.client.get("/api/budget/1")
+
+        self.assertEqual(first, response.get_json())
+
+    def test_get_budget_after_edit(self):
+        self.client.get("/api/budget/1")
+        self.client.post(
+            "/api/budget/edit", json={"budget_id": 1, "gross_income": 2000}
+        )
+
+        data = self.client.get("/api/budget/1").get_json()
+        self.assertEqual(2000.0, data["budget"]["gross_income"])
+        self.assertEqual(1960.0, data["totals"]["net_income"])
+
+
+class TestBudgetPaginationRequests(BaseBudgetRequestTest):
+
+    def collect_pages(self, url, key):
+        """follow next_cursor until the last page, return all rows and page count"""
+        rows, pages, cursor = [], 0, None
+        while True:
+            page_url = url if cursor is None else f"{url}&cursor={cursor}"
+            data = self.client.get(page_url).get_json()
+            page = data[key]["items"] if key == "budget" else data[key]
+            rows.extend(page)
+            pages += 1
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return rows, pages
+
+    def test_budgets_pages(self):
+        budgets, pages = self.collect_pages("/api/budgets?limit=10", "budgets")
+        self.assertEqual(3, pages)
+        self.assertEqual(
+            list(range(1, self.BUDGET_COUNT + 1)), [b["id"] for b in budgets]
+        )
+
+    def test_budget_item_pages(self):
+        items, pages = self.collect_pages("/api/budget/1?limit=3", "budget")
+        self.assertEqual(2, pages)
+        self.assertEqual(self.ITEMS_PER_BUDGET, len(items))
+
+    def test_deep_page_query_count(self):
+        with assert_max_queries(2):
+            response = self.client.get("/api/budgets?limit=5&cursor=20")
+
+        self.assertEqual(
+            [21, 22, 23, 24, 25], [b["id"] for b in response.get_json()["budgets"]]
+        )
+
+
+class TestConditionalGetRequests(BaseBudgetRequestTest):
+
+    def test_get_budget_not_modified(self):
+        response = self.client.get("/api/budget/1")
+        etag = response.headers["ETag"]
+        self.assertEqual("private, no-cache", response.headers["Cache-Control"])
+
+        with assert_max_queries(0):  # version read from the cached budget
+            response = self.client.get("/api/budget/1", headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.data)
+        self.assertEqual(etag, response.headers["ETag"])
+
+    def test_get_budget_modified_by_item_write(self):
+        etag = self.client.get("/api/budget/1").headers["ETag"]
+        self.client.post("/api/budget/item/delete", json={"budget_id": 1, "item_id": 1})
+
+        response = self.client.get("/api/budget/1", headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers["ETag"])
+        self.assertEqual(
+            self.ITEMS_PER_BUDGET - 1, len(response.get_json()["budget"]["items"])
+        )
+
+    def test_item_pages_have_their_own_etag(self):
+        first = self.client.get("/api/budget/1?limit=2").headers["ETag"]
+        second = self.client.get("/api/budget/1?limit=2&cursor=2").headers["ETag"]
+        self.assertNotEqual(first, second)
+
+    def test_get_budgets_not_modified(self):
+        etag = self.client.get("/api/budgets").headers["ETag"]
+
+        with assert_max_queries(1):  # (id, version) of the page's budgets
+            response = self.client.get("/api/budgets", headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+
+        self.client.post("/api/budget/edit", json={"budget_id": 3, "name": "renamed"})
+        response = self.client.get("/api/budgets", headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+
+    def test_get_budgets_etag_depends_on_view(self):
+        summary = self.client.get("/api/budgets").headers["ETag"]
+        full = self.client.get("/api/budgets?view=full").headers["ETag"]
+        self.assertNotEqual(summary, full)
+
+
+class TestVersionConflictRequests(BaseBudgetRequestTest):
+    """two tabs loaded the same budget, the second write is based on a stale version"""
+
+    def test_edit_budget_conflict(self):
+        version = self.client.get("/api/budget/1").get_json()["budget"]["version"]
+        first = self.client.post(
+            "/api/budget/edit",
+            json={"budget_id": 1, "name": "first tab", "version": version},
+        )
+        self.assertEqual(200, first.status_code)
+
+        second = self.client.post(
+            "/api/budget/edit",
+            json={"budget_id": 1, "name": "second tab", "version": version},
+        )
+        self.assertEqual(409, second.status_code)
+        current = second.get_json()["budget"]
+        self.assertEqual("first tab", current["name"])
+        self.assertEqual(version + 1, current["version"])
+
+    def test_edit_budget_item_conflict(self):
+        item = self.client.get("/api/budget/1").get_json()["budget"]["items"][0]
+        body = {"budget_id": 1, "item_id": item["id"], "version": item["version"]}
+        first = self.client.post("/api/budget/item/edit", json={**body, "total": 1})
+        self.assertEqual(200, first.status_code)
+
+        second = self.client.post("/api/budget/item/edit", json={**body, "total": 2})
+        self.assertEqual(409, second.status_code)
+        current_item = second.get_json()["budget"]["items"][0]
+        self.assertEqual("1.00", current_item["total"])
+
+    def test_item_write_bumps_budget_version(self):
+        version = self.client.get("/api/budget/1").get_json()["budget"]["version"]
+        self.client.post(
+            "/api/budget/item/create",
+            json={"budget_id": 1, "name": "new", "category": "bills", "total": 5},
+        )
+
+        response = self.client.post(
+            "/api/budget/edit",
+            json={"budget_id": 1, "name": "stale", "version": version},
+        )
+        self.assertEqual(409, response.status_code)
+
+    def test_bulk_edit_conflict(self):
+        items = self.client.get("/api/budget/1").get_json()["budget"]["items"]
+        edits = [
+            {"item_id": item["id"], "version": item["version"], "changes": {"total": 3}}
+            for item in items
+        ]
+        self.client.post(
+            "/api/budget/item/edit",
+            json={"budget_id": 1, "item_id": items[1]["id"], "name": "changed"},
+        )
+
+        response = self.client.post(
+            "/api/budget/item/bulk_edit", json={"budget_id": 1, "items": edits}
+        )
+        self.assertEqual(409, response.status_code)
+        # nothing saved
+        totals = {item["total"] for item in response.get_json()["budget"]["items"]}
+        self.assertEqual({"10.00"}, totals)
+
+
+class TestBulkCreateRequest(BaseBudgetRequestTest):
+
+    def test_one_round_trip(self):
+        items = [
+            {"name": f"line_{number}", "category": "bills", "total": "1.25"}
+            for number in range(300)
+        ]
+        # budget with its items (ownership check), one multi-row INSERT,
+        # budget version UPDATE
+        with assert_max_queries(3):
+            response = self.client.post(
+                "/api/budget/item/bulk_create",
+                json={"budget_id": 1, "items": items},
+            )
+
+        self.assertEqual(200, response.status_code)
+        data = response.get_json()
+        self.assertEqual(300, len(data["budget_item_ids"]))
+        self.assertEqual(self.ITEMS_PER_BUDGET + 300, len(data["budget"]["items"]))
+
+
+class TestNumberValidationRequests(BaseBudgetRequestTest):
+
+    def test_non_finite_numbers_rejected(self):
+        for value in ("Infinity", "nan", "1e400"):
+            response = self.client.post(
+                "/api/budget/create",
+                json={"name": "new", "month_duration": 1, "gross_income": value},
+            )
+            self.assertEqual(422, response.status_code)
+            response = self.client.post(
+                "/api/budget/item/create",
+                json={
+                    "budget_id": 1,
+                    "name": "new",
+                    "category": "bills",
+                    "total": value,
+                },
+            )
+            self.assertEqual(422, response.status_code)
+
+
+class TestWriteRequestQueryCount(BaseBudgetRequestTest):
+    """write endpoints respond with the budget they wrote, without re-reading it"""
+
+    def test_create_budget(self):
+        # INSERT (name uniqueness is left to the constraint)
+        with assert_max_queries(1):
+            response = self.client.post(
+                "/api/budget/create",
+                json={"name": "new", "month_duration": 1, "gross_income": "12.5"},
+            )
+
+        self.assertEqual(200, response.status_code)
+        budget = response.get_json()["budget"]
+        self.assertEqual("new", budget["name"])
+        self.assertEqual(12.5, budget["gross_income"])
+        self.assertEqual([], budget["items"])
+
+    def test_create_budget_item(self):
+        # budget with its items, INSERT, budget version UPDATE
+        with assert_max_queries(3):
+            response = self.client.post(
+                "/api/budget/item/create",
+                json={"budget_id": 1, "name": "new", "category": "bills", "total": 5},
+            )
+
+        self.assertEqual(200, response.status_code)
+        data = response.get_json()
+        items = data["budget"]["items"]
+        self.assertEqual(self.ITEMS_PER_BUDGET + 1, len(items))
+        self.assertEqual(
+            {"id": data["budget_item_id"], "name": "new", "category": "bills"},
+            {key: items[-1][key] for key in ["id", "name", "category"]},
+        )
+        self.assertEqual("5.00", items[-1]["total"])
+
+    def test_edit_budget(self):
+        # budget with its items, UPDATE
+        with assert_max_queries(2):
+            response = self.client.post(
+                "/api/budget/edit",
+                json={"budget_id": 1, "name": "renamed", "month_duration": "12"},
+            )
+
+        self.assertEqual(200, response.status_code)
+        budget = response.get_json()["budget"]
+        self.assertEqual("renamed", budget["name"])
+        self.assertEqual(12, budget["month_duration"])
+        self.assertEqual(self.ITEMS_PER_BUDGET, len(budget["items"]))
+
+    def test_duplicate_budget_name(self):
+        response = self.client.post(
+            "/api/budget/create",
+            json={"name": "budget_1", "month_duration": 1, "gross_income": 1},
+        )
+        self.assertEqual(422, response.status_code)
+        self.assertEqual(
+            "You already have a budget with that name.",
+            response.get_json()["message"],
+        )
+
+    def test_edit_budget_item(self):
+        # budget with its items, item UPDATE, budget version UPDATE
+        with assert_max_queries(3):
+            response = self.client.post(
+                "/api/budget/item/edit",
+                json={"budget_id": 1, "item_id": 1, "total": "7.5"},
+            )
+
+        self.assertEqual(200, response.status_code)
+        items = response.get_json()["budget"]["items"]
+        self.assertEqual("7.50", items[0]["total"])
+
+    def test_edit_budget_item_of_other_user(self):
+        other_user = User(username="bar", password_hash="not-a-real-hash")
+        db.session.add(other_user)
+        db.session.flush()
+        other_user_budget = Budget(
+            user_id=other_user.id, name="other", month_duration=1, gross_income=1
+        )
+        other_user_budget.items = [BudgetItem(name="x", category="bills", total=1)]
+        db.session.add(other_user_budget)
+        db.session.commit()
+
+        response = self.client.post(
+            "/api/budget/item/edit",
+            json={
+                "budget_id": other_user_budget.id,
+                "item_id": other_user_budget.items[0].id,
+                "name": "mine now",
+            },
+        )
+        self.assertEqual(422, response.status_code)
+
+
+class TestBulkEditDeleteRequests(BaseBudgetRequestTest):
+
+    def test_bulk_edit_query_count(self):
+        # budget 1 owns items 1..ITEMS_PER_BUDGET
+        edits = [
+            {"item_id": item_id, "changes": {"total": "9.99"}}
+            for item_id in range(1, self.ITEMS_PER_BUDGET + 1)
+        ]
+        # budget with its items (ownership + item ids check), one UPDATE
+        # executemany, budget version UPDATE
+        with assert_max_queries(3):
+            response = self.client.post(
+                "/api/budget/item/bulk_edit",
+                json={"budget_id": 1, "items": edits},
+            )
+
+        self.assertEqual(200, response.status_code)
+        totals = {item["total"] for item in response.get_json()["budget"]["items"]}
+        self.assertEqual({"9.99"}, totals)
+
+    def test_bulk_delete_query_count(self):
+        item_ids = list(range(1, self.ITEMS_PER_BUDGET + 1))
+        # ownership check, one DELETE, budget version UPDATE
+        with assert_max_queries(3):
+            response = self.client.post(
+                "/api/budget/item/bulk_delete",
+                json={"budget_id": 1, "item_ids": item_ids},
+            )
+
+        self.assertEqual(200, response.status_code)
+        response = self.client.get("/api/budget/1")
+        self.assertEqual([], response.get_json()["budget"]["items"])
+
+    def test_bulk_delete_other_budget_item_deletes_nothing(self):
+        # last id belongs to budget 2
+        item_ids = [1, 2, self.ITEMS_PER_BUDGET + 1]
+        response = self.client.post(
+            "/api/budget/item/bulk_delete",
+            json={"budget_id": 1, "item_ids": item_ids},
+        )
+
+        self.assertEqual(422, response.status_code)
+        response = self.client.get("/api/budget/1")
+        self.assertEqual(
+            self.ITEMS_PER_BUDGET, len(response.get_json()["budget"]["items"])
+        )
+
+
+class TestImportRequests(BaseBudgetRequestTest):
+
+    def test_import_upload(self):
+        upload = io.BytesIO(
+            b"\xef\xbb\xbfname,category,total\r\nPower,bills,80.5\r\nGym,savings,20\r\n"
+        )
+        response = self.client.post(
+            "/api/budget/1/import",
+            data={"file": (upload, "items.csv")},
+            content_type="multipart/form-data",
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"budget_id": 1, "imported": 2}, response.get_json())
+        totals = self.client.get("/api/budget/1").get_json()["totals"]
+        self.assertEqual(self.ITEMS_PER_BUDGET + 2, totals["item_count"])
+        self.assertEqual(20.0, totals["category_totals"]["savings"])
+
+    def test_import_request_body(self):
+        response = self.client.post(
+            "/api/budget/1/import",
+            data="name,category,total\nPower,bills,80.5\nGym,fun,20\n",
+            content_type="text/csv",
+        )
+
+        self.assertEqual(422, response.status_code)
+        self.assertEqual(
+            [{"index": 3, "message": "Category: 'fun' is not valid"}],
+            response.get_json()["errors"],
+        )
+
+    def test_import_not_utf8(self):
+        response = self.client.post(
+            "/api/budget/1/import",
+            data=b"name,category,total\n\xff,bills,1\n",
+            content_type="text/csv",
+        )
+        self.assertEqual(422, response.status_code)
+        self.assertEqual(
+            "CSV file must be UTF-8 encoded.", response.get_json()["message"]
+        )
+
+
+class TestExportRequests(BaseBudgetRequestTest):
+
+    def test_export_ndjson(self):
+        response = self.client.get("/api/export")
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual("application/x-ndjson", response.mimetype)
+        self.assertEqual(
+            "attachment; filename=budgets.ndjson",
+            response.headers["Content-Disposition"],
+        )
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(self.BUDGET_COUNT * (1 + self.ITEMS_PER_BUDGET), len(lines))
+        self.assertEqual("budget", json.loads(lines[0])["type"])
+
+    def test_export_csv(self):
+        with assert_max_queries(1):
+            response = self.client.get("/api/export?format=csv")
+            lines = response.get_data(as_text=True).splitlines()
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("text/csv", response.mimetype)
+        self.assertEqual(1 + self.BUDGET_COUNT * self.ITEMS_PER_BUDGET, len(lines))
+
+    @patch(
+        "budget_app.services.budget.export.iter_export_rows",
+        side_effect=RuntimeError("connection lost"),
+    )
+    def test_error_mid_export(self, mock_iter_export_rows):
+        # the error isn't swallowed: the response isn't ended normally
+        with self.assertLogs("budget_app.export", "ERROR"):
+            with self.assertRaises(RuntimeError):
+                self.client.get("/api/export").get_data()
+
+    def test_invalid_format(self):
+        response = self.client.get("/api/export?format=xml")
+        self.assertEqual(422, response.status_code)
+        self.assertIn("Valid formats are", response.get_json()["message"])
+
+    def test_requires_login(self):
+        with self.client.session_transaction() as client_session:
+            client_session.clear()
+        response = self.client.get("/api/export")
+        self.assertNotEqual(200, response.status_code)
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,186 @@
+"""
+Synthetic data for load and scale testing (`app seed`): users x budgets x
+items with a realistic category mix, written with bulk executemany INSERTs
+so millions of rows load in seconds, on SQLite or Postgres.
+
+The same seed always generates the same data (names, categories, totals).
+Every seeded user can log in with SEED_PASSWORD.
+"""
+
+from decimal import Decimal
+import random
+import time
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from .extensions import db, password_hasher
+from .models import Budget, BudgetItem, User
+from .services.budget.aggregate import total_column_name
+from .services.budget.validate_input import VALID_BUDGET_ITEM_CATEGORY
+
+SEED_USERNAME_PREFIX = "seed_user"
+SEED_PASSWORD = "seed-password"
+INSERT_CHUNK_SIZE = 10_000
+
+# share of the items in each category, and the (name, monthly min, monthly max)
+# an item of that category is drawn from
+CATEGORY_WEIGHTS = {"bills": 60, "savings": 20, "deductions": 20}
+ITEM_TEMPLATES = {
+    "bills": [
+        ("Rent", 700, 2500),
+        ("Groceries", 150, 800),
+        ("Electricity", 30, 200),
+        ("Internet", 30, 90),
+        ("Phone", 20, 100),
+        ("Car insurance", 60, 250),
+        ("Gas", 40, 300),
+        ("Streaming", 8, 40),
+        ("Gym", 15, 80),
+        ("Student loan", 100, 600),
+    ],
+    "savings": [
+        ("Emergency fund", 50, 500),
+        ("Vacation", 25, 300),
+        ("Brokerage", 50, 1000),
+        ("Down payment", 100, 1500),
+    ],
+    "deductions": [
+        ("401k", 100, 1200),
+        ("Health insurance", 80, 450),
+        ("Federal tax", 300, 2500),
+        ("State tax", 50, 800),
+    ],
+}
+# monthly income range, annual budgets (month_duration 12) scale by 12
+GROSS_INCOME_RANGE = (2500, 15000)
+ANNUAL_BUDGET_SHARE = 0.25
+
+
+def _money(rng, low, high):
+    """random amount in [low, high) with cents, as an exact Decimal"""
+    return Decimal(rng.randrange(low * 100, high * 100)).scaleb(-2)
+
+
+def _budget_rows(rng, user_id, budget_number, items_per_budget):
+    """return (budget row, its item rows without budget_id)"""
+    month_duration = 12 if rng.random() < ANNUAL_BUDGET_SHARE else 1
+    categories = rng.choices(
+        list(CATEGORY_WEIGHTS), weights=CATEGORY_WEIGHTS.values(), k=items_per_budget
+    )
+
+    items = []
+    totals = {category: Decimal(0) for category in VALID_BUDGET_ITEM_CATEGORY}
+    for category in categories:
+        name, low, high = rng.choice(ITEM_TEMPLATES[category])
+        total = _money(rng, low * month_duration, high * month_duration)
+        items.append({"name": name, "category": category, "total": total})
+        totals[category] += total
+
+    budget = {
+        "user_id": user_id,
+        "name": f"{'Annual' if month_duration == 12 else 'Monthly'} budget {budget_number}",
+        "month_duration": month_duration,
+        "gross_income": _money(
+            rng, *(income * month_duration for income in GROSS_INCOME_RANGE)
+        ),
+        "item_count": len(items),
+        **{total_column_name(category): total for category, total in totals.items()},
+    }
+    return budget, items
+
+
+def seed_database(
+    user_count,
+    budgets_per_user,
+    items_per_budget,
+    seed=0,
+    prehashed_passwords=False,
+    username_prefix=SEED_USERNAME_PREFIX,
+):
+    """
+    Insert user_count users (<username_prefix>_<n>), each with budgets_per_user
+    budgets of items_per_budget items, then commit.
+
+    prehashed_passwords: hash SEED_PASSWORD once and give every user that
+    hash (instead of paying the password hashing cost per user)
+
+    return {"users", "budgets", "items", "seconds"}
+    OR raise ValueError when users with username_prefix already exist
+    """
+    if min(user_count, budgets_per_user, items_per_budget) < 0:
+        raise ValueError("User, budget and item counts must not be negative.")
+
+    like_prefix = username_prefix.replace("_", r"\_") + r"\_%"
+    if User.query.filter(User.username.like(like_prefix, escape="\\")).first():
+        raise ValueError(
+            f"Users named '{username_prefix}_<n>' already exist, use another prefix."
+        )
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    # the app's PASSWORD_HASH_METHOD: the first logins don't upgrade the hashes
+    template_hash = generate_password_hash(SEED_PASSWORD, password_hasher.method)
+
+    # RETURNING rows are matched back by their unique columns (username,
+    # user_id + budget name): asking for them in parameter order would make
+    # SQLite fall back to one INSERT per row
+    user_ids = []
+    for first in range(0, user_count, INSERT_CHUNK_SIZE):
+        usernames = [
+            f"{username_prefix}_{number}"
+            for number in range(first, min(first + INSERT_CHUNK_SIZE, user_count))
+        ]
+        returned = db.session.execute(
+            insert(User).returning(User.username, User.id),
+            [
+                {
+                    "username": username,
+                    "password_hash": (
+                        template_hash
+                        if prehashed_passwords
+                        else generate_password_hash(
+                            SEED_PASSWORD, password_hasher.method
+                        )
+                    ),
+                }
+                for username in usernames
+            ],
+        )
+        id_by_username = dict(returned.all())
+        user_ids += [id_by_username[username] for username in usernames]
+
+    # budgets are generated and inserted a chunk at a time (about
+    # INSERT_CHUNK_SIZE items per chunk), memory doesn't grow with the total
+    budgets_per_chunk = max(1, INSERT_CHUNK_SIZE // max(items_per_budget, 1))
+    budget_keys = [
+        (user_id, number) for user_id in user_ids for number in range(budgets_per_user)
+    ]
+    for first in range(0, len(budget_keys), budgets_per_chunk):
+        generated = [
+            _budget_rows(rng, user_id, number, items_per_budget)
+            for user_id, number in budget_keys[first : first + budgets_per_chunk]
+        ]
+        returned = db.session.execute(
+            insert(Budget).returning(Budget.user_id, Budget.name, Budget.id),
+            [budget for budget, _ in generated],
+        )
+        id_by_key = {
+            (user_id, name): budget_id for user_id, name, budget_id in returned
+        }
+
+        item_rows = [
+            {"budget_id": id_by_key[(budget["user_id"], budget["name"])], **item}
+            for budget, items in generated
+            for item in items
+        ]
+        if item_rows:
+            db.session.execute(insert(BudgetItem), item_rows)
+
+    db.session.commit()
+    return {
+        "users": len(user_ids),
+        "budgets": len(budget_keys),
+        "items": len(budget_keys) * items_per_budget,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
@@ -0,0 +1,119 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import select
+
+from budget_app import create_app
+from .extensions import db
+from .models import Budget, BudgetItem, User
+from .seed import SEED_PASSWORD, seed_database
+from .services.budget.aggregate import rebuild_budget_totals
+from .services.budget.validate_input import VALID_BUDGET_ITEM_CATEGORY
+from .testing import QueryCounter
+
+
+class SeedDatabase(unittest.TestCase):
+    """
+    seed_database takes in: user_count, budgets_per_user, items_per_budget
+    and inserts that many synthetic users, budgets and items
+    """
+
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            }
+        )
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def generated_data(self):
+        return db.session.execute(
+            select(
+                User.username,
+                Budget.name,
+                Budget.month_duration,
+                Budget.gross_income,
+                BudgetItem.name,
+                BudgetItem.category,
+                BudgetItem.total,
+            )
+            .join(Budget, Budget.user_id == User.id)
+            .join(BudgetItem, BudgetItem.budget_id == Budget.id)
+            .order_by(User.id, Budget.id, BudgetItem.id)
+        ).all()
+
+    def test_counts(self):
+        response = seed_database(3, 4, 5, prehashed_passwords=True)
+
+        self.assertEqual(
+            {key: response[key] for key in ["users", "budgets", "items"]},
+            {"users": 3, "budgets": 12, "items": 60},
+        )
+        self.assertEqual(User.query.count(), 3)
+        self.assertEqual(Budget.query.filter_by(user_id=1).count(), 4)
+        self.assertEqual(BudgetItem.query.count(), 60)
+        self.assertTrue(
+            {item.category for item in BudgetItem.query}.issubset(
+                VALID_BUDGET_ITEM_CATEGORY
+            )
+        )
+
+    def test_totals_materialized(self):
+        seed_database(2, 3, 10, prehashed_passwords=True)
+        self.assertEqual(rebuild_budget_totals(fix=False), [])
+
+    def test_same_seed_same_data(self):
+        seed_database(2, 2, 5, seed=42, prehashed_passwords=True)
+        first = self.generated_data()
+
+        db.drop_all()
+        db.create_all()
+        seed_database(2, 2, 5, seed=42, prehashed_passwords=True)
+        self.assertEqual(self.generated_data(), first)
+
+        db.drop_all()
+        db.create_all()
+        seed_database(2, 2, 5, seed=7, prehashed_passwords=True)
+        self.assertNotEqual(self.generated_data(), first)
+
+    def test_bulk_inserts(self):
+        with patch("budget_app.seed.INSERT_CHUNK_SIZE", 10):
+            with QueryCounter() as counter:
+                seed_database(2, 5, 4, prehashed_passwords=True)
+
+        # 1 users INSERT, 5 chunks of 2 budgets (INSERT budgets + items)
+        inserts = [s for s in counter.statements if s.startswith("INSERT")]
+        self.assertEqual(len(inserts), 1 + 5 * 2)
+        self.assertEqual(BudgetItem.query.count(), 40)
+
+    def test_passwords(self):
+        seed_database(2, 0, 0, prehashed_passwords=True)
+        users = User.query.order_by(User.id).all()
+        self.assertEqual(
+            [user.username for user in users], ["seed_user_0", "seed_user_1"]
+        )
+        self.assertEqual(users[0].password_hash, users[1].password_hash)
+        self.assertTrue(users[0].check_password(SEED_PASSWORD))
+
+        seed_database(2, 0, 0, username_prefix="hashed")
+        users = User.query.filter(User.username.startswith("hashed")).all()
+        self.assertNotEqual(users[0].password_hash, users[1].password_hash)
+        self.assertTrue(users[1].check_password(SEED_PASSWORD))
+
+    def test_prefix_already_seeded(self):
+        seed_database(1, 1, 1, prehashed_passwords=True)
+        with self.assertRaisesRegex(ValueError, "already exist"):
+            seed_database(1, 1, 1, prehashed_passwords=True)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
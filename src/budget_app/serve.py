@@ -0,0 +1,151 @@
+"""
+Production server (`app serve`): gunicorn, configured by gunicorn_conf.py.
+
+    poetry run app serve --workers 4 --threads 4
+
+The command line options map onto gunicorn's settings (gunicorn_conf.py
+holds the defaults and the fork hooks). Before gunicorn loads the app:
+- PROMETHEUS_MULTIPROC_DIR is created when unset (a temporary directory)
+  and emptied of a previous run, so /api/metrics covers every worker;
+  prometheus_client reads it when imported, so the server restarts itself
+  (exec) with it set
+- with more than one worker the budget cache (see cache.py) is disabled: a
+  write only clears the cache of the worker handling it, the others would
+  keep serving (and answering 304s for) the budget it replaced
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from . import gunicorn_conf
+from .metrics import multiprocess_dir
+
+
+def prepare_metrics_dir():
+    """PROMETHEUS_MULTIPROC_DIR emptied of a previous run's worker files"""
+    directory = multiprocess_dir()
+    os.makedirs(directory, exist_ok=True)
+    for file_name in os.listdir(directory):
+        if file_name.endswith(".db"):
+            os.remove(os.path.join(directory, file_name))
+    return directory
+
+
+def disable_budget_cache(workers):
+    """BUDGET_CACHE_BACKEND=null when workers don't share one cache"""
+    backend = os.getenv("BUDGET_CACHE_BACKEND") or "lru"
+    if workers > 1 and backend != "null":
+        print(
+            f"BUDGET_CACHE_BACKEND={backend} is per process: "
+            f"disabled for {workers} workers",
+            flush=True,
+        )
+        os.environ["BUDGET_CACHE_BACKEND"] = "null"
+
+
+def gunicorn_argv(args):
+    """the gunicorn command line running budget_app.app:app for args"""
+    argv = [
+        "gunicorn",
+        "--config",
+        "python:budget_app.gunicorn_conf",
+        "--bind",
+        f"{args.host}:{args.port}",
+        "--workers",
+        str(args.workers),
+        "--threads",
+        str(args.threads),
+        "--max-requests",
+        str(args.max_requests),
+        "--max-requests-jitter",
+        str(args.max_requests_jitter),
+        "--graceful-timeout",
+        str(args.graceful_timeout),
+        "--timeout",
+        str(args.timeout),
+    ]
+    if args.access_log:
+        argv += ["--access-logfile", "-"]
+    return argv + ["budget_app.app:app"]
+
+
+def serve(args):
+    from gunicorn.app.wsgiapp import WSGIApplication
+
+    prepare_metrics_dir()
+    disable_budget_cache(args.workers)
+
+    sys.argv = gunicorn_argv(args)
+    WSGIApplication("%(prog)s [OPTIONS] [APP_MODULE]", prog="gunicorn").run()
+    return 0
+
+
+def main(argv=None):
+    if not multiprocess_dir():
+        # too late for this process: prometheus_client is already imported
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+            prefix="budget_app_metrics_"
+        )
+        argv = sys.argv[1:] if argv is None else argv
+        os.execv(sys.executable, [sys.executable, "-m", __spec__.name, *argv])
+
+    parser = argparse.ArgumentParser(
+        prog="budget_app.serve", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.getenv("APP_PORT") or gunicorn_conf.DEFAULT_PORT),
+        help=f"default APP_PORT or {gunicorn_conf.DEFAULT_PORT}",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=gunicorn_conf.workers,
+        help="worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=gunicorn_conf.threads,
+        help=f"request threads per worker (default {gunicorn_conf.threads})",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=gunicorn_conf.max_requests,
+        help=f"recycle a worker after this many requests, 0: never (default {gunicorn_conf.max_requests})",
+    )
+    parser.add_argument(
+        "--max-requests-jitter",
+        type=int,
+        default=gunicorn_conf.max_requests_jitter,
+        help=f"random extra requests per worker (default {gunicorn_conf.max_requests_jitter})",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=gunicorn_conf.graceful_timeout,
+        help="seconds the workers get to finish their requests when stopping",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=gunicorn_conf.timeout,
+        help="seconds a worker may stay silent (stuck) before it's replaced",
+    )
+    parser.add_argument(
+        "--access-log", action="store_true", help="log every request to stdout"
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+
+    return serve(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+from urllib.request import Request, urlopen
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class GunicornServer(unittest.TestCase):
+    """runs `python -m budget_app.serve` (gunicorn) on a free port"""
+
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir)
+
+    def start_server(self, *args):
+        env = dict(
+            os.environ,
+            DATABASE_URL="sqlite://",
+            SECRET_KEY="serve-test",
+            OPS_TOKEN="serve-test",
+            PROMETHEUS_MULTIPROC_DIR=self.metrics_dir,
+            PYTHONPATH=SRC_DIR,
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "budget_app.serve", "--port", "0", *args],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.addCleanup(server.kill)
+        # notices (e.g. the budget cache disabled) come first
+        for line in server.stdout:
+            match = re.match(r"Listening on (\S+)", line)
+            if match:
+                return server, match.group(1)
+        self.fail("the server exited before listening")
+
+    def get(self, url):
+        request = Request(url, headers={"Authorization": "Bearer serve-test"})
+        with urlopen(request, timeout=10) as response:
+            return response.status, response.read().decode()
+
+    def worker_pids(self):
+        # prometheus_client's files: <type>_<pid>.db
+        return {
+            name.rsplit("_", 1)[1]
+            for name in os.listdir(self.metrics_dir)
+            if name.endswith(".db")
+        }
+
+    def test_workers_recycled_metrics_aggregated(self):
+        server, url = self.start_server(
+            "--workers",
+            "2",
+            "--threads",
+            "2",
+            "--max-requests",
+            "2",
+            "--max-requests-jitter",
+            "0",
+        )
+        for _ in range(10):
+            self.assertEqual(self.get(f"{url}/api/health")[0], 200)
+        # one cache per worker would serve budgets changed by the others
+        _, stats = self.get(f"{url}/api/cache/stats")
+        self.assertEqual(json.loads(stats)["backend"], "null")
+
+        # 10 requests, at most 2 per worker: at least 5 workers served them
+        self.assertGreaterEqual(len(self.worker_pids()), 5)
+        _, text = self.get(f"{url}/api/metrics")
+        self.assertIn(
+            'http_requests_total{endpoint="/api/health",method="GET",status="200"} 10.0',
+            text,
+        )
+
+        server.send_signal(signal.SIGTERM)
+        self.assertEqual(server.wait(timeout=10), 0)
+
+    def test_graceful_stop(self):
+        server, url = self.start_server("--workers", "1", "--max-requests", "0")
+        self.assertEqual(self.get(f"{url}/api/health")[0], 200)
+
+        server.send_signal(signal.SIGTERM)
+        self.assertEqual(server.wait(timeout=10), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,24 +1,32 @@
-from ...extensions import db
+from sqlalchemy.exc import IntegrityError
+
+from ...extensions import db, password_hasher
 from flask import session
 from ...models import User
+from ...passwords import PasswordHashQueueFull
+from ...utils import is_unique_violation
 
 
 def create_user(username, password):
-    # Check username already exists
-    existing_user = User.query.filter_by(username=username).first()
-    if existing_user:
-        return False
-
     new_user = User(username=username)
     new_user.set_password(password)
     db.session.add(new_user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        # username already exists (unique constraint), no lookup needed beforehand
+        if is_unique_violation(e):
+            return False
+        raise
     return True
 
 
 def authenticate_user(username, password):
     user = User.query.filter_by(username=username).first()
     if user and user.check_password(password):
+        if password_hasher.needs_rehash(user.password_hash):
+            _upgrade_password_hash(user, password)
         return {
             "id": user.id,
             "username": user.username,
@@ -27,6 +35,15 @@ def authenticate_user(username, password):
     return None
 
 
+def _upgrade_password_hash(user, password):
+    """rehash with the current PASSWORD_HASH_METHOD, while the password is known"""
+    try:
+        user.set_password(password)
+    except PasswordHashQueueFull:
+        return  # busy: upgraded on a later login
+    db.session.commit()
+
+
 def get_session():
     user = session.get("user_id", None)
     if not user:
@@ -1,5 +1,6 @@
 import unittest
 from flask import session
+from werkzeug.security import generate_password_hash
 
 from budget_app.services.auth.auth_service import (
     authenticate_user,
@@ -10,6 +11,7 @@ from budget_app.services.auth.auth_service import (
 from ...models import User
 from budget_app import create_app
 from ...extensions import db
+from ...testing import assert_max_queries
 
 
 class BaseTestCase(unittest.TestCase):
@@ -59,9 +61,14 @@ class CreateUser(BaseTestCase):
         user_exists = User.query.filter_by(username="foo").first()
         self.assertTrue(user_exists)
 
-        response = create_user(username="foo", password="bar")
+        # the unique constraint rejects the INSERT, no lookup query beforehand
+        with assert_max_queries(1):
+            response = create_user(username="foo", password="bar")
         self.assertFalse(response)
 
+        # the failed INSERT was rolled back, the session is still usable
+        self.assertEqual(1, User.query.filter_by(username="foo").count())
+
 
 class UserDataFixture(BaseTestCase):
     def setUp(self):
@@ -91,6 +98,24 @@ class AuthenticateUser(UserDataFixture):
         response = authenticate_user(username="notuser", password="notpassword")
         self.assertIsNone(response)
 
+    def test_outdated_hash_upgraded(self):
+        user = User.query.filter_by(username="foo").one()
+        user.password_hash = generate_password_hash("bar", "pbkdf2:sha256:1000")
+        db.session.commit()
+
+        # a failed login leaves it alone
+        self.assertIsNone(authenticate_user(username="foo", password="notpassword"))
+        self.assertTrue(user.password_hash.startswith("pbkdf2:sha256:1000$"))
+
+        response = authenticate_user(username="foo", password="bar")
+        self.assertEqual({"id": 1, "username": "foo"}, response)
+        db.session.expire_all()
+        self.assertTrue(user.password_hash.startswith("scrypt:32768:8:1$"))
+        self.assertEqual(
+            {"id": 1, "username": "foo"},
+            authenticate_user(username="foo", password="bar"),
+        )
+
 
 class GetSession(BaseTestCase):
     def test_success(self):
@@ -0,0 +1,120 @@
+"""
+SQL side aggregation of budget items (category totals / net income).
+
+Every budget keeps its totals materialized in its item_count and
+<category>_total columns (maintained by the item writes of budget_service),
+the source of every totals read. rebuild_budget_totals verifies / repairs
+the columns against the totals summed from the items in SQL
+(summed_totals_columns).
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import func, or_, select, update
+
+from budget_app.services.budget.validate_input import VALID_BUDGET_ITEM_CATEGORY
+from ...extensions import db
+from ...models import Budget, BudgetItem
+
+
+def format_budget_totals(gross_income, item_count, category_totals):
+    """
+    Build the serializable totals dict from an item count and a
+    dict of category -> summed total (categories without items may be missing),
+    shaped like:
+        {
+            "item_count": 3,
+            "category_totals": {"deductions": 250.0, "bills": 1600.0, "savings": 0.0},
+            "total_expenses": 1850.0,
+            "net_income": 1650.0,
+        }
+    """
+    category_totals = {
+        category: Decimal(str(category_totals.get(category, 0)))
+        for category in VALID_BUDGET_ITEM_CATEGORY
+    }
+    total_expenses = sum(category_totals.values(), Decimal(0))
+
+    return {
+        "item_count": item_count,
+        "category_totals": {
+            category: float(total) for category, total in category_totals.items()
+        },
+        "total_expenses": float(total_expenses),
+        "net_income": float(Decimal(str(gross_income)) - total_expenses),
+    }
+
+
+def total_column_name(category):
+    """name of the Budget column holding the materialized total of a category"""
+    return f"{category}_total"
+
+
+def format_budget_totals_from_columns(budget):
+    """
+    Totals (see format_budget_totals) read from the materialized item_count /
+    <category>_total columns of a Budget (or a row selecting them): no
+    item is loaded or summed, the cost is O(1) per budget.
+    """
+    return format_budget_totals(
+        budget.gross_income,
+        budget.item_count,
+        {
+            category: getattr(budget, total_column_name(category))
+            for category in VALID_BUDGET_ITEM_CATEGORY
+        },
+    )
+
+
+def summed_totals_columns():
+    """
+    dict of column name -> correlated subquery summing the items of the
+    budget (of the enclosing statement) into that materialized column
+    """
+    columns = {
+        "item_count": select(func.count(BudgetItem.id))
+        .where(BudgetItem.budget_id == Budget.id)
+        .scalar_subquery()
+    }
+    for category in VALID_BUDGET_ITEM_CATEGORY:
+        # rounded like the Numeric(14, 2) column (SQLite sums floats)
+        columns[total_column_name(category)] = (
+            select(func.round(func.coalesce(func.sum(BudgetItem.total), 0), 2))
+            .where(BudgetItem.budget_id == Budget.id, BudgetItem.category == category)
+            .scalar_subquery()
+        )
+    return columns
+
+
+def rebuild_budget_totals(fix=True):
+    """
+    Compare every budget's materialized columns with the totals summed from
+    its items (correlated subqueries, like the backfill of migration
+    de27ff746845).
+
+    return list of the ids (ascending) of the budgets whose columns were
+    wrong; when fix, they are recomputed and written by one UPDATE (the
+    database sums the items as it writes, no totals read beforehand can be
+    stale) and committed
+    """
+    summed_columns = summed_totals_columns()
+    stored_columns = {
+        name: func.round(getattr(Budget, name), 2) for name in summed_columns
+    }
+    stored_columns["item_count"] = Budget.item_count
+    out_of_date = or_(
+        *(stored_columns[name] != summed for name, summed in summed_columns.items())
+    )
+    mismatched_budget_ids = list(
+        db.session.scalars(select(Budget.id).where(out_of_date).order_by(Budget.id))
+    )
+
+    if fix and mismatched_budget_ids:
+        db.session.execute(
+            update(Budget)
+            .where(out_of_date)
+            .values(version=Budget.version + 1, **summed_columns)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    return mismatched_budget_ids
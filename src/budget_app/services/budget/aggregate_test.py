@@ -0,0 +1,175 @@
+import unittest
+from decimal import Decimal
+
+from budget_app import create_app
+from budget_app.models import Budget, BudgetItem, User
+from budget_app.services.budget.aggregate import (
+    format_budget_totals,
+    format_budget_totals_from_columns,
+    rebuild_budget_totals,
+)
+from ...extensions import db
+from ...testing import QueryCounter
+
+
+class FormatBudgetTotals(unittest.TestCase):
+
+    def test_success(self):
+        response = format_budget_totals(
+            "1000", 3, {"bills": "200.10", "savings": "100.20"}
+        )
+        expected_totals = {
+            "item_count": 3,
+            "category_totals": {"deductions": 0.0, "bills": 200.1, "savings": 100.2},
+            "total_expenses": 300.3,
+            "net_income": 699.7,
+        }
+        self.assertEqual(response, expected_totals)
+
+    def test_negative_net_income(self):
+        response = format_budget_totals("100", 1, {"bills": "150"})
+        self.assertEqual(response["net_income"], -50.0)
+
+    def test_from_columns(self):
+        budget = Budget(
+            gross_income=Decimal("1000.00"),
+            item_count=3,
+            deductions_total=Decimal("0.00"),
+            bills_total=Decimal("200.30"),
+            savings_total=Decimal("100.00"),
+        )
+        response = format_budget_totals_from_columns(budget)
+        self.assertEqual(
+            response,
+            format_budget_totals("1000", 3, {"bills": "200.30", "savings": "100"}),
+        )
+
+
+class RebuildBudgetTotals(unittest.TestCase):
+    """
+    rebuild_budget_totals compares every budget's materialized totals columns
+    with the totals summed from its items, fixing them unless fix=False
+    """
+
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            }
+        )
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all(
+            [
+                User(id=3, username="user_3", password_hash="not-a-hash"),
+                User(id=10, username="user_10", password_hash="not-a-hash"),
+            ]
+        )
+
+        self.budget = Budget(
+            user_id=10, name="mock_name", month_duration=1, gross_income=3500
+        )
+        self.budget.items = [
+            BudgetItem(name="Rent", category="bills", total=1200),
+            BudgetItem(name="Groceries", category="bills", total=400),
+            BudgetItem(name="401k", category="deductions", total=250),
+        ]
+        self.empty_budget = Budget(
+            user_id=10, name="empty", month_duration=12, gross_income=100
+        )
+        self.other_user_budget = Budget(
+            user_id=3, name="other", month_duration=1, gross_income=10
+        )
+        db.session.add_all([self.budget, self.empty_budget, self.other_user_budget])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def totals_columns(self, budget):
+        db.session.refresh(budget)
+        return (
+            budget.item_count,
+            budget.deductions_total,
+            budget.bills_total,
+            budget.savings_total,
+        )
+
+    def test_rebuild(self):
+        # the fixture's items were inserted directly: columns still at 0
+        self.assertEqual(rebuild_budget_totals(), [self.budget.id])
+        self.assertEqual(
+            self.totals_columns(self.budget),
+            (3, Decimal("250.00"), Decimal("1600.00"), Decimal("0.00")),
+        )
+        self.assertEqual(self.totals_columns(self.empty_budget), (0, 0, 0, 0))
+        self.assertEqual(
+            format_budget_totals_from_columns(self.budget),
+            {
+                "item_count": 3,
+                "category_totals": {
+                    "deductions": 250.0,
+                    "bills": 1600.0,
+                    "savings": 0.0,
+                },
+                "total_expenses": 1850.0,
+                "net_income": 1650.0,
+            },
+        )
+
+    def test_up_to_date(self):
+        rebuild_budget_totals()
+        version = self.budget.version
+        self.assertEqual(rebuild_budget_totals(fix=False), [])
+        self.assertEqual(rebuild_budget_totals(), [])
+        db.session.refresh(self.budget)
+        self.assertEqual(self.budget.version, version)
+
+    def test_check_only(self):
+        self.assertEqual(rebuild_budget_totals(fix=False), [self.budget.id])
+        self.assertEqual(self.totals_columns(self.budget), (0, 0, 0, 0))
+
+    def test_wrong_total_fixed(self):
+        rebuild_budget_totals()
+        self.budget.savings_total = Decimal("12.00")
+        self.budget.item_count = 7
+        db.session.commit()
+
+        self.assertEqual(rebuild_budget_totals(), [self.budget.id])
+        self.assertEqual(
+            self.totals_columns(self.budget),
+            (3, Decimal("250.00"), Decimal("1600.00"), Decimal("0.00")),
+        )
+
+    def test_fixed_by_one_update(self):
+        # the totals are summed by the UPDATE itself: no totals read by the
+        # app beforehand could be stale by the time they are written
+        with QueryCounter() as counter:
+            self.assertEqual(rebuild_budget_totals(), [self.budget.id])
+        updates = [s for s in counter.statements if s.startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("SELECT count(budget_item.id)", updates[0])
+
+    def test_cents_summed_exactly(self):
+        self.empty_budget.items = [
+            BudgetItem(name="a", category="savings", total=Decimal("0.10")),
+            BudgetItem(name="b", category="savings", total=Decimal("0.20")),
+        ]
+        db.session.commit()
+
+        self.assertEqual(
+            rebuild_budget_totals(), [self.budget.id, self.empty_budget.id]
+        )
+        self.assertEqual(
+            self.totals_columns(self.empty_budget), (2, 0, 0, Decimal("0.30"))
+        )
+        self.assertEqual(rebuild_budget_totals(fix=False), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -1,26 +1,292 @@
-from budget_app.services.budget.transform import raw_budget_to_budget
+from bisect import bisect_right
+import csv
+from decimal import Decimal
+import io
+
+from sqlalchemy import bindparam, delete, insert, inspect, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+
+from budget_app.services.budget.aggregate import (
+    format_budget_totals_from_columns,
+    total_column_name,
+)
+from budget_app.services.budget.transform import (
+    budget_summary_row_to_summary,
+    raw_budget_to_budget,
+    to_money,
+)
 from budget_app.services.budget.validate_input import (
+    VALID_BUDGET_ITEM_CATEGORY,
+    validate_budget_item,
+    validate_budget_item_attribute,
     validate_month_duration,
     validate_positive_float,
 )
 from ...models import Budget, BudgetItem
-from ...extensions import db
+from ...extensions import budget_cache, db
+from ...utils import is_unique_violation
+
+MAX_BULK_BUDGET_ITEMS = 1000
+# larger budgets are never cached whole: every page is read from the database
+MAX_CACHED_BUDGET_ITEMS = 1000
+IMPORT_CHUNK_SIZE = 5000
+MAX_IMPORT_BUDGET_ITEMS = 200_000
+MAX_IMPORT_ERRORS = 100
+IMPORT_CSV_COLUMNS = ["name", "category", "total"]
+EDITABLE_BUDGET_ITEM_ATTRIBUTES = ["name", "category", "total"]
+
+
+class BudgetItemsValidationError(ValueError):
+    """
+    Raised when one or more rows of a bulk request are invalid.
+    errors: list of {"index": <row index>, "message": <error message>}
+    """
+
+    def __init__(self, errors):
+        super().__init__("Invalid budget item(s), no items were saved.")
+        self.errors = errors
+
+
+class BudgetVersionConflictError(ValueError):
+    """
+    Raised when a write is based on an outdated version of the budget or of
+    one of its items (someone else changed it since it was loaded).
+    budget: the current formatted budget, None if it no longer exists
+    """
+
+    def __init__(self, budget):
+        super().__init__(
+            "Budget has been changed since it was loaded, reload it and try again."
+        )
+        self.budget = budget
+
+
+def _version_conflict(budget_id, user_id):
+    """
+    roll back the failed write and return the BudgetVersionConflictError
+    (with the budget as it is now) to raise
+    """
+    db.session.rollback()
+    budget_cache.invalidate(user_id, budget_id)
+    print(f"Version conflict on budget_id: {budget_id}, user_id: {user_id}")
+    return BudgetVersionConflictError(
+        get_budget_by_budget_and_user_id(budget_id, user_id)
+    )
+
+
+def _parse_expected_version(version_raw):
+    """
+    return the version a write expects as int, None when no version was
+    given (no check) OR raise ValueError
+    """
+    if version_raw is None:
+        return None
+    version = _parse_item_id(version_raw)
+    if version is None:
+        raise ValueError("Version must be a positive whole number.")
+    return version
+
+
+def _validate_bulk_request(rows, budget_id, user_id, with_items=False):
+    """
+    raise ValueError unless rows is a non empty list of at most
+    MAX_BULK_BUDGET_ITEMS rows and budget_id belongs to user_id
+    return the budget (with its items loaded when with_items)
+    """
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("Budget items must be a non empty list.")
+
+    if len(rows) > MAX_BULK_BUDGET_ITEMS:
+        raise ValueError(
+            f"Can't change more than {MAX_BULK_BUDGET_ITEMS} budget items at once."
+        )
+
+    if with_items:
+        return _get_budget_with_items(budget_id, user_id)
+
+    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+    if not budget:
+        print(f"Budget_id: {budget_id}, doesn't belong to user with user_id {user_id}")
+        raise ValueError("Invalid budget.")
+    return budget
+
+
+def _parse_item_id(item_id_raw):
+    """return item id as int OR None when it isn't a valid id"""
+    if isinstance(item_id_raw, bool):
+        return None
+    try:
+        item_id = int(item_id_raw)
+    except (TypeError, ValueError):
+        return None
+    return item_id if item_id > 0 else None
+
+
+def _keyset_page(query, id_column, limit=None, cursor=None):
+    """
+    Order query by id_column and, when paginating, keep only the rows after
+    cursor (the last id of the previous page), up to limit rows.
+    Seeking on an indexed id makes every page cost the same as the first one.
+    """
+    if cursor is not None:
+        query = query.filter(id_column > cursor)
+    query = query.order_by(id_column)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _get_cached_budget_entry(budget_id, user_id):
+    """
+    return {"budget": <formatted budget with all its items>, "totals": <totals>}
+    for the user's budget from the budget cache, loading it and caching it on
+    a miss, OR None when there's no such budget or it has more than
+    MAX_CACHED_BUDGET_ITEMS items
+    """
+    entry = budget_cache.get(user_id, budget_id)
+    if entry is not None:
+        return entry
+
+    # taken before the query: a write committed (and invalidated) while it
+    # runs keeps the budget read here out of the cache
+    generation = budget_cache.generation()
+    # the materialized item_count filters out large budgets before any of
+    # their items is loaded
+    raw_budget = (
+        Budget.query.options(joinedload(Budget.items))
+        .filter_by(id=budget_id, user_id=user_id)
+        .filter(Budget.item_count <= MAX_CACHED_BUDGET_ITEMS)
+        .first()
+    )
+    if raw_budget is None:
+        return None
+
+    entry = {
+        "budget": raw_budget_to_budget(raw_budget),
+        "totals": format_budget_totals_from_columns(raw_budget),
+    }
+    budget_cache.set(user_id, budget_id, entry, generation)
+    return entry
 
-VALID_BUDGET_ITEM_CATEGORY = ["deductions", "bills", "savings"]
 
+def _items_page(items, limit=None, cursor=None):
+    """keyset page (see _keyset_page) of formatted items, already ordered by id"""
+    start = 0 if cursor is None else bisect_right(items, cursor, key=lambda i: i["id"])
+    return items[start:] if limit is None else items[start : start + limit]
 
-def get_budget_by_budget_and_user_id(budget_id, user_id):
-    raw_budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+
+def get_budget_by_budget_and_user_id(
+    budget_id, user_id, item_limit=None, item_cursor=None
+):
+    """
+    return formatted budget with its items, or a page of its items
+    (ordered by id) when item_limit / item_cursor are given, OR None
+
+    Served from the budget cache when it's enabled (and the budget has at
+    most MAX_CACHED_BUDGET_ITEMS items): repeat views (and every page of the
+    items) don't query the database.
+    """
+    entry = (
+        _get_cached_budget_entry(budget_id, user_id) if budget_cache.enabled else None
+    )
+    if entry is not None:
+        # copies: callers must not be able to change the cached budget
+        budget = entry["budget"]
+        return {
+            **budget,
+            "items": [
+                dict(item)
+                for item in _items_page(budget["items"], item_limit, item_cursor)
+            ],
+        }
+
+    if item_limit is None and item_cursor is None:
+        # single budget: JOIN the items in so the view costs one round trip
+        raw_budget = (
+            Budget.query.options(joinedload(Budget.items))
+            .filter_by(id=budget_id, user_id=user_id)
+            .first()
+        )
+        items = None
+    else:
+        raw_budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+        items = (
+            _keyset_page(
+                BudgetItem.query.filter_by(budget_id=budget_id),
+                BudgetItem.id,
+                item_limit,
+                item_cursor,
+            ).all()
+            if raw_budget
+            else None
+        )
 
     if raw_budget is None:
         print(f"Could not find budget with id: {budget_id} and user_id: {user_id}")
         return None
 
-    return raw_budget_to_budget(raw_budget)
+    return raw_budget_to_budget(raw_budget, items)
+
+
+def get_budget_version_by_budget_and_user_id(budget_id, user_id):
+    """
+    return the version of the user's budget OR None, from the budget cache
+    when it's cached: validates a conditional GET without formatting the
+    budget (a miss reads the version only, nothing is cached)
+    """
+    entry = budget_cache.get(user_id, budget_id) if budget_cache.enabled else None
+    if entry is not None:
+        return entry["budget"]["version"]
+
+    return (
+        db.session.query(Budget.version)
+        .filter_by(id=budget_id, user_id=user_id)
+        .scalar()
+    )
+
+
+def get_budget_versions_by_user_id(user_id, limit=None, cursor=None):
+    """
+    return [(budget id, version)] for the user's budgets (all of them, or one
+    keyset page): validates a conditional GET of the budgets list with one
+    index only query, nothing else is loaded
+    """
+    rows = _keyset_page(
+        db.session.query(Budget.id, Budget.version).filter(Budget.user_id == user_id),
+        Budget.id,
+        limit,
+        cursor,
+    ).all()
+    return [(row.id, row.version) for row in rows]
+
+
+def get_budget_totals_by_budget_and_user_id(budget_id, user_id):
+    """
+    return the totals (see aggregate.format_budget_totals) of the user's budget
+    OR None, from the budget cache when it's cached, else from the budget's
+    materialized totals columns (no items loaded, nothing cached)
+    """
+    entry = budget_cache.get(user_id, budget_id) if budget_cache.enabled else None
+    if entry is not None:
+        return entry["totals"]
+
+    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+    return format_budget_totals_from_columns(budget) if budget else None
 
 
-def get_budgets_by_user_id(user_id):
-    raw_budgets = Budget.query.filter_by(user_id=user_id).all()
+def get_budgets_by_user_id(user_id, limit=None, cursor=None):
+    # many budgets: load every budget's items with one extra "IN" query
+    # instead of one lazy load per budget (N+1), and without the row
+    # duplication a JOIN would cause
+    raw_budgets = _keyset_page(
+        Budget.query.options(selectinload(Budget.items)).filter_by(user_id=user_id),
+        Budget.id,
+        limit,
+        cursor,
+    ).all()
 
     if not raw_budgets:
         print(f"Could not find budgets for user_id: {user_id}")
@@ -29,18 +295,50 @@ def get_budgets_by_user_id(user_id):
     return [raw_budget_to_budget(budget) for budget in raw_budgets]
 
 
+def get_budget_summaries_by_user_id(user_id, limit=None, cursor=None):
+    """
+    return a list of budget summaries (budget columns + item count,
+    per-category totals and net income) for the budgets the user owns
+    (all of them, or one keyset page when limit / cursor are given).
+
+    Totals are read from the budgets' materialized totals columns with one
+    query, BudgetItem rows are never loaded or summed, so the cost is O(1)
+    per budget whatever the number of items.
+    """
+    rows = _keyset_page(
+        db.session.query(
+            Budget.id,
+            Budget.name,
+            Budget.month_duration,
+            Budget.gross_income,
+            Budget.version,
+            Budget.item_count,
+            *(
+                getattr(Budget, total_column_name(category))
+                for category in VALID_BUDGET_ITEM_CATEGORY
+            ),
+        ).filter(Budget.user_id == user_id),
+        Budget.id,
+        limit,
+        cursor,
+    ).all()
+
+    return [
+        budget_summary_row_to_summary(row, format_budget_totals_from_columns(row))
+        for row in rows
+    ]
+
+
 def create_new_budget(user_id, name, month_duration_raw, gross_income):
     """
-    return budget_id if valid input OR raise exceptions
+    return the new formatted budget if valid input OR raise exceptions
     """
 
-    # check name: not empty or unqiue to current user
+    # check name: not empty (unique to current user is enforced by the
+    # unique_budget_name_per_user constraint on write)
     if not name:
         raise ValueError("Budget name must not be empty.")
 
-    if Budget.query.filter_by(user_id=user_id, name=name).first():
-        raise ValueError("You already have a budget with that name.")
-
     # check month duration is either 1 or 12
     invalid_month_duration_message = validate_month_duration(month_duration_raw)
     if invalid_month_duration_message:
@@ -53,52 +351,274 @@ def create_new_budget(user_id, name, month_duration_raw, gross_income):
 
     # if no errors, safely convert for DB
     month_duration = int(month_duration_raw)
-    gross_income = float(gross_income)
+    gross_income = to_money(gross_income)
 
     new_budget = Budget(
         name=name,
         month_duration=month_duration,
         gross_income=gross_income,
         user_id=user_id,
+        items=[],  # known empty, serializing it won't lazy load
     )
     db.session.add(new_budget)
-    db.session.commit()
-    return new_budget.id  # used to display correct budget view
+    return _commit_budget_and_format(new_budget)
 
 
 def get_budget_item_category_list():
     return VALID_BUDGET_ITEM_CATEGORY
 
 
-def create_new_budget_item(name, category, total, budget_id, user_id):
-    """
-    Validate user inputs: name and cost, raise error if invalid
-    else insert items into budget_item and return new budget item id
-    """
-    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+def _get_budget_with_items(budget_id, user_id):
+    """return the user's Budget with its items loaded (one query) OR raise ValueError"""
+    budget = (
+        Budget.query.options(joinedload(Budget.items))
+        .filter_by(id=budget_id, user_id=user_id)
+        .first()
+    )
     if not budget:
         print(f"Budget_id: {budget_id}, doesn't belong to user with user_id {user_id}")
         raise ValueError("Invalid budget.")
-    if not name:
-        raise ValueError("Budget item name must not be empty.")
+    return budget
 
-    if category not in VALID_BUDGET_ITEM_CATEGORY:
-        raise ValueError(f"Category: '{category}' is not valid")
 
-    invalid_total_message = validate_positive_float(total)
-    if invalid_total_message:
-        raise ValueError(f"Total {invalid_total_message}")
+def _add_to_budget_totals(budget, category, total, sign=1):
+    """
+    Delta update of the loaded budget's materialized totals for one item
+    added (sign=1) or removed (sign=-1). Saved by the budget's version UPDATE,
+    in the same transaction as the item write.
+    """
+    column_name = total_column_name(category)
+    setattr(budget, column_name, getattr(budget, column_name) + sign * total)
+    budget.item_count += sign
+
+
+def _commit_and_format(budget, items=None):
+    """
+    Format budget from the objects already in the session (flushing first so
+    new rows have their ids), then commit.
+    Formatting before the commit avoids the commit expiring every loaded
+    attribute, which would make the response cost a re-read of the budget.
+    The version of an existing budget is bumped (a write to the budget or
+    its items), its cache entry is invalidated once committed.
+
+    The UPDATE only matches the budget at the version it was loaded at: when
+    another request wrote to the budget (or its items) in between, nothing is
+    saved and BudgetVersionConflictError is raised.
+    """
+    if inspect(budget).persistent:
+        budget.version += 1
+    budget_id, user_id = budget.id, budget.user_id
+    try:
+        db.session.flush()
+    except StaleDataError:
+        raise _version_conflict(budget_id, user_id)
+    formatted_budget = raw_budget_to_budget(budget, items)
+    db.session.commit()
+
+    budget_cache.invalidate(user_id, formatted_budget["id"])
+    return formatted_budget
+
+
+def _commit_budget_and_format(budget):
+    """
+    _commit_and_format for a written Budget row: a duplicate name violates
+    unique_budget_name_per_user, which is reported as a ValueError.
+    Relying on the constraint saves a lookup query and can't race with a
+    concurrent request creating the same name.
+    """
+    try:
+        return _commit_and_format(budget)
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_unique_violation(e):
+            raise ValueError("You already have a budget with that name.") from e
+        raise
+
+
+def create_new_budget_item(name, category, total, budget_id, user_id):
+    """
+    Validate user inputs: name and cost, raise error if invalid
+    else insert items into budget_item and
+    return (new budget item id, formatted budget with the new item)
+    """
+    budget = _get_budget_with_items(budget_id, user_id)
+
+    invalid_item_message = validate_budget_item(name, category, total)
+    if invalid_item_message:
+        raise ValueError(invalid_item_message)
 
     new_budget_item = BudgetItem(
         name=name,
         category=category,
-        total=total,
-        budget_id=budget_id,
+        total=to_money(total),
     )
-    db.session.add(new_budget_item)
-    db.session.commit()
+    budget.items.append(new_budget_item)
+    _add_to_budget_totals(budget, new_budget_item.category, new_budget_item.total)
+    formatted_budget = _commit_and_format(budget)
+
+    # appended last: the new item is the last one formatted
+    return formatted_budget["items"][-1]["id"], formatted_budget
+
+
+def create_new_budget_items(items, budget_id, user_id):
+    """
+    Validate every item (dict with name, category, total) in one pass and
+    insert them all with a single multi-row INSERT and one commit.
+
+    return (list of the new budget item ids (ascending), formatted budget)
+    OR raise ValueError for an invalid budget / request, or
+    BudgetItemsValidationError listing every invalid row (nothing is inserted)
+    """
+    budget = _validate_bulk_request(items, budget_id, user_id, with_items=True)
+
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"index": index, "message": "Budget item must be an object."})
+            continue
+
+        name = item.get("name")
+        category = item.get("category")
+        total = item.get("total")
+        invalid_item_message = validate_budget_item(name, category, total)
+        if invalid_item_message:
+            errors.append({"index": index, "message": invalid_item_message})
+            continue
+
+        rows.append(
+            {
+                "budget_id": budget_id,
+                "name": name,
+                "category": category,
+                "total": to_money(total),
+            }
+        )
 
-    return new_budget_item.id
+    if errors:
+        raise BudgetItemsValidationError(errors)
+
+    # executemany of one INSERT is sent as multi-row
+    # "INSERT ... VALUES (...), (...) RETURNING ..." batches, RETURNING the
+    # whole rows gives back BudgetItem objects to format without a re-read
+    new_items = db.session.scalars(insert(BudgetItem).returning(BudgetItem), rows).all()
+    new_item_ids = sorted(item.id for item in new_items)
+    for item in new_items:
+        _add_to_budget_totals(budget, item.category, item.total)
+    all_items = sorted(budget.items + new_items, key=lambda item: item.id)
+    formatted_budget = _commit_and_format(budget, all_items)
+
+    return new_item_ids, formatted_budget
+
+
+def _insert_budget_item_rows(rows):
+    """
+    insert a chunk of budget_item rows (dicts of budget_id, name, category,
+    total) with one COPY on psycopg2, else one executemany INSERT
+    """
+    connection = db.session.connection()
+    if connection.dialect.driver != "psycopg2":
+        db.session.execute(insert(BudgetItem), rows)
+        return
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (row["budget_id"], row["name"], row["category"], row["total"]) for row in rows
+    )
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            "COPY budget_item (budget_id, name, category, total) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+def import_budget_items_from_csv(csv_lines, budget_id, user_id):
+    """
+    Load budget items from CSV text (an iterable of lines, e.g. a text stream,
+    with a name,category,total header) into the budget. Rows are parsed one
+    at a time and inserted IMPORT_CHUNK_SIZE at a time (see
+    _insert_budget_item_rows), so memory is bounded by the chunk size
+    whatever the file size. All rows are imported in one transaction.
+
+    return number of budget items imported
+    OR raise ValueError for an invalid budget / file, or
+    BudgetItemsValidationError listing the invalid rows (the first
+    MAX_IMPORT_ERRORS, "index" being the row's line number): nothing is imported
+    """
+    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+    if not budget:
+        print(f"Budget_id: {budget_id}, doesn't belong to user with user_id {user_id}")
+        raise ValueError("Invalid budget.")
+
+    reader = csv.DictReader(csv_lines)
+    header = [column.strip().lower() for column in reader.fieldnames or []]
+    if not set(IMPORT_CSV_COLUMNS).issubset(header):
+        raise ValueError(
+            f"CSV header must have the columns: {', '.join(IMPORT_CSV_COLUMNS)}"
+        )
+    reader.fieldnames = header
+
+    imported = 0
+    total_deltas = {}
+    chunk = []
+    errors = []
+    error_count = 0
+    try:
+        for row in reader:
+            if imported + error_count >= MAX_IMPORT_BUDGET_ITEMS:
+                raise ValueError(
+                    f"Can't import more than {MAX_IMPORT_BUDGET_ITEMS} budget items at once."
+                )
+
+            name = (row.get("name") or "").strip()
+            category = (row.get("category") or "").strip()
+            total = (row.get("total") or "").strip()
+            message = validate_budget_item(name, category, total)
+            if message:
+                error_count += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({"index": reader.line_num, "message": message})
+                continue
+
+            if error_count:
+                # the import will be rejected: only keep validating
+                continue
+
+            total = to_money(total)
+            chunk.append(
+                {
+                    "budget_id": budget_id,
+                    "name": name,
+                    "category": category,
+                    "total": total,
+                }
+            )
+            total_deltas[category] = total_deltas.get(category, Decimal(0)) + total
+            imported += 1
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                _insert_budget_item_rows(chunk)
+                chunk = []
+    except csv.Error as e:
+        db.session.rollback()
+        raise ValueError(f"Invalid CSV on line {reader.line_num}: {e}") from e
+    except ValueError:
+        db.session.rollback()
+        raise
+
+    if error_count:
+        db.session.rollback()
+        raise BudgetItemsValidationError(errors)
+
+    if not imported:
+        raise ValueError("CSV file has no budget items.")
+
+    if chunk:
+        _insert_budget_item_rows(chunk)
+    _update_budget_totals(budget_id, imported, total_deltas)
+    db.session.commit()
+    budget_cache.invalidate(user_id, budget_id)
+    return imported
 
 
 def attributes_to_update_dict(body, list_of_attributes):
@@ -111,92 +631,275 @@ def attributes_to_update_dict(body, list_of_attributes):
     return attributes_to_update
 
 
-def edit_budget_attributes(budget_id, user_id, attributes_to_edit):
-    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
-    if not budget:
-        print(f"Budget_id: {budget_id}, doesn't belong to user with user_id {user_id}")
-        raise ValueError("Invalid budget.")
+def edit_budget_attributes(
+    budget_id, user_id, attributes_to_edit, expected_version=None
+):
+    """
+    return the edited formatted budget OR raise ValueError
+    (BudgetVersionConflictError when expected_version, the version the edit
+    was made from, isn't the budget's current version)
+    """
+    expected_version = _parse_expected_version(expected_version)
+    budget = _get_budget_with_items(budget_id, user_id)
+    if expected_version is not None and expected_version != budget.version:
+        raise _version_conflict(budget_id, user_id)
 
     for attribute, new_value in attributes_to_edit.items():
         # Validate new_value
         if attribute == "name":
             if not new_value:
                 raise ValueError("New name must not be empty.")
-            if (
-                Budget.query.filter_by(user_id=user_id, name=new_value).first()
-                and budget.name != new_value
-            ):  # error if name different than current budget.name value and
-                # exists in users other budgets
-                raise ValueError("You already have a budget with that name.")
 
         if attribute == "gross_income":
             error_message = validate_positive_float(new_value)
             if error_message:
                 raise ValueError(f"Gross income {error_message}")
+            new_value = to_money(new_value)
 
         if attribute == "month_duration":
             error_message = validate_month_duration(new_value)
             if error_message:
                 raise ValueError(error_message)
+            new_value = int(new_value)
 
         # Update new_value
         setattr(budget, attribute, new_value)
 
-    db.session.commit()
-
-    return budget.id
+    return _commit_budget_and_format(budget)
 
 
-def edit_budget_item_attributes(item_id, budget_id, attributes_to_edit):
-    budget_item = BudgetItem.query.filter_by(id=item_id, budget_id=budget_id).first()
+def edit_budget_item_attributes(
+    item_id, budget_id, user_id, attributes_to_edit, expected_version=None
+):
+    """
+    return (budget item id, formatted budget with the edited item)
+    OR raise ValueError (BudgetVersionConflictError when expected_version,
+    the version of the item the edit was made from, isn't its current version)
+    """
+    expected_version = _parse_expected_version(expected_version)
+    item_id = _parse_item_id(item_id)
+    budget = (
+        Budget.query.options(joinedload(Budget.items))
+        .filter_by(id=budget_id, user_id=user_id)
+        .first()
+    )
+    budget_item = next(
+        (item for item in (budget.items if budget else []) if item.id == item_id),
+        None,
+    )
     if not budget_item:
         print(
             f"Budget item_id: {item_id}, doesn't belong to user with budget_id {budget_id}"
         )
         raise ValueError("Invalid budget item.")
 
-    # Validate new_value
+    if expected_version is not None and expected_version != budget_item.version:
+        raise _version_conflict(budget_id, user_id)
+
     for attribute, new_value in attributes_to_edit.items():
         # Validate new_value
-        if attribute == "name":
-            if not new_value:
-                raise ValueError("New name must not be empty.")
-
-        if attribute == "category":
-            if new_value not in VALID_BUDGET_ITEM_CATEGORY:
-                raise ValueError(f"Category: '{new_value}' is not valid")
+        invalid_attribute_message = validate_budget_item_attribute(attribute, new_value)
+        if invalid_attribute_message:
+            raise ValueError(invalid_attribute_message)
 
+    # move the item's total out of the budget's totals, and back in once edited
+    _add_to_budget_totals(budget, budget_item.category, budget_item.total, sign=-1)
+    for attribute, new_value in attributes_to_edit.items():
         if attribute == "total":
-            invalid_total_message = validate_positive_float(new_value)
-            if invalid_total_message:
-                raise ValueError(f"Total {invalid_total_message}")
-
-        # Update new_value
+            new_value = to_money(new_value)
         setattr(budget_item, attribute, new_value)
+    _add_to_budget_totals(budget, budget_item.category, budget_item.total)
 
-    db.session.commit()
+    return item_id, _commit_and_format(budget)
+
+
+def edit_budget_items_attributes(edits, budget_id, user_id):
+    """
+    Validate every edit ({"item_id": <id>, "changes": {<attribute>: <value>}},
+    optionally "version": the version of the item the edit was made from)
+    of the budget's items in one pass, then apply them all with set based
+    UPDATE ... WHERE id = ? AND budget_id = ? statements and one commit.
+
+    return (list of the edited budget item ids (ascending), formatted budget)
+    OR raise ValueError for an invalid budget / request,
+    BudgetItemsValidationError listing every invalid row, or
+    BudgetVersionConflictError when an item's version isn't the expected one
+    (nothing is updated)
+    """
+    budget = _validate_bulk_request(edits, budget_id, user_id, with_items=True)
+    budget_items_by_id = {item.id: item for item in budget.items}
+
+    conflict = False
+    rows = []
+    edited_item_ids = set()
+    errors = []
+    for index, edit in enumerate(edits):
+        if not isinstance(edit, dict) or not isinstance(edit.get("changes"), dict):
+            errors.append(
+                {
+                    "index": index,
+                    "message": "Budget item edit must be an object with item_id and changes.",
+                }
+            )
+            continue
+
+        # every item must belong to the budget (and be edited only once)
+        item_id = _parse_item_id(edit.get("item_id"))
+        if item_id not in budget_items_by_id:
+            errors.append({"index": index, "message": "Invalid budget item."})
+            continue
+
+        if item_id in edited_item_ids:
+            errors.append(
+                {"index": index, "message": "Budget item can only be edited once."}
+            )
+            continue
+
+        try:
+            expected_version = _parse_expected_version(edit.get("version"))
+        except ValueError as e:
+            errors.append({"index": index, "message": str(e)})
+            continue
+        if expected_version not in (None, budget_items_by_id[item_id].version):
+            conflict = True
+
+        changes = attributes_to_update_dict(
+            edit["changes"], EDITABLE_BUDGET_ITEM_ATTRIBUTES
+        )
+        if not changes:
+            errors.append(
+                {
+                    "index": index,
+                    "message": f"Missing attribute(s) to update. Valid attributes are: {', '.join(EDITABLE_BUDGET_ITEM_ATTRIBUTES)}",
+                }
+            )
+            continue
+
+        invalid_attribute_messages = [
+            validate_budget_item_attribute(attribute, new_value)
+            for attribute, new_value in changes.items()
+        ]
+        invalid_attribute_messages = [m for m in invalid_attribute_messages if m]
+        if invalid_attribute_messages:
+            errors.append({"index": index, "message": invalid_attribute_messages[0]})
+            continue
+
+        if "total" in changes:
+            changes["total"] = to_money(changes["total"])
+        rows.append({"id": item_id, **changes})
+        edited_item_ids.add(item_id)
+
+    if errors:
+        raise BudgetItemsValidationError(errors)
+
+    if conflict:
+        raise _version_conflict(budget_id, user_id)
+
+    # rows changing the same attributes are sent together as one executemany
+    # of UPDATE ... SET version = version + 1 WHERE id = ? AND budget_id = ?
+    # (Core, the ORM's version check would send one UPDATE per row). Matched
+    # rows can't be counted per item in an executemany: a concurrent write is
+    # caught by the budget's version instead, every item write bumps it
+    budget_item_table = BudgetItem.__table__
+    rows_by_attributes = {}
+    for row in rows:
+        attributes = tuple(sorted(attribute for attribute in row if attribute != "id"))
+        rows_by_attributes.setdefault(attributes, []).append(row)
+
+    for attributes, attribute_rows in rows_by_attributes.items():
+        db.session.execute(
+            update(budget_item_table)
+            .where(
+                budget_item_table.c.id == bindparam("item_id"),
+                budget_item_table.c.budget_id == budget_id,
+            )
+            .values(
+                version=budget_item_table.c.version + 1,
+                **{
+                    attribute: bindparam(f"new_{attribute}") for attribute in attributes
+                },
+            ),
+            [
+                {
+                    "item_id": row["id"],
+                    **{f"new_{attribute}": row[attribute] for attribute in attributes},
+                }
+                for row in attribute_rows
+            ],
+        )
 
-    return item_id
+    # mirror the UPDATE on the loaded items (without marking them dirty),
+    # moving each item's old total out of the budget's totals and the new one in
+    for row in rows:
+        item = budget_items_by_id[row["id"]]
+        _add_to_budget_totals(budget, item.category, item.total, sign=-1)
+        for attribute, new_value in row.items():
+            set_committed_value(item, attribute, new_value)
+        set_committed_value(item, "version", item.version + 1)
+        _add_to_budget_totals(budget, item.category, item.total)
+
+    return sorted(row["id"] for row in rows), _commit_and_format(budget)
+
+
+def _update_budget_totals(budget_id, item_count_delta, total_deltas):
+    """
+    New version for a budget whose items were written without loading it,
+    its materialized totals are moved in SQL by item_count_delta and
+    total_deltas (dict of category -> amount) in the same UPDATE
+    """
+    values = {
+        "version": Budget.version + 1,
+        "item_count": Budget.item_count + item_count_delta,
+    }
+    for category, total_delta in total_deltas.items():
+        if total_delta:
+            column_name = total_column_name(category)
+            values[column_name] = getattr(Budget, column_name) + total_delta
+
+    db.session.execute(
+        update(Budget)
+        .where(Budget.id == budget_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _remove_from_budget_totals(budget_id, removed_items):
+    """_update_budget_totals for deleted items (list of (category, total))"""
+    total_deltas = {}
+    for category, total in removed_items:
+        total_deltas[category] = total_deltas.get(category, Decimal(0)) - total
+    _update_budget_totals(budget_id, -len(removed_items), total_deltas)
 
 
 def delete_budget_by_budget_and_user_ids(budget_id, user_id):
-    # Retrieve the budget to delete
-    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
-    if not budget:
+    # Delete the budget in one statement, its items are removed by the
+    # budget_item.budget_id ON DELETE CASCADE, so none of them are loaded
+    budget_name = db.session.execute(
+        delete(Budget)
+        .where(Budget.id == budget_id, Budget.user_id == user_id)
+        .returning(Budget.name)
+    ).scalar_one_or_none()
+    if budget_name is None:
         print(f"Budget_id: {budget_id}, doesn't belong to user with user_id {user_id}")
         raise ValueError("Invalid budget.")
 
-    budget_name = budget.name
-
-    # Delete the object
-    db.session.delete(budget)
     db.session.commit()
+    budget_cache.invalidate(user_id, budget_id)
     return budget_name
 
 
-def delete_budget_item_by_item_and_budget_ids(item_id, budget_id):
-    # Retrieve the budget to delete
-    budget_item = BudgetItem.query.filter_by(id=item_id, budget_id=budget_id).first()
+def delete_budget_item_by_item_and_budget_ids(item_id, budget_id, user_id):
+    # Retrieve the budget item to delete (from one of the user's budgets)
+    budget_item = (
+        BudgetItem.query.join(Budget)
+        .filter(
+            BudgetItem.id == item_id,
+            BudgetItem.budget_id == budget_id,
+            Budget.user_id == user_id,
+        )
+        .first()
+    )
     if not budget_item:
         print(
             f"Budget item_id: {item_id}, doesn't belong to user with budget_id {budget_id}"
@@ -207,7 +910,55 @@ def delete_budget_item_by_item_and_budget_ids(item_id, budget_id):
         f"Category: '{budget_item.category}' and with Name: '{budget_item.name}'"
     )
 
-    # Delete the object
+    # Delete the object (only if it's still at the version loaded)
     db.session.delete(budget_item)
+    try:
+        db.session.flush()
+    except StaleDataError:
+        raise _version_conflict(budget_id, user_id)
+    _remove_from_budget_totals(budget_id, [(budget_item.category, budget_item.total)])
     db.session.commit()
+    budget_cache.invalidate(user_id, budget_id)
     return item_description
+
+
+def delete_budget_items_by_item_and_budget_ids(item_ids, budget_id, user_id):
+    """
+    Delete every item in item_ids from the budget with a single
+    DELETE ... WHERE budget_id = ? AND id IN (...) and one commit.
+
+    return number of budget items deleted
+    OR raise ValueError for an invalid budget / request, or
+    BudgetItemsValidationError when an id doesn't belong to the budget
+    (nothing is deleted)
+    """
+    _validate_bulk_request(item_ids, budget_id, user_id)
+
+    errors = [
+        {"index": index, "message": "Invalid budget item."}
+        for index, item_id in enumerate(item_ids)
+        if _parse_item_id(item_id) is None
+    ]
+    if errors:
+        raise BudgetItemsValidationError(errors)
+
+    unique_item_ids = {_parse_item_id(item_id) for item_id in item_ids}
+    removed_items = db.session.execute(
+        delete(BudgetItem)
+        .where(BudgetItem.budget_id == budget_id, BudgetItem.id.in_(unique_item_ids))
+        .returning(BudgetItem.category, BudgetItem.total)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if len(removed_items) != len(unique_item_ids):
+        # some ids aren't in the budget: undo the whole batch
+        db.session.rollback()
+        print(
+            f"Budget item_ids: {sorted(unique_item_ids)}, don't all belong to budget_id {budget_id}"
+        )
+        raise ValueError("Invalid budget item(s), no items were deleted.")
+
+    _remove_from_budget_totals(budget_id, [tuple(row) for row in removed_items])
+    db.session.commit()
+    budget_cache.invalidate(user_id, budget_id)
+    return len(removed_items)
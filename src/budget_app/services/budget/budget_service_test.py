@@ -1,22 +1,61 @@
 from decimal import Decimal
+import io
+import os
 import unittest
+from unittest.mock import patch
+import uuid
+
+from sqlalchemy import create_engine, text, update
 
 from budget_app import create_app
-from budget_app.models import Budget, BudgetItem
+from budget_app.models import Budget, BudgetItem, User
 from budget_app.services.budget.budget_service import (
+    BudgetItemsValidationError,
+    BudgetVersionConflictError,
+    _get_budget_with_items,
+    _insert_budget_item_rows,
     attributes_to_update_dict,
     create_new_budget,
     create_new_budget_item,
+    create_new_budget_items,
     delete_budget_by_budget_and_user_ids,
     delete_budget_item_by_item_and_budget_ids,
+    delete_budget_items_by_item_and_budget_ids,
     edit_budget_attributes,
     edit_budget_item_attributes,
+    edit_budget_items_attributes,
     get_budget_by_budget_and_user_id,
+    get_budget_summaries_by_user_id,
+    get_budget_totals_by_budget_and_user_id,
+    get_budget_version_by_budget_and_user_id,
     get_budgets_by_user_id,
+    import_budget_items_from_csv,
+)
+from budget_app.services.budget.aggregate import (
+    format_budget_totals,
+    format_budget_totals_from_columns,
+    rebuild_budget_totals,
+    total_column_name,
 )
-from ...extensions import db
+from budget_app.services.budget.transform import raw_budget_to_budget, to_money
+from ...extensions import budget_cache, db
+from ...testing import QueryCounter, assert_max_queries
 import re
 
+# the COPY import path needs PostgreSQL (psycopg2): tested on DATABASE_URL
+POSTGRES_URL = os.getenv("DATABASE_URL") or ""
+
+
+def totals_summed_from_items(budget_id):
+    """the budget's totals summed in Python from its items (loads them all)"""
+    budget = db.session.get(Budget, budget_id)
+    category_totals = {}
+    for item in budget.items:
+        category_totals[item.category] = (
+            category_totals.get(item.category, 0) + item.total
+        )
+    return format_budget_totals(budget.gross_income, len(budget.items), category_totals)
+
 
 class BaseTestCase(unittest.TestCase):
     """
@@ -28,6 +67,8 @@ class BaseTestCase(unittest.TestCase):
     with things like the database or configuration
     """
 
+    USER_IDS = [2, 3, 10]
+
     def setUp(self):
         self.app = create_app(
             {
@@ -42,6 +83,13 @@ class BaseTestCase(unittest.TestCase):
         self.context.push()  # activates that context
         db.create_all()
 
+        # budgets reference an existing user (the foreign key is enforced)
+        db.session.add_all(
+            User(id=user_id, username=f"user_{user_id}", password_hash="not-a-hash")
+            for user_id in BaseTestCase.USER_IDS
+        )
+        db.session.commit()
+
     def tearDown(self):
         """
         Clear the current database session,
@@ -73,6 +121,20 @@ class BaseTestCase(unittest.TestCase):
         )
         db.session.add(item)
         db.session.flush()
+        # keep the budget's materialized totals in line, like the service's
+        # item writes do (Core UPDATE: the budget's version is left as is)
+        total_column = getattr(Budget, total_column_name(category))
+        db.session.execute(
+            update(Budget)
+            .where(Budget.id == budget.id)
+            .values(
+                {
+                    Budget.item_count: Budget.item_count + 1,
+                    total_column: total_column + to_money(total),
+                }
+            )
+            .execution_options(synchronize_session=False)
+        )
         return item
 
 
@@ -113,18 +175,21 @@ class GetBudgetByBudgetAndUserId(BudgetDataFixture):
             "name": "mock_name",
             "month_duration": 1,
             "gross_income": 3500.0,
+            "version": 1,
             "items": [
                 {
                     "id": self.item1.id,
                     "name": "Rent",
                     "category": "bills",
                     "total": 1200.0,
+                    "version": 1,
                 },
                 {
                     "id": self.item2.id,
                     "name": "Groceries",
                     "category": "bills",
                     "total": 400.0,
+                    "version": 1,
                 },
             ],
         }
@@ -182,18 +247,21 @@ class GetBudgetsByUserId(BudgetDataFixture):
                 "name": "mock_name",
                 "month_duration": 1,
                 "gross_income": 3500.0,
+                "version": 1,
                 "items": [
                     {
                         "id": self.item1.id,
                         "name": "Rent",
                         "category": "bills",
                         "total": 1200.0,
+                        "version": 1,
                     },
                     {
                         "id": self.item2.id,
                         "name": "Groceries",
                         "category": "bills",
                         "total": 400.0,
+                        "version": 1,
                     },
                 ],
             },
@@ -202,12 +270,14 @@ class GetBudgetsByUserId(BudgetDataFixture):
                 "name": "mock_name2",
                 "month_duration": 12,
                 "gross_income": 123456.0,
+                "version": 1,
                 "items": [
                     {
                         "id": 3,
                         "name": "401k",
                         "category": "deductions",
                         "total": 250.0,
+                        "version": 1,
                     }
                 ],
             },
@@ -224,6 +294,7 @@ class GetBudgetsByUserId(BudgetDataFixture):
                 "name": "mock_name3",
                 "month_duration": 12,
                 "gross_income": 246810.0,
+                "version": 1,
                 "items": [],
             }
         ]
@@ -235,12 +306,352 @@ class GetBudgetsByUserId(BudgetDataFixture):
         self.assertEqual(response, [])
 
 
+class GetBudgetSummariesByUserId(BudgetDataFixture):
+    """
+    get_budget_summaries_by_user_id takes in a user_id and returns a list of
+    budget summaries (no items) with SQL computed item count, category totals
+    and net income OR an empty list if the user has no budgets
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.raw_budget2 = self.create_budget(
+            user_id=10, name="mock_name2", month_duration="12", gross_income="1000"
+        )
+        self.create_item(
+            self.raw_budget2, name="401k", category="deductions", total="250"
+        )
+        self.create_item(
+            self.raw_budget2, name="HYSA", category="savings", total="100.5"
+        )
+        self.raw_budget3 = self.create_budget(
+            user_id=10, name="empty_budget", month_duration="1", gross_income="50"
+        )
+        db.session.commit()
+
+    def test_success(self):
+        response = get_budget_summaries_by_user_id(10)
+        expected_summaries = [
+            {
+                "id": self.raw_budget.id,
+                "name": "mock_name",
+                "month_duration": 1,
+                "gross_income": 3500.0,
+                "version": 1,
+                "item_count": 2,
+                "category_totals": {
+                    "deductions": 0.0,
+                    "bills": 1600.0,
+                    "savings": 0.0,
+                },
+                "total_expenses": 1600.0,
+                "net_income": 1900.0,
+            },
+            {
+                "id": self.raw_budget2.id,
+                "name": "mock_name2",
+                "month_duration": 12,
+                "gross_income": 1000.0,
+                "version": 1,
+                "item_count": 2,
+                "category_totals": {
+                    "deductions": 250.0,
+                    "bills": 0.0,
+                    "savings": 100.5,
+                },
+                "total_expenses": 350.5,
+                "net_income": 649.5,
+            },
+            {
+                "id": self.raw_budget3.id,
+                "name": "empty_budget",
+                "month_duration": 1,
+                "gross_income": 50.0,
+                "version": 1,
+                "item_count": 0,
+                "category_totals": {
+                    "deductions": 0.0,
+                    "bills": 0.0,
+                    "savings": 0.0,
+                },
+                "total_expenses": 0.0,
+                "net_income": 50.0,
+            },
+        ]
+        self.assertEqual(response, expected_summaries)
+
+    def test_no_budgets(self):
+        response = get_budget_summaries_by_user_id(1)
+        self.assertEqual(response, [])
+
+
+class KeysetPagination(BudgetDataFixture):
+    """
+    get_budgets_by_user_id / get_budget_summaries_by_user_id take limit and
+    cursor (last budget id of the previous page), get_budget_by_budget_and_user_id
+    takes item_limit and item_cursor to page through a budget's items
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        for budget_number in range(2, 6):
+            self.create_budget(
+                user_id=10,
+                name=f"mock_name{budget_number}",
+                month_duration="1",
+                gross_income="100",
+            )
+        self.item3 = self.create_item(
+            self.raw_budget, name="Internet", category="bills", total="60"
+        )
+        db.session.commit()
+
+    def test_budgets_first_page(self):
+        response = get_budgets_by_user_id(10, limit=2)
+        self.assertEqual([1, 2], [budget["id"] for budget in response])
+
+    def test_budgets_next_page(self):
+        response = get_budgets_by_user_id(10, limit=2, cursor=2)
+        self.assertEqual([3, 4], [budget["id"] for budget in response])
+
+        response = get_budget_summaries_by_user_id(10, limit=2, cursor=4)
+        self.assertEqual([5], [budget["id"] for budget in response])
+
+    def test_budgets_past_last_page(self):
+        self.assertEqual(get_budgets_by_user_id(10, limit=2, cursor=5), [])
+        self.assertEqual(get_budget_summaries_by_user_id(10, limit=2, cursor=5), [])
+
+    def test_budget_item_pages(self):
+        response = get_budget_by_budget_and_user_id(1, 10, item_limit=2)
+        self.assertEqual(
+            [self.item1.id, self.item2.id], [item["id"] for item in response["items"]]
+        )
+
+        response = get_budget_by_budget_and_user_id(
+            1, 10, item_limit=2, item_cursor=self.item2.id
+        )
+        self.assertEqual([self.item3.id], [item["id"] for item in response["items"]])
+        self.assertEqual("mock_name", response["name"])
+
+    def test_budget_item_page_invalid_budget(self):
+        response = get_budget_by_budget_and_user_id(1, 2, item_limit=2)
+        self.assertIsNone(response)
+
+
+class BudgetReadQueryCount(BaseTestCase):
+    """
+    budget reads must issue a fixed number of SQL statements no matter how
+    many budgets/items a user has (no lazy load per budget, i.e. N+1)
+    """
+
+    BUDGET_COUNT = 25
+    ITEMS_PER_BUDGET = 4
+
+    def setUp(self):
+        super().setUp()
+
+        for budget_number in range(self.BUDGET_COUNT):
+            budget = self.create_budget(
+                user_id=10,
+                name=f"budget_{budget_number}",
+                month_duration="1",
+                gross_income="1000",
+            )
+            for item_number in range(self.ITEMS_PER_BUDGET):
+                self.create_item(
+                    budget, name=f"item_{item_number}", category="bills", total="10"
+                )
+        db.session.commit()
+        db.session.expunge_all()  # force reads to go to the database
+
+    def test_get_budgets_by_user_id(self):
+        with assert_max_queries(2):
+            response = get_budgets_by_user_id(10)
+
+        self.assertEqual(len(response), self.BUDGET_COUNT)
+        for budget in response:
+            self.assertEqual(len(budget["items"]), self.ITEMS_PER_BUDGET)
+
+    def test_get_budget_summaries_by_user_id(self):
+        with assert_max_queries(1):  # totals are read from the budget columns
+            response = get_budget_summaries_by_user_id(10)
+
+        self.assertEqual(len(response), self.BUDGET_COUNT)
+
+    def test_get_budget_by_budget_and_user_id(self):
+        with assert_max_queries(1):
+            response = get_budget_by_budget_and_user_id(1, 10)
+
+        self.assertEqual(len(response["items"]), self.ITEMS_PER_BUDGET)
+
+    def test_guard_fails_on_extra_queries(self):
+        with self.assertRaisesRegex(AssertionError, "at most 1 SQL statement"):
+            with assert_max_queries(1):
+                for raw_budget in Budget.query.filter_by(user_id=10).all():
+                    raw_budget.items  # lazy load per budget
+
+
+class BudgetCacheReadThrough(BudgetDataFixture):
+    """
+    get_budget_by_budget_and_user_id / get_budget_totals_by_budget_and_user_id
+    read through the budget cache: the first read loads and caches the budget,
+    repeat reads issue no SQL until a write invalidates the entry
+    """
+
+    def setUp(self):
+        super().setUp()
+        db.session.expunge_all()  # force the first read to go to the database
+
+    def test_repeat_read_is_a_cache_hit(self):
+        with assert_max_queries(1):
+            first = get_budget_by_budget_and_user_id(1, 10)
+        with assert_max_queries(0):
+            second = get_budget_by_budget_and_user_id(1, 10)
+            totals = get_budget_totals_by_budget_and_user_id(1, 10)
+
+        self.assertEqual(first, second)
+        self.assertEqual(totals, totals_summed_from_items(1))
+        stats = budget_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    def test_item_pages_served_from_cache(self):
+        get_budget_by_budget_and_user_id(1, 10)
+        with assert_max_queries(0):
+            first_page = get_budget_by_budget_and_user_id(1, 10, item_limit=1)
+            second_page = get_budget_by_budget_and_user_id(
+                1, 10, item_limit=1, item_cursor=first_page["items"][-1]["id"]
+            )
+
+        self.assertEqual([item["name"] for item in first_page["items"]], ["Rent"])
+        self.assertEqual([item["name"] for item in second_page["items"]], ["Groceries"])
+
+    def test_other_user_not_served_from_cache(self):
+        get_budget_by_budget_and_user_id(1, 10)
+        self.assertIsNone(get_budget_by_budget_and_user_id(1, 2))
+        self.assertIsNone(get_budget_totals_by_budget_and_user_id(1, 2))
+
+    def test_returned_budget_is_a_copy(self):
+        budget = get_budget_by_budget_and_user_id(1, 10)
+        budget["items"].clear()
+        budget["name"] = "changed"
+
+        cached = get_budget_by_budget_and_user_id(1, 10)
+        self.assertEqual(cached["name"], "mock_name")
+        self.assertEqual(len(cached["items"]), 2)
+
+        cached["items"][0]["name"] = "changed"
+        self.assertEqual(
+            get_budget_by_budget_and_user_id(1, 10)["items"][0]["name"], "Rent"
+        )
+
+    def test_read_overlapping_a_write_not_cached(self):
+        writes = []
+
+        def read_then_write(raw_budget, items=None):
+            budget = raw_budget_to_budget(raw_budget, items)
+            if not writes:
+                # committed (and invalidated) after the read queried the budget
+                writes.append("renamed")
+                edit_budget_attributes(1, 10, {"name": "renamed"})
+            return budget
+
+        with patch(
+            "budget_app.services.budget.budget_service.raw_budget_to_budget",
+            side_effect=read_then_write,
+        ):
+            self.assertEqual(
+                get_budget_by_budget_and_user_id(1, 10)["name"], "mock_name"
+            )
+
+        self.assertEqual(budget_cache.stats()["size"], 0)
+        budget = get_budget_by_budget_and_user_id(1, 10)
+        self.assertEqual((budget["name"], budget["version"]), ("renamed", 2))
+
+    def test_version_and_totals_misses_not_cached(self):
+        # a version check / totals read doesn't load (nor cache) every item
+        with assert_max_queries(1):
+            self.assertEqual(get_budget_version_by_budget_and_user_id(1, 10), 1)
+        with assert_max_queries(1):
+            totals = get_budget_totals_by_budget_and_user_id(1, 10)
+        self.assertEqual(totals, totals_summed_from_items(1))
+        self.assertEqual(budget_cache.stats()["size"], 0)
+
+    @patch("budget_app.services.budget.budget_service.MAX_CACHED_BUDGET_ITEMS", 1)
+    def test_large_budget_not_cached(self):
+        for _ in range(2):
+            page = get_budget_by_budget_and_user_id(1, 10, item_limit=1)
+            self.assertEqual([item["name"] for item in page["items"]], ["Rent"])
+        self.assertEqual(len(get_budget_by_budget_and_user_id(1, 10)["items"]), 2)
+        self.assertEqual(budget_cache.stats()["size"], 0)
+
+    def test_writes_invalidate(self):
+        writes = [
+            lambda: edit_budget_attributes(1, 10, {"name": "renamed"}),
+            lambda: create_new_budget_item("Gas", "bills", "50", 1, 10),
+            lambda: create_new_budget_items(
+                [{"name": "Bus", "category": "bills", "total": "5"}], 1, 10
+            ),
+            lambda: edit_budget_item_attributes(1, 1, 10, {"total": "1300"}),
+            lambda: edit_budget_items_attributes(
+                [{"item_id": 2, "changes": {"total": "450"}}], 1, 10
+            ),
+            lambda: delete_budget_item_by_item_and_budget_ids(1, 1, 10),
+            lambda: delete_budget_items_by_item_and_budget_ids([2], 1, 10),
+        ]
+        for write in writes:
+            get_budget_by_budget_and_user_id(1, 10)  # cache the budget
+            write()
+            db.session.expunge_all()
+
+            raw_budget = Budget.query.filter_by(id=1).first()
+            cached = get_budget_by_budget_and_user_id(1, 10)
+            self.assertEqual(cached["name"], raw_budget.name)
+            self.assertEqual(
+                [item["id"] for item in cached["items"]],
+                sorted(item.id for item in raw_budget.items),
+            )
+            self.assertEqual(
+                get_budget_totals_by_budget_and_user_id(1, 10),
+                totals_summed_from_items(1),
+            )
+
+    def test_delete_budget_invalidates(self):
+        get_budget_by_budget_and_user_id(1, 10)
+        delete_budget_by_budget_and_user_ids(1, 10)
+        self.assertIsNone(get_budget_by_budget_and_user_id(1, 10))
+
+    def test_null_backend_reads_the_database(self):
+        app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "BUDGET_CACHE_BACKEND": "null",
+            }
+        )
+        with app.app_context():
+            self.assertFalse(budget_cache.enabled)
+            db.create_all()
+            db.session.add(User(id=10, username="user_10", password_hash="x"))
+            self.create_budget(10, "mock_name", 1, "100")
+            db.session.commit()
+
+            for _ in range(2):
+                with assert_max_queries(1) as counter:
+                    get_budget_by_budget_and_user_id(1, 10)
+                self.assertEqual(counter.count, 1)
+
+            self.assertEqual(budget_cache.stats()["hits"], 0)
+            db.session.remove()
+
+
 class CreateNewBudget(BudgetDataFixture):
     """
     create_new_budget takes in: user_id, name, month_duration, gross_income
     (all string types except user_id)
     and creates a new budget with the arg values and returns the
-    budget_id for the newly created budget
+    newly created budget, formatted
     OR if invalid budget attributes are passed in it will raise a
     ValueError with an applicapable error message
     """
@@ -265,6 +676,12 @@ class CreateNewBudget(BudgetDataFixture):
                 gross_income="123",
             )
 
+        # other users can use the same name
+        response = create_new_budget(
+            user_id=2, name="mock_name", month_duration_raw="1", gross_income="123"
+        )
+        self.assertEqual("mock_name", response["name"])
+
     def test_invalid_month_duration(self):
         expected_error_invalid_int = "Month duration must be 1 (month) or 12 (year)."
         # use re.escape because of use of regex reserved chars in message
@@ -315,9 +732,10 @@ class CreateNewBudget(BudgetDataFixture):
             month_duration_raw="1",
             gross_income="1234",
         )
-        self.assertIsInstance(response, int)
-        formatted_budget = get_budget_by_budget_and_user_id(response, 10)
-        self.assertEqual("test_success", formatted_budget.get("name"))
+        self.assertEqual("test_success", response.get("name"))
+        # what the write returned is what a fresh read returns
+        formatted_budget = get_budget_by_budget_and_user_id(response["id"], 10)
+        self.assertEqual(formatted_budget, response)
 
 
 class CreateNewBudgetItem(BudgetDataFixture):
@@ -325,7 +743,7 @@ class CreateNewBudgetItem(BudgetDataFixture):
     create_new_budget_item takes in: name, category, total, budget_id, and user_id
     (all string types except ids)
     and creates a new budget_item for the budget if valid arg values and returns
-    the new budget_item id
+    the new budget_item id and the formatted budget
     OR if invalid arg values it raises ValueError with applicapable error message
     """
 
@@ -378,18 +796,228 @@ class CreateNewBudgetItem(BudgetDataFixture):
             budget_id=1,
             user_id=10,
         )
-        self.assertEqual(response, 3)  # 3rd item added to budget:1, for user:10
-        budget_items = get_budget_by_budget_and_user_id(1, 10).get("items")
+        budget_item_id, budget = response
+        self.assertEqual(budget_item_id, 3)  # 3rd item added to budget:1, for user:10
+        self.assertEqual(budget, get_budget_by_budget_and_user_id(1, 10))
+        budget_items = budget.get("items")
         expected_item = {
             "id": 3,
             "name": "test_success",
             "category": "savings",
             "total": Decimal("1234.00"),
+            "version": 1,
         }
 
         self.assertIn(expected_item, budget_items)
 
 
+class CreateNewBudgetItems(BudgetDataFixture):
+    """
+    create_new_budget_items takes in: items (list of dicts with name, category,
+    total), budget_id and user_id, validates every item and inserts them all at
+    once, returning the new item ids
+    OR raises BudgetItemsValidationError listing every invalid row (nothing saved)
+    OR ValueError for an invalid budget / request
+    """
+
+    VALID_ITEMS = [
+        {"name": "Internet", "category": "bills", "total": "60"},
+        {"name": "401k", "category": "deductions", "total": "250.5"},
+        {"name": "HYSA", "category": "savings", "total": 100},
+    ]
+
+    def test_success(self):
+        response = create_new_budget_items(
+            CreateNewBudgetItems.VALID_ITEMS, budget_id=1, user_id=10
+        )
+        budget_item_ids, budget = response
+        self.assertEqual(budget_item_ids, [3, 4, 5])
+        self.assertEqual(budget, get_budget_by_budget_and_user_id(1, 10))
+
+        budget_items = budget.get("items")
+        self.assertEqual(
+            ["Rent", "Groceries", "Internet", "401k", "HYSA"],
+            [item["name"] for item in budget_items],
+        )
+        self.assertIn(
+            {
+                "id": 4,
+                "name": "401k",
+                "category": "deductions",
+                "total": Decimal("250.50"),
+                "version": 1,
+            },
+            budget_items,
+        )
+
+    def test_single_insert_statement(self):
+        items = [
+            {"name": f"item_{number}", "category": "bills", "total": "1"}
+            for number in range(300)
+        ]
+        # budget with items + INSERT + budget version UPDATE
+        with assert_max_queries(3) as counter:
+            budget_item_ids, budget = create_new_budget_items(
+                items, budget_id=1, user_id=10
+            )
+
+        self.assertEqual(len(budget_item_ids), 300)
+        self.assertEqual(len(budget["items"]), 302)
+        self.assertEqual(
+            1,
+            len([s for s in counter.statements if s.startswith("INSERT")]),
+        )
+
+    def test_invalid_rows(self):
+        items = [
+            {"name": "", "category": "bills", "total": "60"},
+            {"name": "ok", "category": "bills", "total": "60"},
+            {"name": "test", "category": "test", "total": "60"},
+            {"name": "test", "category": "bills", "total": "-1"},
+            {"name": "test", "category": "bills"},
+            "not an item",
+            {"name": "x" * 51, "category": "bills", "total": "60"},
+        ]
+        with self.assertRaises(BudgetItemsValidationError) as context:
+            create_new_budget_items(items, budget_id=1, user_id=10)
+
+        self.assertEqual(
+            context.exception.errors,
+            [
+                {"index": 0, "message": "Budget item name must not be empty."},
+                {"index": 2, "message": "Category: 'test' is not valid"},
+                {"index": 3, "message": "Total must be a non negative number."},
+                {"index": 4, "message": "Total must be a valid number."},
+                {"index": 5, "message": "Budget item must be an object."},
+                {
+                    "index": 6,
+                    "message": "Budget item name must be at most 50 characters.",
+                },
+            ],
+        )
+        # all or nothing: the valid row wasn't saved either
+        self.assertEqual(2, BudgetItem.query.filter_by(budget_id=1).count())
+
+    def test_invalid_budget(self):
+        with self.assertRaisesRegex(ValueError, "Invalid budget."):
+            create_new_budget_items(
+                CreateNewBudgetItems.VALID_ITEMS, budget_id=1, user_id=2
+            )
+
+    def test_invalid_items(self):
+        error_message = "Budget items must be a non empty list."
+        with self.assertRaisesRegex(ValueError, error_message):
+            create_new_budget_items([], budget_id=1, user_id=10)
+
+        with self.assertRaisesRegex(ValueError, error_message):
+            create_new_budget_items({"name": "foo"}, budget_id=1, user_id=10)
+
+    def test_too_many_items(self):
+        items = [{"name": "test", "category": "bills", "total": "1"}] * 1001
+        with self.assertRaisesRegex(ValueError, "more than 1000 budget items"):
+            create_new_budget_items(items, budget_id=1, user_id=10)
+
+
+class ImportBudgetItemsFromCsv(BudgetDataFixture):
+    """
+    import_budget_items_from_csv takes in: CSV lines (name,category,total
+    header), budget_id, user_id and inserts the items chunk by chunk,
+    returning the number of items imported
+    OR raises ValueError / BudgetItemsValidationError (nothing imported)
+    """
+
+    def csv_lines(self, text):
+        return io.StringIO(text, newline="")
+
+    def test_success(self):
+        response = import_budget_items_from_csv(
+            self.csv_lines(
+                'name,category,total\nPower,bills,80.1\n"401k, match",deductions,250\n'
+            ),
+            budget_id=1,
+            user_id=10,
+        )
+        self.assertEqual(response, 2)
+
+        budget = get_budget_by_budget_and_user_id(1, 10)
+        self.assertEqual(
+            [item["name"] for item in budget["items"]],
+            ["Rent", "Groceries", "Power", "401k, match"],
+        )
+        self.assertEqual(budget["items"][2]["total"], Decimal("80.10"))
+        self.assertEqual(budget["version"], 2)
+        self.assertEqual(rebuild_budget_totals(fix=False), [])
+
+    def test_header_columns_any_order_and_case(self):
+        response = import_budget_items_from_csv(
+            self.csv_lines(" Total ,Name,CATEGORY,note\n5,Gym,bills,ignored\n"), 1, 10
+        )
+        self.assertEqual(response, 1)
+
+    def test_inserted_in_chunks(self):
+        lines = "name,category,total\n" + "item,bills,1\n" * 5
+        with patch("budget_app.services.budget.budget_service.IMPORT_CHUNK_SIZE", 2):
+            with QueryCounter() as counter:
+                response = import_budget_items_from_csv(self.csv_lines(lines), 1, 10)
+
+        self.assertEqual(response, 5)
+        inserts = [s for s in counter.statements if s.startswith("INSERT")]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(7, BudgetItem.query.filter_by(budget_id=1).count())
+
+    def test_invalid_rows(self):
+        lines = (
+            "name,category,total\n"
+            "Power,bills,80\n"
+            ",bills,1\n"
+            "Gym,fun,1\n"
+            "Car,bills,-3\n"
+            "Inf,bills,inf\n"
+        )
+        with self.assertRaises(BudgetItemsValidationError) as context:
+            import_budget_items_from_csv(self.csv_lines(lines), 1, 10)
+
+        self.assertEqual(
+            [error["index"] for error in context.exception.errors], [3, 4, 5, 6]
+        )
+        self.assertEqual(
+            context.exception.errors[1]["message"], "Category: 'fun' is not valid"
+        )
+        self.assertEqual(2, BudgetItem.query.filter_by(budget_id=1).count())
+
+    def test_errors_reported_are_capped(self):
+        lines = "name,category,total\n" + "item,bills,x\n" * 5
+        with patch("budget_app.services.budget.budget_service.MAX_IMPORT_ERRORS", 3):
+            with self.assertRaises(BudgetItemsValidationError) as context:
+                import_budget_items_from_csv(self.csv_lines(lines), 1, 10)
+        self.assertEqual(len(context.exception.errors), 3)
+
+    def test_too_many_rows(self):
+        lines = "name,category,total\n" + "item,bills,1\n" * 3
+        with patch(
+            "budget_app.services.budget.budget_service.MAX_IMPORT_BUDGET_ITEMS", 2
+        ):
+            with self.assertRaisesRegex(ValueError, "more than 2 budget items"):
+                import_budget_items_from_csv(self.csv_lines(lines), 1, 10)
+        self.assertEqual(2, BudgetItem.query.filter_by(budget_id=1).count())
+
+    def test_missing_header_columns(self):
+        with self.assertRaisesRegex(ValueError, "name, category, total"):
+            import_budget_items_from_csv(self.csv_lines("name,total\na,1\n"), 1, 10)
+
+    def test_empty_file(self):
+        with self.assertRaisesRegex(ValueError, "header"):
+            import_budget_items_from_csv(self.csv_lines(""), 1, 10)
+        with self.assertRaisesRegex(ValueError, "no budget items"):
+            import_budget_items_from_csv(self.csv_lines("name,category,total\n"), 1, 10)
+
+    def test_invalid_budget(self):
+        with self.assertRaisesRegex(ValueError, "Invalid budget."):
+            import_budget_items_from_csv(
+                self.csv_lines("name,category,total\na,bills,1\n"), 1, 3
+            )
+
+
 class AttributesToUpdateDict(unittest.TestCase):
     """
     attributes_to_update_dict takes in: body (dict/json) with KVP of
@@ -420,7 +1048,7 @@ class AttributesToUpdateDict(unittest.TestCase):
 class EditBudget(BudgetDataFixture):
     """
     edit_budget takes in: budget_id, user_id, attributes_edit (json request body/ i.e. dict)
-    updates existing budget based on attributes to edit and returns the budget.id
+    updates existing budget based on attributes to edit and returns the formatted budget
     OR if invalid args it raises a ValueError with an applicable error message
     """
 
@@ -447,6 +1075,19 @@ class EditBudget(BudgetDataFixture):
         ):
             edit_budget_attributes(1, 10, {"name": "test_dont_dupe"})
 
+        # the failed write was rolled back, the session is still usable
+        self.assertEqual("mock_name", get_budget_by_budget_and_user_id(1, 10)["name"])
+
+    def test_same_name_as_current(self):
+        response = edit_budget_attributes(1, 10, {"name": "mock_name"})
+        self.assertEqual("mock_name", response["name"])
+
+    def test_no_name_lookup_query(self):
+        # uniqueness is left to the unique_budget_name_per_user constraint
+        with assert_max_queries(2) as counter:  # budget with items + UPDATE
+            edit_budget_attributes(1, 10, {"name": "renamed"})
+        self.assertTrue(counter.statements[-1].startswith("UPDATE budget"))
+
     def test_invalid_gross_income_value(self):
         error_message_negative_num = "Gross income must be a non negative number."
         with self.assertRaisesRegex(ValueError, error_message_negative_num):
@@ -475,9 +1116,8 @@ class EditBudget(BudgetDataFixture):
             10,
             {"name": "test_success", "month_duration": "12", "gross_income": "22222"},
         )
-        self.assertEqual(response, 1)
-
         budget = get_budget_by_budget_and_user_id(1, 10)
+        self.assertEqual(response, budget)
 
         self.assertEqual(budget.get("name"), "test_success")
         self.assertEqual(budget.get("month_duration"), 12)
@@ -489,9 +1129,8 @@ class EditBudget(BudgetDataFixture):
             10,
             {"name": "test_success"},
         )
-        self.assertEqual(response, 1)
-
         budget = get_budget_by_budget_and_user_id(1, 10)
+        self.assertEqual(response, budget)
 
         self.assertEqual(budget.get("name"), "test_success")  # changed
         # attributes stayed the same
@@ -501,8 +1140,9 @@ class EditBudget(BudgetDataFixture):
 
 class EditBudgetItem(BudgetDataFixture):
     """
-    edit_budget_item takes in: item_id, budget_id, attributes_edit (json request body/ i.e. dict)
+    edit_budget_item takes in: item_id, budget_id, user_id, attributes_edit (json request body/ i.e. dict)
     updates existing budget_item based on attributes to edit and returns the budget_item.id
+    and the formatted budget
     OR if invalid args it raises a ValueError with an applicable error message"""
 
     def setUp(self):
@@ -510,29 +1150,32 @@ class EditBudgetItem(BudgetDataFixture):
 
     def test_invalid_budget_item(self):
         with self.assertRaisesRegex(ValueError, "Invalid budget item."):
-            edit_budget_item_attributes(12, 1, {"name": "foo"})  # invalid item_id
+            edit_budget_item_attributes(12, 1, 10, {"name": "foo"})  # invalid item_id
 
         with self.assertRaisesRegex(ValueError, "Invalid budget item."):
-            edit_budget_item_attributes(1, 12, {"name": "foo"})  # invalid budget_id
+            edit_budget_item_attributes(1, 12, 10, {"name": "foo"})  # invalid budget_id
+
+        with self.assertRaisesRegex(ValueError, "Invalid budget item."):
+            edit_budget_item_attributes(1, 1, 2, {"name": "foo"})  # invalid user_id
 
     def test_missing_name_value(self):
         with self.assertRaisesRegex(ValueError, "New name must not be empty."):
-            edit_budget_item_attributes(1, 1, {"name": ""})
+            edit_budget_item_attributes(1, 1, 10, {"name": ""})
 
     def test_invalid_category(self):
         with self.assertRaisesRegex(
             ValueError, "Category: 'invalid_category' is not valid"
         ):
-            edit_budget_item_attributes(1, 1, {"category": "invalid_category"})
+            edit_budget_item_attributes(1, 1, 10, {"category": "invalid_category"})
 
     def test_invalid_total_value(self):
         error_message_negative_num = "Total must be a non negative number."
         with self.assertRaisesRegex(ValueError, error_message_negative_num):
-            edit_budget_item_attributes(1, 1, {"total": "-123"})
+            edit_budget_item_attributes(1, 1, 10, {"total": "-123"})
 
         expected_error_not_num = "Total must be a valid number."
         with self.assertRaisesRegex(ValueError, expected_error_not_num):
-            edit_budget_item_attributes(1, 1, {"total": ""})
+            edit_budget_item_attributes(1, 1, 10, {"total": ""})
 
     def test_success_all_attributes(self):
         # original budget_item
@@ -542,22 +1185,38 @@ class EditBudgetItem(BudgetDataFixture):
             "name": "Rent",
             "category": "bills",
             "total": Decimal("1200.00"),
+            "version": 1,
         }
         self.assertIn(original_item, budget_items)
 
         # edit budget_item
-        edit_budget_item_attributes(
-            1, 1, {"name": "test_success", "category": "savings", "total": "123"}
+        budget_item_id, budget = edit_budget_item_attributes(
+            1, 1, 10, {"name": "test_success", "category": "savings", "total": "123"}
         )
-        budget_items = get_budget_by_budget_and_user_id(1, 10).get("items")
+        self.assertEqual(budget_item_id, 1)
+        self.assertEqual(budget, get_budget_by_budget_and_user_id(1, 10))
+        budget_items = budget.get("items")
         expected_item = {
             "id": 1,
             "name": "test_success",
             "category": "savings",
             "total": Decimal("123.00"),
+            "version": 2,
         }
         self.assertIn(expected_item, budget_items)
 
+    def test_item_id_from_json(self):
+        # "item_id" as sent in a JSON body: a string or a number
+        budget_item_id, budget = edit_budget_item_attributes(
+            "1", 1, 10, {"name": "from_string"}
+        )
+        self.assertEqual(budget_item_id, 1)
+        self.assertEqual(budget["items"][0]["name"], "from_string")
+
+        for item_id in ("abc", True, None, "0"):
+            with self.assertRaisesRegex(ValueError, "Invalid budget item."):
+                edit_budget_item_attributes(item_id, 1, 10, {"name": "foo"})
+
     def test_success_one_attribute(self):
         # original budget_item
         budget_items = get_budget_by_budget_and_user_id(1, 10).get("items")
@@ -566,22 +1225,294 @@ class EditBudgetItem(BudgetDataFixture):
             "name": "Rent",
             "category": "bills",
             "total": Decimal("1200.00"),
+            "version": 1,
         }
 
         self.assertIn(original_item, budget_items)
 
         # edit budget_item
-        edit_budget_item_attributes(1, 1, {"name": "test_success"})
+        edit_budget_item_attributes(1, 1, 10, {"name": "test_success"})
         budget_items = get_budget_by_budget_and_user_id(1, 10).get("items")
         expected_item = {
             "id": 1,
             "name": "test_success",  # changed attribute
             "category": "bills",  # unchanged
             "total": Decimal("1200.00"),  # unchanged
+            "version": 2,
         }
         self.assertIn(expected_item, budget_items)
 
 
+class EditBudgetItems(BudgetDataFixture):
+    """
+    edit_budget_items_attributes takes in: edits (list of
+    {"item_id": id, "changes": {attribute: value}}), budget_id and user_id,
+    validates every edit and applies them all in one transaction,
+    returning the edited item ids
+    OR raises BudgetItemsValidationError listing every invalid row (nothing saved)
+    OR ValueError for an invalid budget / request
+    """
+
+    def setUp(self):
+        super().setUp()
+        other_budget = self.create_budget(
+            user_id=10, name="other", month_duration="1", gross_income="10"
+        )
+        self.other_budget_item = self.create_item(
+            other_budget, name="Gym", category="bills", total="30"
+        )
+        db.session.commit()
+
+    def test_success(self):
+        edits = [
+            {"item_id": 1, "changes": {"name": "Mortgage", "total": "1500"}},
+            {"item_id": 2, "changes": {"category": "savings"}},
+        ]
+        # budget with items, one UPDATE per key set, budget version UPDATE
+        with assert_max_queries(4):
+            budget_item_ids, budget = edit_budget_items_attributes(
+                edits, budget_id=1, user_id=10
+            )
+        self.assertEqual(budget_item_ids, [1, 2])
+        self.assertEqual(budget, get_budget_by_budget_and_user_id(1, 10))
+
+        budget_items = budget.get("items")
+        self.assertEqual(
+            [
+                {
+                    "id": 1,
+                    "name": "Mortgage",
+                    "category": "bills",
+                    "total": Decimal("1500.00"),
+                    "version": 2,
+                },
+                {
+                    "id": 2,
+                    "name": "Groceries",
+                    "category": "savings",
+                    "total": Decimal("400.00"),
+                    "version": 2,
+                },
+            ],
+            budget_items,
+        )
+
+    def test_invalid_rows(self):
+        edits = [
+            {"item_id": 1, "changes": {"name": ""}},
+            {"item_id": 2, "changes": {"total": "5"}},
+            {"item_id": self.other_budget_item.id, "changes": {"name": "foo"}},
+            {"item_id": 2, "changes": {"name": "twice"}},
+            {"item_id": 1, "changes": {"color": "red"}},
+            {"item_id": "abc", "changes": {"name": "foo"}},
+            "not an edit",
+        ]
+        with self.assertRaises(BudgetItemsValidationError) as context:
+            edit_budget_items_attributes(edits, budget_id=1, user_id=10)
+
+        self.assertEqual(
+            context.exception.errors,
+            [
+                {"index": 0, "message": "New name must not be empty."},
+                {"index": 2, "message": "Invalid budget item."},
+                {"index": 3, "message": "Budget item can only be edited once."},
+                {
+                    "index": 4,
+                    "message": "Missing attribute(s) to update. Valid attributes are: name, category, total",
+                },
+                {"index": 5, "message": "Invalid budget item."},
+                {
+                    "index": 6,
+                    "message": "Budget item edit must be an object with item_id and changes.",
+                },
+            ],
+        )
+        # all or nothing: the valid edit wasn't saved either
+        self.assertEqual(Decimal("400.00"), db.session.get(BudgetItem, 2).total)
+
+    def test_invalid_budget(self):
+        with self.assertRaisesRegex(ValueError, "Invalid budget."):
+            edit_budget_items_attributes(
+                [{"item_id": 1, "changes": {"name": "foo"}}], budget_id=1, user_id=2
+            )
+
+    def test_invalid_edits(self):
+        with self.assertRaisesRegex(ValueError, "non empty list"):
+            edit_budget_items_attributes([], budget_id=1, user_id=10)
+
+
+class OptimisticConcurrency(BudgetDataFixture):
+    """
+    Budget and BudgetItem versions: writes bump them, edits made from an
+    outdated version (expected_version / "version") or racing another write
+    raise BudgetVersionConflictError carrying the current budget, nothing saved
+    """
+
+    def test_edit_budget_expected_version(self):
+        budget = edit_budget_attributes(1, 10, {"name": "renamed"}, expected_version=1)
+        self.assertEqual(budget["version"], 2)
+
+        with self.assertRaises(BudgetVersionConflictError) as context:
+            edit_budget_attributes(1, 10, {"name": "stale"}, expected_version=1)
+        self.assertEqual(context.exception.budget["name"], "renamed")
+        self.assertEqual(context.exception.budget["version"], 2)
+
+    def test_invalid_expected_version(self):
+        with self.assertRaisesRegex(ValueError, "Version must be a positive"):
+            edit_budget_attributes(1, 10, {"name": "renamed"}, expected_version="abc")
+
+    def test_edit_budget_item_expected_version(self):
+        _, budget = edit_budget_item_attributes(
+            1, 1, 10, {"total": "1300"}, expected_version=1
+        )
+        self.assertEqual(budget["items"][0]["version"], 2)
+        self.assertEqual(budget["version"], 2)  # item writes bump the budget
+
+        with self.assertRaises(BudgetVersionConflictError):
+            edit_budget_item_attributes(1, 1, 10, {"total": "1"}, expected_version=1)
+        self.assertEqual(
+            Decimal("1300.00"), BudgetItem.query.filter_by(id=1).first().total
+        )
+
+    def test_edit_budget_items_expected_version(self):
+        edit_budget_item_attributes(2, 1, 10, {"name": "changed"})
+        edits = [
+            {"item_id": 1, "version": 1, "changes": {"total": "1"}},
+            {"item_id": 2, "version": 1, "changes": {"total": "1"}},  # stale
+        ]
+        with self.assertRaises(BudgetVersionConflictError):
+            edit_budget_items_attributes(edits, budget_id=1, user_id=10)
+        self.assertEqual(
+            Decimal("1200.00"), BudgetItem.query.filter_by(id=1).first().total
+        )
+
+        edits[1]["version"] = 2
+        _, budget = edit_budget_items_attributes(edits, budget_id=1, user_id=10)
+        self.assertEqual([item["version"] for item in budget["items"]], [2, 3])
+        self.assertEqual(budget, get_budget_by_budget_and_user_id(1, 10))
+
+    def test_edit_budget_items_invalid_version(self):
+        with self.assertRaises(BudgetItemsValidationError) as context:
+            edit_budget_items_attributes(
+                [{"item_id": 1, "version": "abc", "changes": {"total": "1"}}],
+                budget_id=1,
+                user_id=10,
+            )
+        self.assertEqual(
+            context.exception.errors,
+            [{"index": 0, "message": "Version must be a positive whole number."}],
+        )
+
+    def test_concurrent_write_detected(self):
+        def load_then_concurrent_write(budget_id, user_id):
+            budget = _get_budget_with_items(budget_id, user_id)
+            # another request writes to the budget after this one loaded it
+            db.session.execute(
+                update(Budget)
+                .where(Budget.id == budget_id)
+                .values(version=Budget.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            return budget
+
+        with patch(
+            "budget_app.services.budget.budget_service._get_budget_with_items",
+            side_effect=load_then_concurrent_write,
+        ):
+            with self.assertRaises(BudgetVersionConflictError) as context:
+                create_new_budget_item("Gas", "bills", "50", 1, 10)
+
+        self.assertEqual(len(context.exception.budget["items"]), 2)
+        self.assertEqual(2, BudgetItem.query.filter_by(budget_id=1).count())
+
+    def test_deletes_bump_budget_version(self):
+        delete_budget_item_by_item_and_budget_ids(1, 1, 10)
+        delete_budget_items_by_item_and_budget_ids([2], 1, 10)
+        self.assertEqual(3, get_budget_by_budget_and_user_id(1, 10)["version"])
+
+
+class MaterializedBudgetTotals(BudgetDataFixture):
+    """
+    every item write keeps the budget's item_count / <category>_total
+    columns equal to the totals summed from its items
+    """
+
+    def assertTotalsMaterialized(self):
+        db.session.expire_all()
+        budget = db.session.get(Budget, 1)
+        self.assertEqual(
+            format_budget_totals_from_columns(budget),
+            totals_summed_from_items(1),
+        )
+        self.assertEqual(rebuild_budget_totals(fix=False), [])
+        return budget
+
+    def test_fixture(self):
+        budget = self.assertTotalsMaterialized()
+        self.assertEqual(budget.item_count, 2)
+        self.assertEqual(budget.bills_total, Decimal("1600.00"))
+
+    def test_create_item(self):
+        create_new_budget_item("401k", "deductions", "250.55", 1, 10)
+        budget = self.assertTotalsMaterialized()
+        self.assertEqual(budget.item_count, 3)
+        self.assertEqual(budget.deductions_total, Decimal("250.55"))
+
+    def test_create_items(self):
+        create_new_budget_items(
+            [
+                {"name": "401k", "category": "deductions", "total": 250},
+                {"name": "Power", "category": "bills", "total": "80.10"},
+            ],
+            1,
+            10,
+        )
+        budget = self.assertTotalsMaterialized()
+        self.assertEqual(budget.bills_total, Decimal("1680.10"))
+
+    def test_edit_item_total_and_category(self):
+        edit_budget_item_attributes(
+            self.item1.id, 1, 10, {"category": "savings", "total": "1000"}
+        )
+        budget = self.assertTotalsMaterialized()
+        self.assertEqual(budget.bills_total, Decimal("400.00"))
+        self.assertEqual(budget.savings_total, Decimal("1000.00"))
+
+    def test_edit_items(self):
+        edit_budget_items_attributes(
+            [
+                {"item_id": self.item1.id, "changes": {"total": "1300"}},
+                {"item_id": self.item2.id, "changes": {"category": "savings"}},
+            ],
+            1,
+            10,
+        )
+        budget = self.assertTotalsMaterialized()
+        self.assertEqual(budget.bills_total, Decimal("1300.00"))
+        self.assertEqual(budget.savings_total, Decimal("400.00"))
+
+    def test_delete_item(self):
+        delete_budget_item_by_item_and_budget_ids(self.item1.id, 1, 10)
+        budget = self.assertTotalsMaterialized()
+        self.assertEqual(budget.item_count, 1)
+
+    def test_delete_items(self):
+        delete_budget_items_by_item_and_budget_ids(
+            [self.item1.id, self.item2.id], 1, 10
+        )
+        budget = self.assertTotalsMaterialized()
+        self.assertEqual(budget.item_count, 0)
+        self.assertEqual(budget.bills_total, 0)
+
+    def test_failed_write_leaves_totals(self):
+        with self.assertRaises(ValueError):
+            create_new_budget_item("Bad", "bills", "-5", 1, 10)
+        with self.assertRaises(ValueError):
+            delete_budget_items_by_item_and_budget_ids([self.item1.id, 99], 1, 10)
+        budget = self.assertTotalsMaterialized()
+        self.assertEqual(budget.item_count, 2)
+
+
 class DeleteBudget(BudgetDataFixture):
     """
     delete_budget takes in: budget_id, user_id
@@ -601,16 +1532,19 @@ class DeleteBudget(BudgetDataFixture):
             delete_budget_by_budget_and_user_ids(1, 12)  # invalid user_id
 
     def test_success(self):
-        response = delete_budget_by_budget_and_user_ids(1, 10)
+        # one DELETE, the items are removed by ON DELETE CASCADE (not loaded)
+        with assert_max_queries(1):
+            response = delete_budget_by_budget_and_user_ids(1, 10)
         self.assertEqual(response, "mock_name")
 
         budget = Budget.query.filter_by(id=1, user_id=10).first()
         self.assertIsNone(budget)
+        self.assertEqual(0, BudgetItem.query.filter_by(budget_id=1).count())
 
 
 class DeleteBudgetItem(BudgetDataFixture):
     """
-    delete_budget_item takes in: item_id, budget_id
+    delete_budget_item takes in: item_id, budget_id, user_id
     and deletes the budget_item from the budget if valid args
     and returns a description of the item deleted
     OR raises ValueError with message of invalid budget item
@@ -621,17 +1555,20 @@ class DeleteBudgetItem(BudgetDataFixture):
 
     def test_invalid_budget_item(self):
         with self.assertRaisesRegex(ValueError, "Invalid budget item."):
-            delete_budget_item_by_item_and_budget_ids(12, 1)  # invalid item_id
+            delete_budget_item_by_item_and_budget_ids(12, 1, 10)  # invalid item_id
+
+        with self.assertRaisesRegex(ValueError, "Invalid budget item."):
+            delete_budget_item_by_item_and_budget_ids(1, 3, 10)  # invalid budget_id
 
         with self.assertRaisesRegex(ValueError, "Invalid budget item."):
-            delete_budget_item_by_item_and_budget_ids(1, 3)  # invalid budget_id
+            delete_budget_item_by_item_and_budget_ids(1, 1, 2)  # not user's budget
 
     def test_success(self):
         # check budget_item exists
         budget_item = BudgetItem.query.filter_by(id=1, budget_id=1).first()
         self.assertIsNotNone(budget_item)
 
-        response = delete_budget_item_by_item_and_budget_ids(1, 1)
+        response = delete_budget_item_by_item_and_budget_ids(1, 1, 10)
         item_description = "Category: 'bills' and with Name: 'Rent'"
         self.assertEqual(response, item_description)
 
@@ -640,5 +1577,125 @@ class DeleteBudgetItem(BudgetDataFixture):
         self.assertIsNone(budget_item)
 
 
+class DeleteBudgetItems(BudgetDataFixture):
+    """
+    delete_budget_items_by_item_and_budget_ids takes in: item_ids, budget_id,
+    user_id and deletes all the items with one DELETE, returning the number of
+    items deleted
+    OR raises ValueError (nothing deleted) when an id isn't in the budget
+    """
+
+    def test_success(self):
+        with assert_max_queries(3):  # ownership check + DELETE + version UPDATE
+            response = delete_budget_items_by_item_and_budget_ids(
+                [1, 2, 2], budget_id=1, user_id=10
+            )
+        self.assertEqual(response, 2)
+        self.assertEqual(0, BudgetItem.query.filter_by(budget_id=1).count())
+
+    def test_item_not_in_budget(self):
+        with self.assertRaisesRegex(ValueError, "no items were deleted"):
+            delete_budget_items_by_item_and_budget_ids([1, 12], budget_id=1, user_id=10)
+        # all or nothing: item 1 is still there
+        self.assertEqual(2, BudgetItem.query.filter_by(budget_id=1).count())
+
+    def test_invalid_item_ids(self):
+        with self.assertRaises(BudgetItemsValidationError) as context:
+            delete_budget_items_by_item_and_budget_ids(
+                [1, "abc", None], budget_id=1, user_id=10
+            )
+        self.assertEqual([error["index"] for error in context.exception.errors], [1, 2])
+
+    def test_invalid_budget(self):
+        with self.assertRaisesRegex(ValueError, "Invalid budget."):
+            delete_budget_items_by_item_and_budget_ids([1], budget_id=1, user_id=2)
+
+
+@unittest.skipUnless(
+    POSTGRES_URL.startswith("postgresql"), "DATABASE_URL isn't a PostgreSQL database"
+)
+class InsertBudgetItemRowsCopy(unittest.TestCase):
+    """
+    the COPY branch of _insert_budget_item_rows, run on the DATABASE_URL
+    database in a schema of its own, dropped afterwards
+    """
+
+    def setUp(self):
+        # the driver SQLAlchemy picks for the URL (not connected yet)
+        if create_engine(POSTGRES_URL).dialect.driver != "psycopg2":
+            self.skipTest("COPY is only used with psycopg2")
+        self.schema = f"budget_app_test_{uuid.uuid4().hex[:12]}"
+        self.execute_on_database(f'CREATE SCHEMA "{self.schema}"')
+        self.addCleanup(
+            self.execute_on_database, f'DROP SCHEMA "{self.schema}" CASCADE'
+        )
+
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": POSTGRES_URL,
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+                "SQLALCHEMY_ENGINE_OPTIONS": {
+                    "connect_args": {"options": f"-csearch_path={self.schema}"}
+                },
+            }
+        )
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add(User(id=10, username="user_10", password_hash="not-a-hash"))
+        db.session.add(
+            Budget(id=1, user_id=10, name="mock_name", month_duration=1, gross_income=1)
+        )
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()  # closes the connections before the schema is dropped
+        self.context.pop()
+
+    def execute_on_database(self, statement):
+        engine = create_engine(POSTGRES_URL)
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(statement))
+        finally:
+            engine.dispose()
+
+    def test_csv_quoting(self):
+        names = ['comma, "quotes"', "new\nline", "café", "\\N"]
+        _insert_budget_item_rows(
+            [
+                {
+                    "budget_id": 1,
+                    "name": name,
+                    "category": "bills",
+                    "total": to_money(total),
+                }
+                for name, total in zip(names, ["1", "0.1", "2.5", "0"])
+            ]
+        )
+        db.session.commit()
+
+        items = BudgetItem.query.filter_by(budget_id=1).order_by(BudgetItem.id).all()
+        self.assertEqual([item.name for item in items], names)
+        self.assertEqual(
+            [item.total for item in items],
+            [Decimal("1.00"), Decimal("0.10"), Decimal("2.50"), Decimal("0.00")],
+        )
+
+    def test_import(self):
+        lines = "name,category,total\n" + '"rent, flat",bills,1.5\n' * 5
+        with patch("budget_app.services.budget.budget_service.IMPORT_CHUNK_SIZE", 2):
+            response = import_budget_items_from_csv(
+                io.StringIO(lines, newline=""), 1, 10
+            )
+
+        self.assertEqual(response, 5)
+        budget = get_budget_by_budget_and_user_id(1, 10)
+        self.assertEqual([item["name"] for item in budget["items"]], ["rent, flat"] * 5)
+        self.assertEqual(rebuild_budget_totals(fix=False), [])
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,175 @@
+"""
+Streaming export of every budget (and item) a user owns.
+
+Rows are read with a server side cursor (stream_results, yield_per
+EXPORT_BATCH_SIZE rows at a time on psycopg2) and written out one line at a
+time by generators, so the memory used stays constant however many budgets
+and items the user owns. Nothing is formatted into one in-memory list.
+
+The response (200) is sent by the time an error happens mid export: it is
+logged to the "budget_app.export" logger, an NDJSON export ends with an
+{"type": "error"} line, and the error is re-raised so the server aborts the
+response instead of ending it like a complete export (see stream_export).
+"""
+
+import csv
+import io
+import json
+import logging
+
+from sqlalchemy import select
+
+from ...extensions import db
+from ...models import Budget, BudgetItem
+
+EXPORT_FORMATS = ["ndjson", "csv"]  # first format is the default
+EXPORT_BATCH_SIZE = 1000
+# a spreadsheet opening the CSV evaluates cells starting with one of these
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+EXPORT_ERROR_MESSAGE = "Export failed, the lines above are incomplete."
+EXPORT_CSV_COLUMNS = [
+    "budget_id",
+    "budget_name",
+    "month_duration",
+    "gross_income",
+    "item_id",
+    "item_name",
+    "category",
+    "total",
+]
+
+export_logger = logging.getLogger("budget_app.export")
+
+
+def iter_export_rows(user_id, batch_size=EXPORT_BATCH_SIZE):
+    """
+    yield one row per budget item of the user's budgets (a budget without
+    items yields one row with None item columns), ordered by budget id then
+    item id, fetched from the database batch_size rows at a time
+    """
+    statement = (
+        select(
+            Budget.id.label("budget_id"),
+            Budget.name.label("budget_name"),
+            Budget.month_duration,
+            Budget.gross_income,
+            BudgetItem.id.label("item_id"),
+            BudgetItem.name.label("item_name"),
+            BudgetItem.category,
+            BudgetItem.total,
+        )
+        .outerjoin(BudgetItem, BudgetItem.budget_id == Budget.id)
+        .where(Budget.user_id == user_id)
+        .order_by(Budget.id, BudgetItem.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    result = db.session.execute(statement)
+    try:
+        yield from result
+    finally:
+        # a client disconnecting mid export closes the generator: release
+        # the server side cursor right away
+        result.close()
+
+
+def _money(value):
+    """Decimal column value -> exact string ("1200.00"), None stays None"""
+    return None if value is None else str(value)
+
+
+def _csv_text(value):
+    """user text -> CSV cell a spreadsheet shows as text, never as a formula"""
+    if value and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def export_ndjson(user_id, batch_size=EXPORT_BATCH_SIZE):
+    """
+    yield the user's budgets as newline delimited JSON, one object per line:
+        {"type": "budget", "id", "name", "month_duration", "gross_income"}
+    followed by each of its items:
+        {"type": "item", "id", "budget_id", "name", "category", "total"}
+    """
+    budget_id = None
+    for row in iter_export_rows(user_id, batch_size):
+        if row.budget_id != budget_id:
+            budget_id = row.budget_id
+            yield json.dumps(
+                {
+                    "type": "budget",
+                    "id": row.budget_id,
+                    "name": row.budget_name,
+                    "month_duration": row.month_duration,
+                    "gross_income": _money(row.gross_income),
+                }
+            ) + "\n"
+
+        if row.item_id is not None:
+            yield json.dumps(
+                {
+                    "type": "item",
+                    "id": row.item_id,
+                    "budget_id": row.budget_id,
+                    "name": row.item_name,
+                    "category": row.category,
+                    "total": _money(row.total),
+                }
+            ) + "\n"
+
+
+def export_csv(user_id, batch_size=EXPORT_BATCH_SIZE):
+    """
+    yield the user's budgets as CSV (header EXPORT_CSV_COLUMNS), one line
+    per item with its budget's columns repeated; a budget without items is
+    one line with empty item columns. Names starting like a formula ("=",
+    "+", "-", "@", tab, CR) are prefixed with "'"
+    """
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def csv_line(values):
+        line.seek(0)
+        line.truncate()
+        writer.writerow(values)
+        return line.getvalue()
+
+    yield csv_line(EXPORT_CSV_COLUMNS)
+    for row in iter_export_rows(user_id, batch_size):
+        yield csv_line(
+            [
+                row.budget_id,
+                _csv_text(row.budget_name),
+                row.month_duration,
+                _money(row.gross_income),
+                row.item_id,
+                _csv_text(row.item_name),
+                row.category,
+                _money(row.total),
+            ]
+        )
+
+
+EXPORTERS = {
+    "ndjson": (export_ndjson, "application/x-ndjson"),
+    "csv": (export_csv, "text/csv"),
+}
+
+
+def stream_export(user_id, export_format):
+    """
+    yield the lines of the user's export in export_format. An error mid
+    export is logged, ends an NDJSON export with
+        {"type": "error", "message"}
+    then is re-raised: the transfer is cut short, not ended normally
+    """
+    exporter, _ = EXPORTERS[export_format]
+    try:
+        yield from exporter(user_id)
+    except Exception:
+        export_logger.exception(
+            "%s export of user %s's budgets failed", export_format, user_id
+        )
+        if export_format == "ndjson":
+            yield json.dumps({"type": "error", "message": EXPORT_ERROR_MESSAGE}) + "\n"
+        raise
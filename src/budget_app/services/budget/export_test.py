@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.exc import OperationalError
+
+from budget_app import create_app
+from budget_app.models import Budget, BudgetItem, User
+from budget_app.services.budget.export import (
+    EXPORT_CSV_COLUMNS,
+    EXPORT_ERROR_MESSAGE,
+    _csv_text,
+    export_csv,
+    export_ndjson,
+    iter_export_rows,
+    stream_export,
+)
+from ...extensions import db
+from ...testing import QueryCounter
+
+
+class ExportFixture(unittest.TestCase):
+    """
+    user 10 owns a budget with 3 items and an empty budget,
+    user 3 owns a budget that must never be exported for user 10
+    """
+
+    def setUp(self):
+        self.app = create_app(
+            {
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+                "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+            }
+        )
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+        db.session.add_all(
+            [
+                User(id=3, username="user_3", password_hash="not-a-hash"),
+                User(id=10, username="user_10", password_hash="not-a-hash"),
+            ]
+        )
+
+        self.budget = Budget(
+            user_id=10, name="mock_name", month_duration=1, gross_income=3500
+        )
+        self.budget.items = [
+            BudgetItem(name="Rent", category="bills", total=1200),
+            BudgetItem(name="Groceries, food", category="bills", total="400.5"),
+            BudgetItem(name="401k", category="deductions", total=250),
+        ]
+        self.empty_budget = Budget(
+            user_id=10, name="empty", month_duration=12, gross_income=100
+        )
+        self.other_user_budget = Budget(
+            user_id=3, name="other", month_duration=1, gross_income=10
+        )
+        self.other_user_budget.items = [
+            BudgetItem(name="Secret", category="bills", total=1)
+        ]
+        db.session.add_all([self.budget, self.empty_budget, self.other_user_budget])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+
+class IterExportRows(ExportFixture):
+
+    def test_rows_ordered_by_budget_then_item(self):
+        rows = list(iter_export_rows(10, batch_size=2))
+        self.assertEqual(
+            [(row.budget_id, row.item_id) for row in rows],
+            [
+                (self.budget.id, self.budget.items[0].id),
+                (self.budget.id, self.budget.items[1].id),
+                (self.budget.id, self.budget.items[2].id),
+                (self.empty_budget.id, None),
+            ],
+        )
+
+    def test_one_query_whatever_the_batch_size(self):
+        with QueryCounter() as counter:
+            rows = list(iter_export_rows(10, batch_size=1))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(counter.count, 1)
+
+    def test_user_without_budgets(self):
+        self.assertEqual(list(iter_export_rows(2)), [])
+
+
+class ExportNdjson(ExportFixture):
+
+    def test_success(self):
+        lines = list(export_ndjson(10))
+        self.assertTrue(all(line.endswith("\n") for line in lines))
+        objects = [json.loads(line) for line in lines]
+
+        self.assertEqual(
+            objects[0],
+            {
+                "type": "budget",
+                "id": self.budget.id,
+                "name": "mock_name",
+                "month_duration": 1,
+                "gross_income": "3500.00",
+            },
+        )
+        self.assertEqual(
+            objects[2],
+            {
+                "type": "item",
+                "id": self.budget.items[1].id,
+                "budget_id": self.budget.id,
+                "name": "Groceries, food",
+                "category": "bills",
+                "total": "400.50",
+            },
+        )
+        self.assertEqual(
+            [obj["type"] for obj in objects],
+            ["budget", "item", "item", "item", "budget"],
+        )
+        self.assertNotIn("other", [obj["name"] for obj in objects])
+
+
+class ExportCsv(ExportFixture):
+
+    def test_success(self):
+        rows = list(csv.reader(io.StringIO("".join(export_csv(10)))))
+
+        self.assertEqual(rows[0], EXPORT_CSV_COLUMNS)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(
+            rows[2],
+            [
+                str(self.budget.id),
+                "mock_name",
+                "1",
+                "3500.00",
+                str(self.budget.items[1].id),
+                "Groceries, food",
+                "bills",
+                "400.50",
+            ],
+        )
+        # budget without items: empty item columns
+        self.assertEqual(
+            rows[4],
+            [str(self.empty_budget.id), "empty", "12", "100.00", "", "", "", ""],
+        )
+
+    def test_formulas_escaped(self):
+        self.budget.name = '=HYPERLINK("http://x")'
+        for item, name in zip(self.budget.items, ["+1", "-1", "@SUM(A1)"]):
+            item.name = name
+        db.session.commit()
+
+        rows = list(csv.reader(io.StringIO("".join(export_csv(10)))))
+        self.assertEqual(rows[1][1], '\'=HYPERLINK("http://x")')
+        self.assertEqual([row[5] for row in rows[1:4]], ["'+1", "'-1", "'@SUM(A1)"])
+        self.assertEqual(_csv_text("\tcmd"), "'\tcmd")
+        self.assertEqual(_csv_text("\rcmd"), "'\rcmd")
+        self.assertEqual(_csv_text("a=b"), "a=b")
+        # NDJSON isn't opened by spreadsheets: left as is
+        self.assertEqual(json.loads(next(export_ndjson(10)))["name"], self.budget.name)
+
+
+class StreamExport(ExportFixture):
+
+    def failing_rows(self, user_id, batch_size):
+        """the first row, then the connection is lost"""
+        rows = iter_export_rows(user_id, batch_size)
+        yield next(rows)
+        rows.close()
+        raise OperationalError("SELECT", {}, Exception("connection lost"))
+
+    def read(self, export_format):
+        lines = []
+        with self.assertLogs("budget_app.export", "ERROR") as logs:
+            with self.assertRaises(OperationalError):
+                for line in stream_export(10, export_format):
+                    lines.append(line)
+        self.assertIn("export of user 10's budgets failed", logs.output[0])
+        return lines
+
+    def test_success(self):
+        self.assertEqual(list(stream_export(10, "csv")), list(export_csv(10)))
+
+    def test_ndjson_error_line(self):
+        with patch(
+            "budget_app.services.budget.export.iter_export_rows", self.failing_rows
+        ):
+            objects = [json.loads(line) for line in self.read("ndjson")]
+        self.assertEqual([obj["type"] for obj in objects], ["budget", "item", "error"])
+        self.assertEqual(objects[-1]["message"], EXPORT_ERROR_MESSAGE)
+
+    def test_csv_cut_short(self):
+        with patch(
+            "budget_app.services.budget.export.iter_export_rows", self.failing_rows
+        ):
+            rows = list(csv.reader(io.StringIO("".join(self.read("csv")))))
+        self.assertEqual(rows[0], EXPORT_CSV_COLUMNS)
+        self.assertEqual(len(rows), 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
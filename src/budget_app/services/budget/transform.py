@@ -1,8 +1,22 @@
-def raw_budget_to_budget(raw_budget):
+from decimal import ROUND_HALF_UP, Decimal
+
+
+def to_money(value):
+    """
+    Convert a validated number (int, float or numeric string) to the Decimal
+    a Numeric(11, 2) column stores, e.g. "12.5" -> Decimal("12.50")
+    """
+    return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def raw_budget_to_budget(raw_budget, items=None):
     """
     Transform a Budget SQLAlchemy model instance into a serializable dict.
 
-    Arg: raw_budget (Budget): A valid Budget instance with related BudgetItems loaded.
+    Args:
+        raw_budget (Budget): A valid Budget instance with related BudgetItems loaded.
+        items (list, optional): BudgetItems to serialize instead of raw_budget.items
+            (e.g. one page of items).
 
     NOTE:
     - *_raw fields are numeric and meant for calculations / forms
@@ -13,13 +27,34 @@ def raw_budget_to_budget(raw_budget):
         "name": raw_budget.name,
         "month_duration": raw_budget.month_duration,
         "gross_income": float(raw_budget.gross_income),
+        "version": raw_budget.version,
         "items": [
             {
                 "id": item.id,
                 "name": item.name,
                 "category": item.category,
                 "total": item.total,
+                "version": item.version,
             }
-            for item in raw_budget.items
+            for item in (raw_budget.items if items is None else items)
         ],
     }
+
+
+def budget_summary_row_to_summary(row, totals):
+    """
+    Transform a budget summary row (budget columns only) and its SQL computed
+    totals into a serializable dict.
+
+    Args:
+        row: A result row with id, name, month_duration, gross_income and version.
+        totals (dict): The budget's totals, see aggregate.format_budget_totals.
+    """
+    return {
+        "id": row.id,
+        "name": row.name,
+        "month_duration": row.month_duration,
+        "gross_income": float(row.gross_income),
+        "version": row.version,
+        **totals,
+    }
@@ -1,5 +1,8 @@
 import unittest
-from .transform import raw_budget_to_budget
+from types import SimpleNamespace
+from decimal import Decimal
+
+from .transform import budget_summary_row_to_summary, raw_budget_to_budget
 from ...models import Budget, BudgetItem
 
 
@@ -7,12 +10,26 @@ class RawBudgetToBudget(unittest.TestCase):
 
     def setUp(self):
         self.raw_budget = Budget(
-            id=1, user_id=10, name="mock_name", month_duration=1, gross_income=3500
+            id=1,
+            user_id=10,
+            name="mock_name",
+            month_duration=1,
+            gross_income=3500,
+            version=3,
         )
 
         self.raw_budget.items = [
-            BudgetItem(id=1, budget_id=1, name="Rent", category="bills", total=1200),
-            BudgetItem(id=2, budget_id=1, name="Groceries", category="food", total=400),
+            BudgetItem(
+                id=1, budget_id=1, name="Rent", category="bills", total=1200, version=1
+            ),
+            BudgetItem(
+                id=2,
+                budget_id=1,
+                name="Groceries",
+                category="food",
+                total=400,
+                version=2,
+            ),
         ]
 
     def test_success(self):
@@ -22,23 +39,59 @@ class RawBudgetToBudget(unittest.TestCase):
             "name": "mock_name",
             "month_duration": 1,
             "gross_income": 3500.0,
+            "version": 3,
             "items": [
                 {
                     "id": 1,
                     "name": "Rent",
                     "category": "bills",
                     "total": 1200.0,
+                    "version": 1,
                 },
                 {
                     "id": 2,
                     "name": "Groceries",
                     "category": "food",
                     "total": 400.0,
+                    "version": 2,
                 },
             ],
         }
         self.assertEqual(response, formatted_budget)
 
 
+class BudgetSummaryRowToSummary(unittest.TestCase):
+
+    def setUp(self):
+        self.row = SimpleNamespace(
+            id=1,
+            name="mock_name",
+            month_duration=1,
+            gross_income=Decimal("3500.00"),
+            version=1,
+        )
+        self.totals = {
+            "item_count": 2,
+            "category_totals": {"deductions": 0.0, "bills": 1600.0, "savings": 0.0},
+            "total_expenses": 1600.0,
+            "net_income": 1900.0,
+        }
+
+    def test_success(self):
+        response = budget_summary_row_to_summary(self.row, self.totals)
+        formatted_summary = {
+            "id": 1,
+            "name": "mock_name",
+            "month_duration": 1,
+            "gross_income": 3500.0,
+            "version": 1,
+            "item_count": 2,
+            "category_totals": {"deductions": 0.0, "bills": 1600.0, "savings": 0.0},
+            "total_expenses": 1600.0,
+            "net_income": 1900.0,
+        }
+        self.assertEqual(response, formatted_summary)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,13 @@
 """helper funcs to validate input that is reused (creating/editting budget/budget_items)"""
 
+import math
+
+from ...models import BudgetItem
+
+VALID_BUDGET_ITEM_CATEGORY = ["deductions", "bills", "savings"]
+MAX_AMOUNT = 999_999_999.99  # largest value of a Numeric(11, 2) column
+MAX_BUDGET_ITEM_NAME_LENGTH = BudgetItem.name.type.length
+
 
 def validate_month_duration(month_duration_raw):
     try:
@@ -14,8 +22,78 @@ def validate_month_duration(month_duration_raw):
 def validate_positive_float(num_input):
     try:
         number = float(num_input)
+        # float() accepts "inf" / "nan", and "1e400" overflows to inf
+        if not math.isfinite(number):
+            return "must be a valid number."
         if number < 0:
             return "must be a non negative number."
+        if number > MAX_AMOUNT:
+            return f"must be at most {MAX_AMOUNT:,.2f}."
         return False
-    except ValueError:
+    except (TypeError, ValueError):
         return "must be a valid number."
+
+
+def validate_budget_item_name_length(name):
+    """return error message for a name longer than its column OR False"""
+    if len(str(name)) > MAX_BUDGET_ITEM_NAME_LENGTH:
+        return f"Budget item name must be at most {MAX_BUDGET_ITEM_NAME_LENGTH} characters."
+    return False
+
+
+def validate_budget_item(name, category, total):
+    """return error message for an invalid budget item OR False"""
+    if not name:
+        return "Budget item name must not be empty."
+
+    invalid_name_message = validate_budget_item_name_length(name)
+    if invalid_name_message:
+        return invalid_name_message
+
+    if category not in VALID_BUDGET_ITEM_CATEGORY:
+        return f"Category: '{category}' is not valid"
+
+    invalid_total_message = validate_positive_float(total)
+    if invalid_total_message:
+        return f"Total {invalid_total_message}"
+
+    return False
+
+
+def validate_budget_item_attribute(attribute, new_value):
+    """return error message for an invalid new value of a budget item attribute OR False"""
+    if attribute == "name":
+        if not new_value:
+            return "New name must not be empty."
+        invalid_name_message = validate_budget_item_name_length(new_value)
+        if invalid_name_message:
+            return invalid_name_message
+
+    if attribute == "category" and new_value not in VALID_BUDGET_ITEM_CATEGORY:
+        return f"Category: '{new_value}' is not valid"
+
+    if attribute == "total":
+        invalid_total_message = validate_positive_float(new_value)
+        if invalid_total_message:
+            return f"Total {invalid_total_message}"
+
+    return False
+
+
+def validate_page_limit(limit_raw, max_limit):
+    try:
+        limit = int(limit_raw)
+        if limit < 1 or limit > max_limit:
+            return f"Limit must be between 1 and {max_limit}."
+        return False
+    except (TypeError, ValueError):
+        return "Limit must be a whole number."
+
+
+def validate_cursor(cursor_raw):
+    try:
+        if int(cursor_raw) < 0:
+            return "Cursor must be a valid id."
+        return False
+    except (TypeError, ValueError):
+        return "Cursor must be a valid id."
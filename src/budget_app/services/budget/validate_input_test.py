@@ -1,6 +1,13 @@
 import unittest
 from random import randint
-from .validate_input import validate_month_duration, validate_positive_float
+from .validate_input import (
+    validate_budget_item,
+    validate_budget_item_attribute,
+    validate_cursor,
+    validate_month_duration,
+    validate_page_limit,
+    validate_positive_float,
+)
 
 
 class ValidateMonthDuration(unittest.TestCase):
@@ -52,6 +59,94 @@ class ValidatePositiveFloat(unittest.TestCase):
         response = validate_positive_float("-123")
         self.assertEqual(response, "must be a non negative number.")
 
+    def test_not_finite(self):
+        for value in ("inf", "Infinity", "-inf", "nan", "1e400", float("nan")):
+            response = validate_positive_float(value)
+            self.assertEqual(response, "must be a valid number.")
+
+    def test_too_large(self):
+        self.assertFalse(validate_positive_float("999999999.99"))
+        response = validate_positive_float("1e30")
+        self.assertEqual(response, "must be at most 999,999,999.99.")
+
+
+class ValidateBudgetItem(unittest.TestCase):
+
+    def test_success(self):
+        self.assertFalse(validate_budget_item("Rent", "bills", "1200"))
+
+    def test_missing_name(self):
+        response = validate_budget_item("", "bills", "1200")
+        self.assertEqual(response, "Budget item name must not be empty.")
+
+    def test_name_too_long(self):
+        self.assertFalse(validate_budget_item("x" * 50, "bills", "1200"))
+        response = validate_budget_item("x" * 51, "bills", "1200")
+        self.assertEqual(response, "Budget item name must be at most 50 characters.")
+
+    def test_invalid_category(self):
+        response = validate_budget_item("Rent", "food", "1200")
+        self.assertEqual(response, "Category: 'food' is not valid")
+
+    def test_invalid_total(self):
+        response = validate_budget_item("Rent", "bills", "-1")
+        self.assertEqual(response, "Total must be a non negative number.")
+
+        response = validate_budget_item("Rent", "bills", None)
+        self.assertEqual(response, "Total must be a valid number.")
+
+
+class ValidateBudgetItemAttribute(unittest.TestCase):
+
+    def test_success(self):
+        self.assertFalse(validate_budget_item_attribute("name", "Rent"))
+        self.assertFalse(validate_budget_item_attribute("category", "savings"))
+        self.assertFalse(validate_budget_item_attribute("total", "0"))
+
+    def test_missing_name(self):
+        response = validate_budget_item_attribute("name", "")
+        self.assertEqual(response, "New name must not be empty.")
+
+    def test_name_too_long(self):
+        response = validate_budget_item_attribute("name", "x" * 51)
+        self.assertEqual(response, "Budget item name must be at most 50 characters.")
+
+    def test_invalid_category(self):
+        response = validate_budget_item_attribute("category", "food")
+        self.assertEqual(response, "Category: 'food' is not valid")
+
+    def test_invalid_total(self):
+        response = validate_budget_item_attribute("total", "-5")
+        self.assertEqual(response, "Total must be a non negative number.")
+
+
+class ValidatePageLimit(unittest.TestCase):
+
+    def test_success(self):
+        self.assertFalse(validate_page_limit("1", 50))
+        self.assertFalse(validate_page_limit(50, 50))
+
+    def test_out_of_range(self):
+        out_of_range_message = "Limit must be between 1 and 50."
+        self.assertEqual(validate_page_limit("0", 50), out_of_range_message)
+        self.assertEqual(validate_page_limit("51", 50), out_of_range_message)
+
+    def test_not_numeric(self):
+        self.assertEqual(
+            validate_page_limit("ten", 50), "Limit must be a whole number."
+        )
+
+
+class ValidateCursor(unittest.TestCase):
+
+    def test_success(self):
+        self.assertFalse(validate_cursor("0"))
+        self.assertFalse(validate_cursor(42))
+
+    def test_invalid_cursor(self):
+        self.assertEqual(validate_cursor("-1"), "Cursor must be a valid id.")
+        self.assertEqual(validate_cursor("abc"), "Cursor must be a valid id.")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -8,11 +8,13 @@ import {
   restoreAccordionState,
   bindAccordionPersistence,
 } from './components/accordion_state.js';
-import { bindItemActions } from './components/item_actions.js';
+import {
+  bindItemActions,
+  bindSelectedItemsActions,
+} from './components/item_actions.js';
 import { setupEditItemModal } from './modals/edit_item_modal.js';
 import { formatCategoryLabel } from './components/budget_categories.js';
 import { formatFloatToUSD } from './utils/format_currency.js';
-import { getTotalExpenses, calculateNetIncome } from './utils/net_income.js';
 import { displayError } from './utils/ui.js';
 
 /* =========================================================
@@ -24,6 +26,8 @@ const ELEMENT_IDS = {
   BUDGET_DURATION: 'budget-duration',
   BUDGET_ERROR: 'error',
   BUDGET_CATEGORIES: 'budget-categories',
+  SELECTED_ITEMS_ACTIONS: 'selected-items-actions',
+  SELECTED_ITEMS_CATEGORY: 'selected-items-category',
   EMPTY_MESSAGE: 'empty-budget-items',
   NET_INCOME_DIV: 'net-income',
   NET_INCOME: 'budget-net-income',
@@ -98,6 +102,7 @@ async function loadBudget() {
 
     const payload = await fetchBudget(budgetId);
     const budget = payload?.budget ?? payload;
+    const totals = payload?.totals;
 
     const errorEl = getElement(ELEMENT_IDS.BUDGET_ERROR);
     const emptyMsg = getElement(ELEMENT_IDS.EMPTY_MESSAGE);
@@ -119,8 +124,16 @@ async function loadBudget() {
 
     categoriesContainer.innerHTML = '';
 
+    // Bind bulk actions on the checked items (delete / move)
+    bindSelectedItemsActions({
+      container: categoriesContainer,
+      toolbar: getElement(ELEMENT_IDS.SELECTED_ITEMS_ACTIONS),
+      budgetId,
+      onRefresh: loadBudget,
+    });
+
     // Handle empty state
-    if (!budget.items || budget.items.length === 0) {
+    if (!totals || totals.item_count === 0) {
       if (emptyMsg)
         ((emptyMsg.style.display = 'block'),
           (netIncomeDiv.style.display = 'none'));
@@ -131,22 +144,17 @@ async function loadBudget() {
       ((emptyMsg.style.display = 'none'),
         (netIncomeDiv.style.display = 'block'));
 
-    // Calculate and display net income
-    const totalExpenses = getTotalExpenses(budget);
-    const { netIncome, isInNegative } = calculateNetIncome(
-      budget.gross_income,
-      totalExpenses,
-    );
-
+    // Display net income (computed server side)
     if (netIncomeEl) {
-      netIncomeEl.textContent = formatFloatToUSD(netIncome);
-      netIncomeEl.style.color = isInNegative ? 'red' : 'green';
+      netIncomeEl.textContent = formatFloatToUSD(totals.net_income);
+      netIncomeEl.style.color = totals.net_income < 0 ? 'red' : 'green';
     }
 
-    // Build category accordions
+    // Build category accordions, headline totals come from the server
     const grouped = groupItemsByCategory(budget.items);
 
     Object.entries(grouped).forEach(([category, data]) => {
+      data.total = totals.category_totals[category] ?? data.total;
       const accordion = buildCategoryAccordion({ category, data });
       categoriesContainer.appendChild(accordion);
 
@@ -171,6 +179,8 @@ async function loadBudget() {
         getElement(ELEMENT_IDS.EDIT_ITEM_TOTAL).value = dataset.itemTotal ?? '';
 
         const modalEl = getElement(ELEMENT_IDS.EDIT_ITEM_MODAL);
+        // version the edit is made from, a stale one is answered with 409
+        modalEl.dataset.itemVersion = dataset.itemVersion ?? '';
         bootstrap.Modal.getOrCreateInstance(modalEl).show();
       },
     });
@@ -428,6 +438,7 @@ async function initializeBudgetPage() {
     setupDeleteBudgetButton();
     setupAddItemModal();
     setupEditItemModal({ budgetId, onSuccess: loadBudget });
+    populateCategorySelect(ELEMENT_IDS.SELECTED_ITEMS_CATEGORY);
 
     // Load initial budget data
     await loadBudget();
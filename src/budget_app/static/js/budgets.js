@@ -1,6 +1,7 @@
 import { el } from './utils/dom.js';
 import { displayError } from './utils/ui.js';
 import { formatFloatToUSD } from './utils/format_currency.js';
+import { fetchJsonWithValidator } from './services/budget_api.js';
 
 /* =========================================================
    Constants
@@ -12,6 +13,8 @@ const ELEMENT_IDS = {
   USER_GREETING: 'user-greeting',
 };
 
+const BUDGETS_PAGE_LIMIT = 100;
+
 /* =========================================================
    Utilities
 ========================================================= */
@@ -67,6 +70,36 @@ document.addEventListener('DOMContentLoaded', setupCreateBudgetButton);
    Budget Loading
 ========================================================= */
 
+/**
+ * Fetches every budget summary for the current user, one page at a time
+ * @returns {Promise<{budgets: Array<Object>, username: string}>}
+ * @throws {Error} If a page request fails
+ */
+async function fetchAllBudgets() {
+  const budgets = [];
+  let username = null;
+  let cursor = null;
+
+  do {
+    const params = new URLSearchParams({ limit: String(BUDGETS_PAGE_LIMIT) });
+    if (cursor !== null) params.set('cursor', String(cursor));
+
+    const { ok, status, data } = await fetchJsonWithValidator(
+      `/api/budgets?${params}`,
+    );
+
+    if (!ok) {
+      throw new Error(data.message || `Failed to load budgets (${status})`);
+    }
+
+    budgets.push(...data.budgets);
+    username = data.username;
+    cursor = data.next_cursor ?? null;
+  } while (cursor !== null);
+
+  return { budgets, username };
+}
+
 /**
  * Loads and displays all budgets for the current user
  */
@@ -77,19 +110,10 @@ async function loadBudgets() {
   try {
     displayError(ELEMENT_IDS.ERROR); // Clear previous errors
 
-    const response = await fetch('/api/budgets', { credentials: 'include' });
-
-    const data = await response.json();
-    const { budgets, username } = data;
+    const { budgets, username } = await fetchAllBudgets();
 
     list.innerHTML = '';
 
-    if (!response.ok) {
-      throw new Error(
-        data.message || `Failed to load budgets (${response.status})`,
-      );
-    }
-
     // Display username greeting if available
     if (username) {
       const greetingEl = document.getElementById(ELEMENT_IDS.USER_GREETING);
@@ -69,7 +69,16 @@ export function buildCategoryAccordion({
             'list-group-item d-flex justify-content-between align-items-center',
         },
         [
-          el('span', { text: item.name }),
+          el('label', { class: 'd-flex gap-2 align-items-center mb-0' }, [
+            // selects the item for the bulk actions (delete / move)
+            el('input', {
+              class: 'form-check-input mt-0 item-select',
+              type: 'checkbox',
+              'data-item-id': String(item.id),
+              'aria-label': `Select ${item.name}`,
+            }),
+            el('span', { text: item.name }),
+          ]),
           el('div', { class: 'd-flex gap-2 align-items-center' }, [
             // formatted display total
             el('span', { text: `${formatFloatToUSD(item.total)}` }),
@@ -83,6 +92,7 @@ export function buildCategoryAccordion({
                 'data-item-name': item.name,
                 'data-item-total': String(item.total),
                 'data-item-category': item.category,
+                'data-item-version': String(item.version),
                 type: 'button',
                 title: 'Edit item',
               },
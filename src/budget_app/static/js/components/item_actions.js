@@ -1,4 +1,8 @@
-import { deleteBudgetItem } from '../services/budget_api.js';
+import {
+  bulkDeleteBudgetItems,
+  bulkEditBudgetItems,
+  deleteBudgetItem,
+} from '../services/budget_api.js';
 
 export function bindItemActions({ container, budgetId, onRefresh, onEdit }) {
   if (!container) return;
@@ -14,6 +18,7 @@ export function bindItemActions({ container, budgetId, onRefresh, onEdit }) {
         itemName: editBtn.dataset.itemName,
         itemTotal: editBtn.dataset.itemTotal,
         itemCategory: editBtn.dataset.itemCategory,
+        itemVersion: editBtn.dataset.itemVersion,
       });
       return;
     }
@@ -49,3 +54,101 @@ export function bindItemActions({ container, budgetId, onRefresh, onEdit }) {
     }
   });
 }
+
+/**
+ * Checked items (.item-select checkboxes) are deleted, or moved to another
+ * category, in one request / transaction from the toolbar's buttons.
+ * Call again after every render: re-rendered items start unselected.
+ */
+export function bindSelectedItemsActions({
+  container,
+  toolbar,
+  budgetId,
+  onRefresh,
+}) {
+  if (!container || !toolbar) return;
+
+  const countEl = toolbar.querySelector('.selected-items-count');
+  const categorySelect = toolbar.querySelector('.selected-items-category');
+  const moveBtn = toolbar.querySelector('.selected-items-move');
+  const deleteBtn = toolbar.querySelector('.selected-items-delete');
+
+  const selectedItemIds = () =>
+    Array.from(container.querySelectorAll('.item-select:checked')).map(
+      (checkbox) => Number(checkbox.dataset.itemId),
+    );
+
+  const updateToolbar = () => {
+    const count = selectedItemIds().length;
+    toolbar.classList.toggle('d-none', count === 0);
+    toolbar.classList.toggle('d-flex', count > 0);
+    if (countEl) countEl.textContent = `${count} selected`;
+  };
+
+  updateToolbar();
+
+  if (container.dataset.selectedItemsBound === 'true') return;
+  container.dataset.selectedItemsBound = 'true';
+
+  container.addEventListener('change', (e) => {
+    if (e.target.closest('.item-select')) updateToolbar();
+  });
+
+  const runOnSelected = async (button, busyText, action, failedMessage) => {
+    const itemIds = selectedItemIds();
+    if (itemIds.length === 0) return;
+
+    button.disabled = true;
+    button.setAttribute('aria-busy', 'true');
+    const originalText = button.textContent;
+    button.textContent = busyText;
+
+    try {
+      await action(itemIds);
+
+      // Refresh the budget view
+      await onRefresh();
+    } catch (err) {
+      console.error(failedMessage, err);
+      alert(`${failedMessage} ${err.message || ''}`.trim());
+    } finally {
+      button.disabled = false;
+      button.removeAttribute('aria-busy');
+      button.textContent = originalText;
+    }
+  };
+
+  deleteBtn?.addEventListener('click', async () => {
+    const count = selectedItemIds().length;
+    const confirmed = window.confirm(
+      `Delete ${count} item(s)?\n\nThis cannot be undone.`,
+    );
+    if (!confirmed) return;
+
+    await runOnSelected(
+      deleteBtn,
+      'Deleting...',
+      (itemIds) => bulkDeleteBudgetItems({ budgetId, itemIds }),
+      'Failed to delete items.',
+    );
+  });
+
+  moveBtn?.addEventListener('click', async () => {
+    const category = categorySelect?.value;
+    if (!category) {
+      categorySelect?.focus();
+      return;
+    }
+
+    await runOnSelected(
+      moveBtn,
+      'Moving...',
+      (itemIds) =>
+        bulkEditBudgetItems({
+          budgetId,
+          edits: itemIds.map((itemId) => ({ itemId, changes: { category } })),
+        }),
+      'Failed to move items.',
+    );
+  });
+}
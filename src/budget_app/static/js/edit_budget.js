@@ -22,6 +22,9 @@ const PAGE_ROUTES = {
   BUDGET: '/budget',
 };
 
+// version of the budget the form was loaded from
+let loadedVersion = null;
+
 /* =========================================================
    Budget Loading
 ========================================================= */
@@ -47,6 +50,8 @@ async function loadBudgetForEdit() {
     }
 
     const { budget } = await res.json();
+    // sent back with the edit, a stale version is answered with 409
+    loadedVersion = budget.version;
 
     // Populate form fields
     const nameEl = document.getElementById(ELEMENT_IDS.NAME);
@@ -85,6 +90,7 @@ async function handleEditBudget(e) {
     ),
     month_duration: document.getElementById(ELEMENT_IDS.MONTH_DURATION).value,
   };
+  if (loadedVersion !== null) body.version = loadedVersion;
 
   // Show loading state
   setFormDisabled(form, true, {
@@ -81,6 +81,9 @@ export function setupEditItemModal({ budgetId, onSuccess }) {
       category,
       total,
     };
+    if (modalEl.dataset.itemVersion) {
+      payload.version = Number(modalEl.dataset.itemVersion);
+    }
 
     // Show loading state
     if (submitBtn) {
@@ -99,6 +102,11 @@ export function setupEditItemModal({ budgetId, onSuccess }) {
     } catch (err) {
       console.error('Edit item failed', err);
       alert(err.message || 'Failed to edit item.');
+      // changed in another tab: show the current budget
+      if (err.status === 409 && typeof onSuccess === 'function') {
+        bootstrap.Modal.getInstance(modalEl).hide();
+        await onSuccess();
+      }
     } finally {
       // Restore button state
       if (submitBtn) {
@@ -1,3 +1,5 @@
+import { VALIDATOR_STORAGE_PREFIX } from './budget_api.js';
+
 const API_ENDPOINTS = {
   AUTHENTICATE: '/api/auth/authenticated',
   LOGOUT: '/api/auth/logout',
@@ -105,6 +107,10 @@ async function logout() {
   } finally {
     // Clear any stored redirect
     sessionStorage.removeItem('redirectAfterLogin');
+    // and the budgets kept for conditional GETs (see budget_api.js)
+    Object.keys(sessionStorage)
+      .filter((key) => key.startsWith(VALIDATOR_STORAGE_PREFIX))
+      .forEach((key) => sessionStorage.removeItem(key));
     window.location.href = '/login';
   }
 }
@@ -2,28 +2,92 @@ const API_ENDPOINTS = {
   BUDGET: '/api/budget',
   ITEM_DELETE: '/api/budget/item/delete',
   ITEM_EDIT: '/api/budget/item/edit',
+  ITEM_BULK_DELETE: '/api/budget/item/bulk_delete',
+  ITEM_BULK_EDIT: '/api/budget/item/bulk_edit',
 };
 
+const ITEMS_PAGE_LIMIT = 200;
+
+// sessionStorage key prefix of the { etag, data } kept per GET url
+export const VALIDATOR_STORAGE_PREFIX = 'budget_api:validator:';
+
+function readValidator(url) {
+  try {
+    return JSON.parse(sessionStorage.getItem(VALIDATOR_STORAGE_PREFIX + url));
+  } catch {
+    return null;
+  }
+}
+
+function writeValidator(url, validator) {
+  try {
+    sessionStorage.setItem(
+      VALIDATOR_STORAGE_PREFIX + url,
+      JSON.stringify(validator)
+    );
+  } catch {
+    // storage full / unavailable: the next request downloads the body again
+  }
+}
+
 /**
- * Fetch a single budget with all its items
+ * GET a JSON resource with a conditional request: the ETag and body of the
+ * last 200 response are kept in sessionStorage, the ETag is sent back as
+ * If-None-Match and a 304 reuses the stored body instead of downloading it
+ * @param {string} url - The resource URL
+ * @returns {Promise<{ ok: boolean, status: number, data: object }>}
+ */
+export async function fetchJsonWithValidator(url) {
+  const validator = readValidator(url);
+  const res = await fetch(url, {
+    credentials: 'include',
+    headers: validator ? { 'If-None-Match': validator.etag } : {},
+  });
+
+  if (res.status === 304 && validator) {
+    return { ok: true, status: 200, data: validator.data };
+  }
+
+  const data = await res.json().catch(() => ({}));
+  const etag = res.headers.get('ETag');
+  if (res.ok && etag) {
+    writeValidator(url, { etag, data });
+  }
+  return { ok: res.ok, status: res.status, data };
+}
+
+/**
+ * Fetch a single budget with all its items, following the item pages
+ * (keyset pagination via next_cursor)
  * @param {string|number} budgetId - The budget ID to fetch
- * @returns {Promise<object>} Budget object with items
+ * @returns {Promise<object>} Budget payload ({ budget, totals }) with all items
  * @throws {Error} If the request fails
  */
 export async function fetchBudget(budgetId) {
-  const res = await fetch(
-    `${API_ENDPOINTS.BUDGET}/${encodeURIComponent(budgetId)}`,
-    {
-      credentials: 'include',
+  let payload = null;
+  let cursor = null;
+
+  do {
+    const params = new URLSearchParams({ limit: String(ITEMS_PAGE_LIMIT) });
+    if (cursor !== null) params.set('cursor', String(cursor));
+
+    const { ok, data: page } = await fetchJsonWithValidator(
+      `${API_ENDPOINTS.BUDGET}/${encodeURIComponent(budgetId)}?${params}`
+    );
+
+    if (!ok) {
+      throw new Error(page.message || 'Failed to load budget');
     }
-  );
 
-  if (!res.ok) {
-    const data = await res.json().catch(() => ({}));
-    throw new Error(data.message || 'Failed to load budget');
-  }
+    if (payload === null) {
+      payload = page;
+    } else {
+      payload.budget.items.push(...page.budget.items);
+    }
+    cursor = page.next_cursor ?? null;
+  } while (cursor !== null);
 
-  return res.json();
+  return payload;
 }
 
 /**
@@ -64,7 +128,62 @@ export async function editBudgetItem(payload) {
 
   if (!res.ok) {
     const data = await res.json().catch(() => ({}));
-    throw new Error(data.message || 'Failed to edit item');
+    const error = new Error(data.message || 'Failed to edit item');
+    error.status = res.status; // 409: the item changed since it was loaded
+    throw error;
+  }
+
+  return res.json();
+}
+
+/**
+ * Delete many budget items of one budget in a single request / transaction
+ * (nothing is deleted if one of the ids isn't in the budget)
+ * @param {object} params - { budgetId: string|number, itemIds: Array<string|number> }
+ * @returns {Promise<object>} Response data from server
+ * @throws {Error} If the request fails
+ */
+export async function bulkDeleteBudgetItems({ budgetId, itemIds }) {
+  const res = await fetch(API_ENDPOINTS.ITEM_BULK_DELETE, {
+    method: 'POST',
+    credentials: 'include',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ budget_id: budgetId, item_ids: itemIds.map(Number) }),
+  });
+
+  if (!res.ok) {
+    const data = await res.json().catch(() => ({}));
+    throw new Error(data.message || 'Failed to delete items');
+  }
+
+  return res.json();
+}
+
+/**
+ * Edit many budget items of one budget in a single request / transaction
+ * (nothing is saved if one of the edits is invalid)
+ * @param {object} params - { budgetId: string|number,
+ *   edits: Array<{ itemId: string|number, changes: object }> }
+ * @returns {Promise<object>} Updated budget from server
+ * @throws {Error} If the request fails
+ */
+export async function bulkEditBudgetItems({ budgetId, edits }) {
+  const res = await fetch(API_ENDPOINTS.ITEM_BULK_EDIT, {
+    method: 'POST',
+    credentials: 'include',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      budget_id: budgetId,
+      items: edits.map(({ itemId, changes }) => ({
+        item_id: Number(itemId),
+        changes,
+      })),
+    }),
+  });
+
+  if (!res.ok) {
+    const data = await res.json().catch(() => ({}));
+    throw new Error(data.message || 'Failed to edit items');
   }
 
   return res.json();
@@ -0,0 +1,122 @@
+"""helpers shared by the test suite (not imported by the app itself)"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from .extensions import db
+from .metrics import request_timed
+
+
+class QueryCounter:
+    """
+    Records every SQL statement sent to the engine while active.
+
+    Usage:
+        with QueryCounter() as counter:
+            get_budgets_by_user_id(1)
+        counter.count  # -> number of statements executed
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+        self.parameters = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+        return False
+
+
+@contextmanager
+def assert_max_queries(max_queries, engine=None):
+    """
+    Fail the current test when the wrapped block issues more than
+    max_queries SQL statements (guards against N+1 regressions).
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+
+    if counter.count > max_queries:
+        executed = "\n".join(
+            f"  {i}. {statement}" for i, statement in enumerate(counter.statements, 1)
+        )
+        raise AssertionError(
+            f"Expected at most {max_queries} SQL statement(s), "
+            f"{counter.count} were executed:\n{executed}"
+        )
+
+
+class RequestQueryRecorder:
+    """
+    Records the SQL statement count and DB time of every request the app
+    handles while active (see metrics.RequestTiming).
+
+    Usage:
+        with RequestQueryRecorder(app) as recorder:
+            client.get("/api/budgets")
+        recorder.requests  # -> [("GET /api/budgets", statements, db seconds)]
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.requests = []
+
+    def _record(self, sender, timing):
+        self.requests.append((timing.route, timing.statements, timing.db))
+
+    def __enter__(self):
+        request_timed.connect(self._record, self.app)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        request_timed.disconnect(self._record, self.app)
+        return False
+
+
+@contextmanager
+def assert_max_request_queries(app, max_queries):
+    """
+    Fail the current test when a request handled by app in the wrapped block
+    (e.g. through app.test_client()) issues more than max_queries SQL
+    statements: the whole request, handler and session/auth checks included.
+    """
+    with RequestQueryRecorder(app) as recorder:
+        yield recorder
+
+    over = [request for request in recorder.requests if request[1] > max_queries]
+    if over:
+        requests = "\n".join(
+            f"  {route}: {statements} statement(s), {db * 1000:.2f}ms"
+            for route, statements, db in over
+        )
+        raise AssertionError(
+            f"Expected at most {max_queries} SQL statement(s) per request:\n{requests}"
+        )
+
+
+def explain_query_plan(statement, parameters=()):
+    """
+    return the SQLite query plan of a raw SQL statement as one string
+    (e.g. "SEARCH budget USING INDEX ix_budget_user_id_id (user_id=?)")
+    """
+    rows = (
+        db.session.connection()
+        .exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        .all()
+    )
+    return "\n".join(row[-1] for row in rows)
@@ -1,3 +1,6 @@
+from werkzeug.http import generate_etag
+
+
 def validate_request_body_keys_exist(keys, body):
     for key in keys:
         if key not in body:
@@ -10,3 +13,30 @@ def stringify_attributes(list_of_attributes):
     return formatted join of attributes
     """
     return ", ".join(list_of_attributes)
+
+
+def make_etag(*parts):
+    """
+    return a strong (unquoted) ETag for the representation described by
+    parts, e.g. ("budget", budget_id, version, limit, cursor)
+    """
+    return generate_etag(repr(parts).encode())
+
+
+UNIQUE_VIOLATION_PGCODE = "23505"
+
+
+def is_unique_violation(integrity_error):
+    """
+    return True if a sqlalchemy IntegrityError was raised by a UNIQUE
+    constraint (Postgres SQLSTATE 23505 or SQLite "UNIQUE constraint failed")
+    rather than e.g. a NOT NULL or foreign key violation
+    """
+    driver_error = getattr(integrity_error, "orig", None)
+    sqlstate = getattr(driver_error, "pgcode", None) or getattr(
+        driver_error, "sqlstate", None
+    )
+    if sqlstate:
+        return sqlstate == UNIQUE_VIOLATION_PGCODE
+
+    return "UNIQUE constraint failed" in str(driver_error)
@@ -1,5 +1,9 @@
 import unittest
+from sqlalchemy.exc import IntegrityError
+
 from .utils import (
+    is_unique_violation,
+    make_etag,
     validate_request_body_keys_exist,
     stringify_attributes,
 )
@@ -36,5 +40,47 @@ class StringifyAttributes(unittest.TestCase):
         self.assertEqual(response, "foo, bar, baz")
 
 
+class MakeEtag(unittest.TestCase):
+
+    def test_same_parts_same_etag(self):
+        self.assertEqual(make_etag("budget", 1, 2), make_etag("budget", 1, 2))
+
+    def test_different_parts_different_etag(self):
+        self.assertNotEqual(make_etag("budget", 1, 2), make_etag("budget", 1, 3))
+        self.assertNotEqual(make_etag("budget", 1, 2, None), make_etag("budget", 1, 2))
+
+
+class IsUniqueViolation(unittest.TestCase):
+
+    class PostgresError(Exception):
+        def __init__(self, pgcode):
+            super().__init__("duplicate key value violates unique constraint")
+            self.pgcode = pgcode
+
+    def integrity_error(self, driver_error):
+        return IntegrityError("INSERT ...", {}, driver_error)
+
+    def test_sqlite_unique_violation(self):
+        error = self.integrity_error(
+            Exception("UNIQUE constraint failed: budget.user_id, budget.name")
+        )
+        self.assertTrue(is_unique_violation(error))
+
+    def test_sqlite_other_violation(self):
+        error = self.integrity_error(
+            Exception("NOT NULL constraint failed: budget.name")
+        )
+        self.assertFalse(is_unique_violation(error))
+
+    def test_postgres_unique_violation(self):
+        error = self.integrity_error(IsUniqueViolation.PostgresError("23505"))
+        self.assertTrue(is_unique_violation(error))
+
+    def test_postgres_other_violation(self):
+        # foreign_key_violation
+        error = self.integrity_error(IsUniqueViolation.PostgresError("23503"))
+        self.assertFalse(is_unique_violation(error))
+
+
 if __name__ == "__main__":
     unittest.main()